@@ -0,0 +1,146 @@
+"""
+AGRUPAMENTO DAS INCLUSÕES (GROUP COMMIT)
+
+Em campanhas de cadastro chegam milhares de POST /api/pessoas por segundo, e
+cada um faria o seu insert_one: o gargalo passa a ser a ida e volta ao MongoDB,
+não a CPU. Com o agrupamento, as inclusões simultâneas entram em uma fila e são
+gravadas juntas, em um único insert_many não ordenado, quando a fila junta
+`tamanho_maximo` documentos ou o primeiro deles espera `espera_ms`.
+
+Cada requisição continua recebendo o seu próprio resultado: o documento gravado
+ou o erro dele (ex: DuplicateKeyError do CPF), como se tivesse sido um insert_one.
+O que vem depois da gravação (ex: registrar os CPFs no filtro de Bloom) também é
+feito uma vez por lote, em `apos_gravar`, antes de as requisições serem liberadas.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from metricas import Histograma, registro
+
+CODIGO_CHAVE_DUPLICADA = 11000
+
+logger = logging.getLogger(__name__)
+
+tamanho_gravacoes = registro.registrar(Histograma(
+    "pessoas_insert_batch_size", "Documentos por insert_many do agrupamento de inclusões",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)))
+duracao_gravacoes = registro.registrar(Histograma(
+    "pessoas_insert_batch_duration_seconds", "Duração de cada insert_many do agrupamento de inclusões"))
+espera_inclusoes = registro.registrar(Histograma(
+    "pessoas_insert_queue_wait_seconds", "Tempo de cada inclusão na fila até o início da gravação"))
+
+
+class AgrupadorInclusoes:
+    """
+    Fila de inclusões gravadas em lotes por uma tarefa de segundo plano.
+
+    Exemplo de BOA PRÁTICA KISS:
+    - Uma única tarefa consome a fila: enquanto um lote é gravado, o próximo se forma
+    - Cada inclusão é um Future; o lote resolve os Futures pelo índice dos erros
+    - Um erro inesperado no lote falha só as inclusões daquele lote: a tarefa continua
+
+    Args:
+        gravar: Função que grava uma lista de documentos (ex: insert_many não ordenado)
+        tamanho_maximo: Documentos por lote
+        espera_ms: Espera máxima do primeiro documento do lote
+        apos_gravar: Chamada uma vez por lote com os documentos gravados com sucesso
+    """
+
+    def __init__(
+        self,
+        gravar: Callable[[List[dict]], Awaitable],
+        tamanho_maximo: int = 500,
+        espera_ms: float = 5.0,
+        apos_gravar: Optional[Callable[[List[dict]], None]] = None,
+    ):
+        self.gravar = gravar
+        self.apos_gravar = apos_gravar
+        self.tamanho_maximo = tamanho_maximo
+        self.espera_segundos = espera_ms / 1000
+        self._fila: "Optional[asyncio.Queue[Optional[Tuple[dict, asyncio.Future, float]]]]" = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def iniciar(self) -> None:
+        """Cria a fila e a tarefa de segundo plano no event loop atual (no lifespan da aplicação)"""
+        self._fila = asyncio.Queue()
+        self._tarefa = asyncio.create_task(self._consumir())
+
+    async def encerrar(self) -> None:
+        """Grava o que ainda está na fila e encerra a tarefa de segundo plano"""
+        if self._tarefa is None:
+            return
+        await self._fila.put(None)  # marca o fim: a tarefa grava o lote em formação e termina
+        await self._tarefa
+        self._tarefa = None
+
+    async def inserir(self, doc: dict) -> None:
+        """
+        Inclui o documento no próximo lote e espera a gravação.
+
+        Raises:
+            DuplicateKeyError: CPF já cadastrado (no banco ou no mesmo lote)
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((doc, futuro, time.perf_counter()))
+        await futuro
+
+    async def _consumir(self) -> None:
+        laco = asyncio.get_running_loop()
+        encerrar = False
+        while not encerrar:
+            lote = [await self._fila.get()]
+            prazo = laco.time() + self.espera_segundos
+            while len(lote) < self.tamanho_maximo and lote[-1] is not None:
+                restante = prazo - laco.time()
+                if self._fila.empty() and restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get_nowait() if not self._fila.empty()
+                                else await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            if lote[-1] is None:
+                lote.pop()
+                encerrar = True
+            if lote:
+                try:
+                    await self._gravar_lote(lote)
+                except Exception as erro:  # ex: falha em apos_gravar - sem a tarefa, as inclusões esperariam para sempre
+                    logger.exception("Falha no lote de %d inclusões agrupadas", len(lote))
+                    for _, futuro, _ in lote:
+                        if not futuro.done():
+                            futuro.set_exception(erro)
+
+    async def _gravar_lote(self, lote: List[Tuple[dict, asyncio.Future, float]]) -> None:
+        inicio = time.perf_counter()
+        for _, _, enfileirado_em in lote:
+            espera_inclusoes.observar(inicio - enfileirado_em)
+
+        erros = {}
+        try:
+            await self.gravar([doc for doc, _, _ in lote])
+        except BulkWriteError as erro:
+            for falha in erro.details['writeErrors']:
+                classe = DuplicateKeyError if falha['code'] == CODIGO_CHAVE_DUPLICADA else OperationFailure
+                erros[falha['index']] = classe(falha['errmsg'], falha['code'], falha)
+        except Exception as erro:  # falha do lote inteiro (ex: conexão): vale para todas as inclusões
+            erros = {indice: erro for indice in range(len(lote))}
+        finally:
+            tamanho_gravacoes.observar(len(lote))
+            duracao_gravacoes.observar(time.perf_counter() - inicio)
+
+        if self.apos_gravar is not None and len(erros) < len(lote):
+            self.apos_gravar([doc for indice, (doc, _, _) in enumerate(lote) if indice not in erros])
+
+        for indice, (_, futuro, _) in enumerate(lote):
+            if futuro.done():  # requisição cancelada enquanto esperava
+                continue
+            if indice in erros:
+                futuro.set_exception(erros[indice])
+            else:
+                futuro.set_result(None)
@@ -0,0 +1,274 @@
+"""
+BENCHMARK DE CARGA DA API DE PESSOAS
+
+Executa cada rota do api_router com clientes assíncronos concorrentes e mede
+vazão (req/s) e latência (p50/p95/p99) por rota. O resultado é salvo em JSON,
+junto com o commit atual, para comparar execuções entre commits.
+
+Alvos possíveis:
+- --mongo memoria  : API em processo com um MongoDB em memória (mongomock-motor)
+- --mongo real     : API em processo com o MongoDB de MONGO_URL/DB_NAME
+- --url http://... : API já em execução (qualquer banco)
+
+O feed de mudanças (SSE) é medido só com --url: o transporte em processo do
+httpx não entrega a resposta em streaming. A latência dele é a de uma
+atualização (PUT) até o evento correspondente chegar ao cliente.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_api.py --mongo memoria --pessoas 2000 --concorrencia 32 --saida bench.json
+    python benchmarks/bench_api.py --mongo real --comparar bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+import numpy as np
+
+DIRETORIO_BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(DIRETORIO_BACKEND))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from cpf_lote import calcular_digitos_verificadores  # noqa: E402
+
+Requisicao = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def gerar_cpfs(quantidade: int, semente: int) -> List[str]:
+    """CPFs válidos e distintos, determinísticos a partir da semente"""
+    rng = np.random.default_rng(semente)
+    base = rng.choice(10 ** 9, size=quantidade, replace=False)
+    digitos = (base[:, None] // 10 ** np.arange(8, -1, -1)) % 10
+    completos = np.concatenate([digitos, calcular_digitos_verificadores(digitos)], axis=1)
+    return [''.join(map(str, linha)) for linha in completos.tolist()]
+
+
+def pessoa(cpf: str, i: int) -> dict:
+    return {
+        "cpf": cpf,
+        "nome": f"Pessoa Benchmark {i}",
+        "email": f"bench{i}@exemplo.com.br",
+        "endereco": f"Rua do Benchmark, {i} - São Paulo/SP",
+    }
+
+
+def lotes(cpfs: List[str], tamanho: int) -> List[List[str]]:
+    return [cpfs[inicio:inicio + tamanho] for inicio in range(0, len(cpfs), tamanho)]
+
+
+async def baixar(cliente: httpx.AsyncClient, params: dict) -> httpx.Response:
+    """Exportação lida até o fim, como um cliente de BI faria"""
+    async with cliente.stream("GET", "/api/pessoas/export", params=params) as resposta:
+        async for _ in resposta.aiter_bytes():
+            pass
+    return resposta
+
+
+async def esperar_evento(cliente: httpx.AsyncClient, cpf: str, i: int, espera: float = 10.0) -> httpx.Response:
+    """Abre o feed SSE, atualiza a pessoa e espera o evento dela (latência ponta a ponta)"""
+    async with cliente.stream("GET", "/api/pessoas/changes/stream") as resposta:
+        if resposta.status_code >= 400:
+            return resposta
+        linhas = resposta.aiter_lines()
+        await cliente.put(f"/api/pessoas/{cpf}", json={"endereco": f"Rua do Evento, {i}"})
+        try:
+            async with asyncio.timeout(espera):
+                async for linha in linhas:
+                    if linha.startswith("data: ") and json.loads(linha[6:])["cpf"] == cpf:
+                        return resposta
+        except TimeoutError:
+            raise httpx.ReadTimeout(f"Evento do CPF {cpf} não chegou em {espera}s")
+    return resposta
+
+
+def resumir(latencias: List[float], erros: int, duracao: float) -> Dict[str, float]:
+    amostras = np.array(latencias) if latencias else np.zeros(1)
+    return {
+        "requests": len(latencias),
+        "errors": erros,
+        "duration_s": round(duracao, 4),
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "p50_ms": round(float(np.percentile(amostras, 50)), 3),
+        "p95_ms": round(float(np.percentile(amostras, 95)), 3),
+        "p99_ms": round(float(np.percentile(amostras, 99)), 3),
+        "max_ms": round(float(amostras.max()), 3),
+    }
+
+
+async def executar_cenario(
+    cliente: httpx.AsyncClient, total: int, concorrencia: int, requisicao: Requisicao
+) -> Dict[str, float]:
+    """Dispara `total` requisições com `concorrencia` clientes simultâneos"""
+    latencias: List[float] = []
+    erros = 0
+    proximo = iter(range(total))
+
+    async def trabalhador():
+        nonlocal erros
+        for i in proximo:
+            inicio = time.perf_counter()
+            try:
+                resposta = await requisicao(cliente, i)
+                ok = resposta.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            erros += not ok
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return resumir(latencias, erros, time.perf_counter() - inicio)
+
+
+@asynccontextmanager
+async def abrir_cliente(args):
+    """Cliente HTTP para o alvo escolhido (API em processo ou URL externa)"""
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as cliente:
+            yield cliente
+        return
+
+    import server
+    from metricas import BancoMedido
+    if args.mongo == 'memoria':
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--mongo memoria requer o pacote mongomock-motor")
+        server.db = BancoMedido(AsyncMongoMockClient(tz_aware=True)[os.environ['DB_NAME']])
+
+    async with server.app.router.lifespan_context(server.app):
+        transporte = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as cliente:
+            yield cliente
+
+
+async def executar(args) -> Dict[str, Dict[str, float]]:
+    cpfs = gerar_cpfs(args.pessoas + args.importacao, args.semente)
+    cpfs_api, cpfs_bulk = cpfs[:args.pessoas], cpfs[args.pessoas:]
+    n, c = args.pessoas, args.concorrencia
+
+    linhas = "\n".join(json.dumps(pessoa(cpf, i)) for i, cpf in enumerate(cpfs_bulk))
+    lotes_bulk = lotes(cpfs_bulk, args.lote_massa)
+    exportacoes = args.exportacoes
+    cenarios = [
+        ("POST /api/pessoas", n, lambda cli, i: cli.post("/api/pessoas", json=pessoa(cpfs_api[i], i))),
+        ("GET /api/pessoas/{cpf}", n, lambda cli, i: cli.get(f"/api/pessoas/{cpfs_api[i]}")),
+        ("POST /api/pessoas/lookup", args.listagens,
+         lambda cli, i: cli.post("/api/pessoas/lookup", json={"cpfs": cpfs_api[i % n:i % n + args.pagina]})),
+        ("GET /api/pessoas", args.listagens, lambda cli, i: cli.get("/api/pessoas", params={"limit": args.pagina})),
+        ("GET /api/pessoas?nome=", args.listagens,
+         lambda cli, i: cli.get("/api/pessoas", params={"nome": f"pessoa benchmark {i % 10}", "limit": args.pagina})),
+        ("GET /api/pessoas/changes", args.listagens,
+         lambda cli, i: cli.get("/api/pessoas/changes", params={"limit": args.pagina})),
+        # Cada requisição com outra chave de cache (period x top_domains): mede a agregação, não o cache
+        ("GET /api/pessoas/stats", min(args.listagens, 200),
+         lambda cli, i: cli.get("/api/pessoas/stats", params={
+             "exact": "true", "period": ("day", "month")[i % 2], "top_domains": i // 2 % 100 + 1})),
+        ("GET /api/pessoas/export?csv", exportacoes, lambda cli, i: baixar(cli, {"format": "csv"})),
+        ("GET /api/pessoas/export?ndjson", exportacoes, lambda cli, i: baixar(cli, {"format": "ndjson"})),
+        ("GET /api/pessoas/export?parquet", exportacoes, lambda cli, i: baixar(cli, {"format": "parquet"})),
+        ("PUT /api/pessoas/{cpf}", n,
+         lambda cli, i: cli.put(f"/api/pessoas/{cpfs_api[i]}", json={"endereco": f"Rua Atualizada, {i}"})),
+        ("GET /api/pessoas/changes/stream", min(args.eventos, n) if args.url else 0,
+         lambda cli, i: esperar_evento(cli, cpfs_api[i], i)),
+        ("POST /api/pessoas/bulk", 1 if cpfs_bulk else 0,
+         lambda cli, i: cli.post("/api/pessoas/bulk", content=linhas.encode(),
+                                 headers={"content-type": "application/x-ndjson"})),
+        ("PATCH /api/pessoas/bulk", len(lotes_bulk),
+         lambda cli, i: cli.patch("/api/pessoas/bulk", json={"items": [
+             {"cpf": cpf, "endereco": f"Rua em Massa, {i}"} for cpf in lotes_bulk[i]]})),
+        ("DELETE /api/pessoas/bulk", len(lotes_bulk),
+         lambda cli, i: cli.request("DELETE", "/api/pessoas/bulk", json={"cpfs": lotes_bulk[i]})),
+        ("DELETE /api/pessoas/{cpf}", n,
+         lambda cli, i: cli.delete(f"/api/pessoas/{cpfs_api[i]}")),
+    ]
+
+    resultados = {}
+    async with abrir_cliente(args) as cliente:
+        for nome, total, requisicao in cenarios:
+            if total:
+                resultados[nome] = await executar_cenario(cliente, total, c, requisicao)
+                imprimir_linha(nome, resultados[nome])
+    return resultados
+
+
+def imprimir_linha(nome: str, r: Dict[str, float]) -> None:
+    print(
+        f"{nome:32s} {r['requests']:7d} req  {r['errors']:5d} erros  {r['throughput_rps']:10.1f} req/s  "
+        f"p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  p99={r['p99_ms']:8.2f}ms"
+    )
+
+
+def comparar(atual: Dict[str, Dict[str, float]], arquivo_base: str) -> None:
+    """Mostra a variação percentual de vazão e latência em relação a uma execução anterior"""
+    base = json.loads(Path(arquivo_base).read_text())
+    print(f"\nComparação com {arquivo_base} (commit {base.get('commit', '?')}):")
+    for nome, r in atual.items():
+        anterior = base["routes"].get(nome)
+        if not anterior:
+            continue
+        variacoes = "  ".join(
+            f"{metrica}={(r[metrica] / anterior[metrica] - 1) * 100:+6.1f}%"
+            for metrica in ("throughput_rps", "p50_ms", "p99_ms") if anterior[metrica]
+        )
+        print(f"{nome:32s} {variacoes}")
+
+
+def commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO_BACKEND,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="URL de uma API em execução (ignora --mongo)")
+    parser.add_argument('--mongo', choices=('memoria', 'real'), default='memoria')
+    parser.add_argument('--pessoas', type=int, default=1000, help="Pessoas criadas/buscadas/atualizadas/removidas")
+    parser.add_argument('--importacao', type=int, default=5000, help="Linhas enviadas para /api/pessoas/bulk")
+    parser.add_argument('--listagens', type=int, default=200, help="Requisições de listagem")
+    parser.add_argument('--pagina', type=int, default=100, help="Tamanho da página nas listagens")
+    parser.add_argument('--lote-massa', type=int, default=1000, help="CPFs por PATCH/DELETE /api/pessoas/bulk")
+    parser.add_argument('--exportacoes', type=int, default=3, help="Exportações completas por formato")
+    parser.add_argument('--eventos', type=int, default=100, help="Eventos medidos no feed SSE (só com --url)")
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--semente', type=int, default=20251110)
+    parser.add_argument('--saida', help="Arquivo JSON para salvar os resultados")
+    parser.add_argument('--comparar', help="Arquivo JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(executar(args))
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    if args.saida:
+        relatorio = {
+            "commit": commit_atual(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "config": {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+            "routes": resultados,
+        }
+        Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        print(f"\nResultados salvos em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+BENCHMARK: response_model (Pydantic) x RespostaJSONRapida (orjson)
+
+Mede a latência de uma listagem de N pessoas pelos dois caminhos de serialização
+da API, com os mesmos documentos em memória (sem MongoDB, para isolar o custo de
+validação + serialização), e confere que o JSON gerado é idêntico.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_resposta_json.py --linhas 1000 --requisicoes 300
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from cpf_lote import calcular_digitos_verificadores  # noqa: E402
+from server import Pessoa, RespostaJSONRapida  # noqa: E402
+
+
+def gerar_documentos(linhas: int) -> List[dict]:
+    """Documentos no formato armazenado no MongoDB (datas em UTC, precisão de milissegundos)"""
+    rng = np.random.default_rng(42)
+    base = rng.integers(0, 10, size=(linhas, 9))
+    digitos = np.concatenate([base, calcular_digitos_verificadores(base)], axis=1)
+    inicio = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    documentos = []
+    for i, linha in enumerate(digitos.tolist()):
+        momento = inicio + timedelta(seconds=i * 37, milliseconds=i % 1000)
+        documentos.append({
+            "cpf": ''.join(map(str, linha)),
+            "nome": f"Pessoa de Teste {i}",
+            "email": f"pessoa{i}@exemplo.com.br",
+            "endereco": f"Rua Exemplo, {i} - Bairro Centro - São Paulo/SP",
+            "created_at": momento,
+            "updated_at": momento,
+        })
+    return documentos
+
+
+def criar_app(documentos: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/pydantic", response_model=List[Pessoa])
+    async def via_response_model():
+        return documentos
+
+    @app.get("/rapida", response_model=List[Pessoa])
+    async def via_orjson():
+        return RespostaJSONRapida(documentos)
+
+    return app
+
+
+def percentil(amostras: List[float], p: float) -> float:
+    return float(np.percentile(amostras, p))
+
+
+async def medir(cliente: httpx.AsyncClient, rota: str, requisicoes: int) -> List[float]:
+    for _ in range(10):  # aquecimento
+        await cliente.get(rota)
+    latencias = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        resposta = await cliente.get(rota)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        resposta.raise_for_status()
+    return latencias
+
+
+async def executar(linhas: int, requisicoes: int) -> None:
+    app = criar_app(gerar_documentos(linhas))
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        antes = (await cliente.get("/pydantic")).json()
+        depois = (await cliente.get("/rapida")).json()
+        assert antes == depois, "Os dois caminhos geraram JSON diferente"
+
+        print(f"Listagem de {linhas} pessoas, {requisicoes} requisições por caminho - JSON idêntico")
+        for nome, rota in (("response_model (Pydantic)", "/pydantic"), ("RespostaJSONRapida (orjson)", "/rapida")):
+            latencias = await medir(cliente, rota, requisicoes)
+            print(
+                f"{nome:30s} p50={percentil(latencias, 50):8.2f}ms  "
+                f"p99={percentil(latencias, 99):8.2f}ms  média={statistics.mean(latencias):8.2f}ms"
+            )
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1000)
+    parser.add_argument('--requisicoes', type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(executar(args.linhas, args.requisicoes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+BENCHMARK: validar_cpf (escalar) x validar_cpfs_em_lote (NumPy)
+
+Gera uma amostra de CPFs (válidos, com formatação, com dígito verificador errado,
+dígitos repetidos e tamanhos inválidos), confere que as duas implementações
+concordam em todas as linhas e compara o tempo de cada uma.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_validar_cpf.py --quantidade 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# server.py lê a configuração do MongoDB ao ser importado (a conexão é preguiçosa)
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from cpf_lote import calcular_digitos_verificadores, validar_cpfs_em_lote  # noqa: E402
+from server import formatar_cpf, validar_cpf  # noqa: E402
+
+
+def gerar_amostra(quantidade: int, semente: int) -> np.ndarray:
+    """Gera CPFs variados: ~70% válidos (metade formatados) e ~30% inválidos de vários tipos"""
+    rng = np.random.default_rng(semente)
+    base = rng.integers(0, 10, size=(quantidade, 9))
+    digitos = np.concatenate([base, calcular_digitos_verificadores(base)], axis=1)
+
+    tipo = rng.integers(0, 10, size=quantidade)
+    # Dígito verificador errado
+    errado = tipo == 7
+    digitos[errado, 10] = (digitos[errado, 10] + 1) % 10
+    # Dígitos todos iguais
+    repetido = tipo == 8
+    digitos[repetido] = rng.integers(0, 10, size=(int(repetido.sum()), 1))
+
+    cpfs = np.array([''.join(map(str, linha)) for linha in digitos.tolist()], dtype=object)
+    formatar = (tipo % 2 == 0) & (tipo < 7)
+    cpfs[formatar] = [f"{c[:3]}.{c[3:6]}.{c[6:9]}-{c[9:]}" for c in cpfs[formatar]]
+    # Tamanho inválido
+    curto = tipo == 9
+    cpfs[curto] = [c[:10] for c in cpfs[curto]]
+    return cpfs.astype(np.str_)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quantidade', type=int, default=1_000_000)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    cpfs = gerar_amostra(args.quantidade, args.semente)
+    lista = cpfs.tolist()
+
+    inicio = time.perf_counter()
+    esperado = [validar_cpf(cpf) for cpf in lista]
+    normalizado_esperado = [formatar_cpf(cpf) if ok else '' for cpf, ok in zip(lista, esperado)]
+    tempo_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    validos, normalizados = validar_cpfs_em_lote(cpfs)
+    tempo_lote = time.perf_counter() - inicio
+
+    assert validos.tolist() == esperado, "validar_cpfs_em_lote divergiu de validar_cpf"
+    assert normalizados.tolist() == normalizado_esperado, "CPFs normalizados divergiram de formatar_cpf"
+
+    print(f"CPFs: {args.quantidade:,} ({int(validos.sum()):,} válidos) - resultados idênticos")
+    print(f"escalar (validar_cpf):         {tempo_escalar:8.3f}s  {args.quantidade / tempo_escalar:14,.0f} CPFs/s")
+    print(f"lote (validar_cpfs_em_lote):   {tempo_lote:8.3f}s  {args.quantidade / tempo_lote:14,.0f} CPFs/s")
+    print(f"aceleração: {tempo_escalar / tempo_lote:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+CACHE LRU COM TTL
+
+Cache em memória, limitado em tamanho, para as respostas de leitura por CPF.
+As entradas expiram após o TTL e, quando o cache enche, a menos usada
+recentemente é descartada. Os contadores permitem dimensionar o cache.
+
+O cache é por processo: com vários workers, cada um tem o seu, e uma escrita
+feita em outro worker só é vista aqui depois que a entrada expira (TTL).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    """
+    Cache LRU com expiração por tempo (TTL).
+
+    Exemplo de BOA PRÁTICA KISS:
+    - Um OrderedDict guarda a ordem de uso (o mais recente fica no fim)
+    - Cada entrada guarda o valor e o instante em que expira
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl_segundos: float, relogio: Callable[[], float] = time.monotonic):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl_segundos = ttl_segundos
+        self._relogio = relogio
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @property
+    def habilitado(self) -> bool:
+        return self.tamanho_maximo > 0 and self.ttl_segundos > 0
+
+    def get(self, chave: Hashable) -> Optional[Any]:
+        """Retorna o valor em cache (marcando-o como usado) ou None se ausente/expirado"""
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            self.misses += 1
+            return None
+
+        valor, expira_em = entrada
+        if expira_em <= self._relogio():
+            del self._entradas[chave]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entradas.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def set(self, chave: Hashable, valor: Any) -> None:
+        """Grava (ou renova) uma entrada, descartando a menos usada se o cache estiver cheio"""
+        if not self.habilitado:
+            return
+        self._entradas[chave] = (valor, self._relogio() + self.ttl_segundos)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.tamanho_maximo:
+            self._entradas.popitem(last=False)
+            self.evictions += 1
+
+    def invalidar(self, chave: Hashable) -> None:
+        """Remove uma entrada, se existir"""
+        self._entradas.pop(chave, None)
+
+    def limpar(self) -> None:
+        """Remove todas as entradas (os contadores são mantidos)"""
+        self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores para dimensionamento: hits, misses, evictions e taxa de acerto"""
+        consultas = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.tamanho_maximo,
+            "ttl_seconds": self.ttl_segundos,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / consultas if consultas else 0.0,
+        }
@@ -0,0 +1,134 @@
+"""
+COMPRESSÃO DAS RESPOSTAS (brotli / gzip)
+
+Middleware ASGI que comprime as respostas conforme o Accept-Encoding do cliente:
+- brotli (quando o pacote `brotli` está instalado) tem preferência sobre gzip
+- Respostas completas menores que `tamanho_minimo` seguem sem compressão
+- Respostas em streaming (NDJSON) são comprimidas parte a parte, com flush a
+  cada parte, para que o cliente receba cada linha assim que ela é gerada
+- Conteúdo já comprimido (.gz, Parquet) e Server-Sent Events não são alterados
+"""
+
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, apenas gzip
+    brotli = None
+
+TIPOS_NAO_COMPRIMIDOS = ('text/event-stream', 'application/gzip', 'application/vnd.apache.parquet')
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """Codificação aceita pelo cliente (br ou gzip), ou None"""
+    aceitas = {
+        parte.split(';')[0].strip().lower()
+        for parte in accept_encoding.split(',')
+        if not parte.replace(' ', '').endswith(';q=0')
+    }
+    if brotli is not None and 'br' in aceitas:
+        return 'br'
+    if 'gzip' in aceitas:
+        return 'gzip'
+    return None
+
+
+class Compressor:
+    """Interface única para os compressores incrementais de brotli e gzip"""
+
+    def __init__(self, codificacao: str, nivel_gzip: int, qualidade_brotli: int):
+        if codificacao == 'br':
+            self._br = brotli.Compressor(quality=qualidade_brotli)
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes, flush: bool) -> bytes:
+        """Comprime uma parte; com flush, tudo o que foi recebido até aqui é emitido"""
+        if self._br is not None:
+            return self._br.process(dados) + (self._br.flush() if flush else b'')
+        return self._gzip.compress(dados) + (self._gzip.flush(zlib.Z_SYNC_FLUSH) if flush else b'')
+
+    def finalizar(self) -> bytes:
+        return self._br.finish() if self._br is not None else self._gzip.flush()
+
+
+class MiddlewareCompressao:
+    """
+    Comprime as respostas HTTP com brotli ou gzip.
+
+    Exemplo de BOA PRÁTICA KISS:
+    - A decisão é tomada uma vez, no início da resposta, pelos headers
+    - Respostas completas são comprimidas de uma vez; streams, parte a parte
+    """
+
+    def __init__(self, app, tamanho_minimo: int = 1000, nivel_gzip: int = 6, qualidade_brotli: int = 4):
+        self.app = app
+        self.tamanho_minimo = tamanho_minimo
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers_requisicao = dict(scope["headers"])
+        codificacao = escolher_codificacao(headers_requisicao.get(b"accept-encoding", b"").decode('latin-1'))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio_resposta = None
+        compressor = None
+        repassar = False
+
+        async def send_comprimido(mensagem):
+            nonlocal inicio_resposta, compressor, repassar
+            if mensagem["type"] == "http.response.start":
+                headers = {nome.lower(): valor for nome, valor in mensagem.get("headers", [])}
+                tipo = headers.get(b"content-type", b"").decode('latin-1')
+                repassar = b"content-encoding" in headers or tipo.startswith(TIPOS_NAO_COMPRIMIDOS)
+                if repassar:
+                    await send(mensagem)
+                else:
+                    inicio_resposta = mensagem  # aguarda o primeiro corpo para decidir
+                return
+
+            if mensagem["type"] != "http.response.body" or repassar:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais_partes = mensagem.get("more_body", False)
+
+            if inicio_resposta is not None:
+                inicio, inicio_resposta = inicio_resposta, None
+                if not mais_partes and len(corpo) < self.tamanho_minimo:
+                    repassar = True
+                    await send(inicio)
+                    await send(mensagem)
+                    return
+                compressor = Compressor(codificacao, self.nivel_gzip, self.qualidade_brotli)
+                headers = [
+                    (nome, valor) for nome, valor in inicio.get("headers", [])
+                    if nome.lower() != b"content-length"
+                ]
+                headers += [(b"content-encoding", codificacao.encode()), (b"vary", b"Accept-Encoding")]
+                if not mais_partes:
+                    corpo = compressor.comprimir(corpo, flush=False) + compressor.finalizar()
+                    headers.append((b"content-length", str(len(corpo)).encode()))
+                    await send({**inicio, "headers": headers})
+                    await send({"type": "http.response.body", "body": corpo})
+                    return
+                await send({**inicio, "headers": headers})
+
+            if mais_partes:
+                await send({"type": "http.response.body", "body": compressor.comprimir(corpo, flush=True),
+                            "more_body": True})
+            else:
+                await send({"type": "http.response.body",
+                            "body": compressor.comprimir(corpo, flush=False) + compressor.finalizar()})
+
+        await self.app(scope, receive, send_comprimido)
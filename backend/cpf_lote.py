@@ -0,0 +1,95 @@
+"""
+VALIDAÇÃO DE CPF EM LOTE (NumPy)
+
+Versão vetorizada de `validar_cpf` (server.py) para importações em massa e
+varreduras de qualidade de dados: em vez de validar um CPF por vez, os N CPFs
+são convertidos em uma matriz de dígitos (N x 11) e os dígitos verificadores
+são calculados para todas as linhas de uma só vez.
+
+As regras são exatamente as mesmas de `validar_cpf`:
+- Remove tudo que não for dígito de 0 a 9
+- Exige exatamente 11 dígitos
+- Rejeita dígitos todos iguais (ex: 111.111.111-11)
+- Confere os dois dígitos verificadores
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+# Pesos do primeiro (10..2) e do segundo (11..2) dígito verificador
+PESOS_DIGITO1 = np.arange(10, 1, -1, dtype=np.int64)
+PESOS_DIGITO2 = np.arange(11, 1, -1, dtype=np.int64)
+
+CODIGO_ZERO = ord('0')
+CODIGO_NOVE = ord('9')
+
+
+def calcular_digitos_verificadores(base: np.ndarray) -> np.ndarray:
+    """
+    Calcula os dois dígitos verificadores para uma matriz de bases de CPF.
+
+    Args:
+        base: Matriz inteira (N x 9) com os 9 primeiros dígitos de cada CPF
+
+    Returns:
+        np.ndarray: Matriz (N x 2) com os dígitos verificadores
+    """
+    base = np.asarray(base, dtype=np.int64)
+    digito1 = (base @ PESOS_DIGITO1 * 10 % 11) % 10
+    digito2 = ((base @ PESOS_DIGITO2[:9] + digito1 * PESOS_DIGITO2[9]) * 10 % 11) % 10
+    return np.stack([digito1, digito2], axis=1)
+
+
+def normalizar_cpfs_em_lote(cpfs: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extrai os dígitos de N CPFs de uma vez, equivalente a `formatar_cpf` em cada um.
+
+    Returns:
+        Tuple: (matriz N x 11 com os dígitos de cada CPF que tem exatamente 11 dígitos
+                - as demais linhas ficam zeradas -, vetor com a quantidade de dígitos de cada CPF)
+    """
+    textos = np.asarray(cpfs if isinstance(cpfs, np.ndarray) else list(cpfs), dtype=np.str_)
+    digitos = np.zeros((textos.size, 11), dtype=np.int8)
+    if textos.size == 0:
+        return digitos, np.zeros(0, dtype=np.int64)
+
+    # Cada string vira uma linha de code points (N x largura máxima)
+    codigos = textos.reshape(-1, 1).view(np.uint32).reshape(textos.size, -1)
+    eh_digito = (codigos >= CODIGO_ZERO) & (codigos <= CODIGO_NOVE)
+    quantidade = eh_digito.sum(axis=1)
+
+    # Só as linhas com 11 dígitos podem ser válidas: a seleção booleana em ordem
+    # de linha devolve exatamente 11 dígitos por linha, já compactados
+    onze = quantidade == 11
+    digitos[onze] = (codigos[onze][eh_digito[onze]] - CODIGO_ZERO).reshape(-1, 11)
+    return digitos, quantidade
+
+
+def validar_cpfs_em_lote(cpfs: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valida N CPFs de uma vez com as mesmas regras de `validar_cpf`.
+
+    Args:
+        cpfs: Sequência (ou array NumPy) de strings, com ou sem formatação
+
+    Returns:
+        Tuple: (máscara booleana com True para os CPFs válidos,
+                array de strings com o CPF normalizado - 11 dígitos - ou '' se inválido)
+
+    Exemplo:
+        >>> validos, normalizados = validar_cpfs_em_lote(["123.456.789-09", "111.111.111-11"])
+        >>> validos.tolist(), normalizados.tolist()
+        ([True, False], ['12345678909', ''])
+    """
+    digitos, quantidade = normalizar_cpfs_em_lote(cpfs)
+
+    # Regras na mesma ordem de validar_cpf: tamanho, dígitos repetidos e verificadores
+    validos = quantidade == 11
+    validos &= np.any(digitos != digitos[:, :1], axis=1)
+    validos &= np.all(calcular_digitos_verificadores(digitos[:, :9]) == digitos[:, 9:], axis=1)
+
+    normalizados = np.zeros(validos.size, dtype='U11')
+    normalizados[validos] = (digitos[validos] + CODIGO_ZERO).astype(np.uint8).view('S11').ravel()
+    return validos, normalizados
@@ -0,0 +1,225 @@
+"""
+FILTRO DE BLOOM DOS CPFs CADASTRADOS
+
+Boa parte das buscas por CPF é de CPFs que não estão cadastrados, e cada uma
+custa uma ida ao MongoDB só para descobrir o 404. O filtro de Bloom responde
+"com certeza não existe" sem consultar o banco; quando responde "pode existir",
+a consulta segue normalmente (falso positivo só custa a consulta de sempre).
+
+- Bits em um array NumPy (1 bit por posição); k posições por CPF, por hash duplo
+- Inclusões entram no filtro na hora; exclusões não podem ser retiradas de um
+  filtro de Bloom e são absorvidas na reconstrução periódica
+- Enquanto o filtro não está pronto (construção na subida), tudo "pode existir"
+
+O filtro é por processo: com vários workers, um CPF cadastrado em outro worker
+só entra aqui na próxima sincronização (ver FiltroCpfs.adicionar). Se as
+sincronizações param (ex: banco indisponível), o filtro fica desatualizado e
+volta a responder "pode existir" para tudo até a próxima sincronização.
+"""
+
+import math
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Constantes do splitmix64, um embaralhador de inteiros de 64 bits rápido e bem distribuído
+GAMA_SPLITMIX = 0x9E3779B97F4A7C15
+MULTIPLICADOR_1 = 0xBF58476D1CE4E5B9
+MULTIPLICADOR_2 = 0x94D049BB133111EB
+MASCARA_64 = (1 << 64) - 1
+# Quantidade de bits ligados em cada byte, para contar os bits do filtro
+BITS_POR_BYTE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def embaralhar(valores: np.ndarray, semente: int) -> np.ndarray:
+    """splitmix64 vetorizado (a multiplicação de uint64 no NumPy já é módulo 2^64)"""
+    z = valores + np.uint64(GAMA_SPLITMIX * semente & MASCARA_64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MULTIPLICADOR_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MULTIPLICADOR_2)
+    return z ^ (z >> np.uint64(31))
+
+
+def embaralhar_um(valor: int, semente: int) -> int:
+    """O mesmo splitmix64 para um único valor, em inteiros do Python (mais rápido que o NumPy para 1)"""
+    z = (valor + GAMA_SPLITMIX * semente) & MASCARA_64
+    z = ((z ^ (z >> 30)) * MULTIPLICADOR_1) & MASCARA_64
+    z = ((z ^ (z >> 27)) * MULTIPLICADOR_2) & MASCARA_64
+    return z ^ (z >> 31)
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom de CPFs (11 dígitos, sem formatação).
+
+    O tamanho é calculado para `capacidade` CPFs com a taxa de falsos positivos
+    desejada: m = -n·ln(p) / ln(2)² bits e k = (m / n)·ln(2) posições por CPF.
+    """
+
+    def __init__(self, capacidade: int, taxa_falsos_positivos: float = 0.01):
+        capacidade = max(capacidade, 1)
+        self.capacidade = capacidade
+        self.bits_total = max(64, math.ceil(-capacidade * math.log(taxa_falsos_positivos) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits_total / capacidade * math.log(2)))
+        self._bits = np.zeros((self.bits_total + 7) // 8, dtype=np.uint8)
+
+    def _posicoes(self, cpfs: Iterable[str]) -> np.ndarray:
+        valores = np.fromiter((int(cpf) for cpf in cpfs), dtype=np.uint64)
+        h1 = embaralhar(valores, 1)
+        h2 = embaralhar(valores, 2) | np.uint64(1)
+        i = np.arange(self.hashes, dtype=np.uint64)
+        return (h1[:, None] + i * h2[:, None]) % np.uint64(self.bits_total)
+
+    def adicionar(self, cpfs: Iterable[str]) -> None:
+        posicoes = self._posicoes(cpfs)
+        np.bitwise_or.at(self._bits, posicoes >> np.uint64(3), np.left_shift(1, posicoes & np.uint64(7)).astype(np.uint8))
+
+    def contem(self, cpf: str) -> bool:
+        """False: o CPF com certeza não foi adicionado. True: pode ter sido"""
+        valor = int(cpf)
+        h1, h2 = embaralhar_um(valor, 1), embaralhar_um(valor, 2) | 1
+        bits = self._bits
+        for i in range(self.hashes):
+            posicao = ((h1 + i * h2) & MASCARA_64) % self.bits_total
+            if not (bits[posicao >> 3] >> (posicao & 7)) & 1:
+                return False
+        return True
+
+    def contem_varios(self, cpfs: List[str]) -> np.ndarray:
+        """Máscara booleana de contem() para uma lista de CPFs, de uma vez"""
+        if not cpfs:
+            return np.zeros(0, dtype=bool)
+        posicoes = self._posicoes(cpfs)
+        return np.all((self._bits[posicoes >> np.uint64(3)] >> (posicoes & np.uint64(7))) & 1, axis=1)
+
+    @property
+    def memoria_bytes(self) -> int:
+        return self._bits.nbytes
+
+    @property
+    def ocupacao(self) -> float:
+        """Fração dos bits ligados"""
+        return int(BITS_POR_BYTE[self._bits].sum(dtype=np.int64)) / self.bits_total
+
+    def estatisticas(self) -> Dict[str, float]:
+        """
+        Taxa de falsos positivos estimada pela ocupação X (ocupacao^k) e total de
+        CPFs distintos estimado por -(m/k)·ln(1 - X): inclusões repetidas não contam.
+        """
+        ocupacao = self.ocupacao
+        return {
+            "memory_bytes": self.memoria_bytes,
+            "bits": self.bits_total,
+            "hashes": self.hashes,
+            "capacity": self.capacidade,
+            "estimated_elements": round(-self.bits_total / self.hashes * math.log(max(1 - ocupacao, 1e-12))),
+            "estimated_false_positive_rate": ocupacao ** self.hashes,
+        }
+
+
+class FiltroCpfs:
+    """
+    Mantém o filtro de Bloom dos CPFs cadastrados: construção, inclusões e reconstrução.
+
+    Exemplo de BOA PRÁTICA KISS:
+    - A reconstrução monta um filtro novo ao lado do atual e só então troca os dois
+    - Inclusões feitas durante a reconstrução vão para os dois filtros
+
+    Args:
+        taxa_falsos_positivos: Taxa desejada logo após cada (re)construção
+        folga: Capacidade do filtro como múltiplo do total de CPFs na construção,
+            para absorver as inclusões até a próxima reconstrução
+        capacidade_minima: Capacidade mínima (coleções pequenas ou vazias)
+        validade_segundos: Tempo sem sincronização após o qual o filtro deixa de ser usado
+    """
+
+    def __init__(
+        self,
+        taxa_falsos_positivos: float = 0.01,
+        folga: float = 2.0,
+        capacidade_minima: int = 100000,
+        validade_segundos: float = math.inf,
+    ):
+        self.taxa_desejada = taxa_falsos_positivos
+        self.folga = folga
+        self.capacidade_minima = capacidade_minima
+        self.validade_segundos = validade_segundos
+        self.sincronizado_em = 0.0
+        self.filtro: Optional[FiltroBloom] = None
+        self._em_construcao: Optional[FiltroBloom] = None
+        self.ausentes = 0
+        self.falsos_positivos = 0
+
+    @property
+    def pronto(self) -> bool:
+        return self.filtro is not None
+
+    @property
+    def atualizado(self) -> bool:
+        """Pronto e sincronizado há menos de `validade_segundos`: só então um "não existe" vale"""
+        return self.filtro is not None and time.monotonic() - self.sincronizado_em < self.validade_segundos
+
+    def registrar_sincronizacao(self) -> None:
+        """As inclusões dos outros workers até agora já foram adicionadas"""
+        self.sincronizado_em = time.monotonic()
+
+    def pode_existir(self, cpf: str) -> bool:
+        if not self.atualizado or self.filtro.contem(cpf):
+            return True
+        self.ausentes += 1
+        return False
+
+    def filtrar(self, cpfs: List[str]) -> List[str]:
+        """CPFs que podem existir (sem o filtro pronto e atualizado, todos)"""
+        if not self.atualizado:
+            return cpfs
+        mascara = self.filtro.contem_varios(cpfs)
+        self.ausentes += int(len(cpfs) - mascara.sum())
+        return [cpf for cpf, talvez in zip(cpfs, mascara.tolist()) if talvez]
+
+    def registrar_falso_positivo(self, quantidade: int = 1) -> None:
+        """O filtro disse "pode existir" e o banco não encontrou o CPF"""
+        if self.atualizado:
+            self.falsos_positivos += quantidade
+
+    def adicionar(self, cpfs: List[str]) -> None:
+        if not cpfs:
+            return
+        for filtro in (self.filtro, self._em_construcao):
+            if filtro is not None:
+                filtro.adicionar(cpfs)
+
+    def precisa_reconstruir(self) -> bool:
+        """A taxa estimada de falsos positivos passou da desejada (o filtro encheu)"""
+        return self.filtro is not None and self.filtro.ocupacao ** self.filtro.hashes > self.taxa_desejada
+
+    async def reconstruir(self, total_estimado: int, lotes: AsyncIterator[List[str]]) -> None:
+        """Constrói um filtro novo a partir de lotes de CPFs e troca pelo atual"""
+        self._em_construcao = FiltroBloom(
+            max(self.capacidade_minima, int(total_estimado * self.folga)), self.taxa_desejada
+        )
+        try:
+            inicio = time.monotonic()
+            async for lote in lotes:
+                self._em_construcao.adicionar(lote)
+            self.filtro = self._em_construcao
+            self.sincronizado_em = inicio
+        finally:
+            self._em_construcao = None
+
+    def estatisticas(self) -> Dict[str, float]:
+        """Memória, elementos, taxa estimada e taxa observada de falsos positivos"""
+        if self.filtro is None:
+            return {"ready": False}
+        consultas_negativas = self.ausentes + self.falsos_positivos
+        return {
+            "ready": True,
+            "stale": not self.atualizado,
+            "synced_seconds_ago": round(time.monotonic() - self.sincronizado_em, 3),
+            **self.filtro.estatisticas(),
+            "short_circuited": self.ausentes,
+            "false_positives": self.falsos_positivos,
+            "observed_false_positive_rate": (
+                self.falsos_positivos / consultas_negativas if consultas_negativas else 0.0
+            ),
+        }
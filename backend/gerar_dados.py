@@ -0,0 +1,333 @@
+"""
+GERADOR DE CADASTROS SINTÉTICOS (TESTES DE ESCALA)
+
+Gera milhões de pessoas plausíveis para reproduzir coleções do tamanho da
+produção: CPFs válidos (dígitos verificadores de `cpf_lote`, o mesmo algoritmo
+de `validar_cpf`) e distintos, nomes, emails e endereços brasileiros. O
+resultado vai para um arquivo NDJSON/CSV (no formato de POST /api/pessoas/bulk)
+ou direto para o MongoDB da API, em insert_many não ordenados.
+
+- Determinístico: a mesma semente gera as mesmas pessoas, na mesma ordem,
+  com qualquer número de processos
+- A geração é dividida em blocos de TAMANHO_BLOCO pessoas, gerados em paralelo
+  (um processo por núcleo); a gravação acontece enquanto os próximos blocos são gerados
+- CPFs distintos: a posição de cada pessoa passa por uma permutação afim das
+  bases de 9 dígitos válidas, então nenhum CPF se repete em até 999.999.990 pessoas
+
+Com --mongo, os documentos são gravados como na importação (campos de busca e
+timestamps) em MONGO_URL/DB_NAME, ou nas partições de MONGO_PARTICOES. Os
+índices da API são criados antes da carga: o índice único do CPF é o que faz
+uma carga repetida com a mesma semente contar duplicados em vez de gravá-los.
+A API em execução não precisa ser reiniciada: o ETag da listagem é derivado
+dos dados e o filtro de CPFs acompanha as inclusões pelo _id.
+
+Uso (a partir de backend/):
+    python gerar_dados.py 1000000 --saida pessoas.ndjson
+    python gerar_dados.py 200000 --saida pessoas.csv --semente 7 --processos 4
+    python gerar_dados.py 5000000 --mongo --lote 1000 --dias 730
+"""
+
+import asyncio
+import csv
+import io
+import json
+import math
+import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+import typer
+
+from cpf_lote import calcular_digitos_verificadores
+
+TAMANHO_BLOCO = 50000
+CAMPOS_ARQUIVO = ("cpf", "nome", "email", "endereco")
+FORMATOS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+# Bases de 9 dígitos válidas: todas menos as 10 de dígitos repetidos (000000000, 111111111...),
+# que geram CPFs de dígitos todos iguais. Entre duas repetidas consecutivas há 111111110 bases.
+BASES_ENTRE_REPETIDAS = 111111110
+TOTAL_BASES = 9 * BASES_ENTRE_REPETIDAS
+
+PRIMEIROS_NOMES = (
+    "Ana", "Maria", "Francisca", "Antônia", "Adriana", "Juliana", "Márcia", "Fernanda", "Patrícia",
+    "Aline", "Sandra", "Camila", "Amanda", "Bruna", "Jéssica", "Letícia", "Júlia", "Luciana",
+    "Vanessa", "Mariana", "Gabriela", "Beatriz", "Larissa", "Raquel", "Cláudia", "Débora",
+    "Helena", "Alice", "Laura", "Valentina", "José", "João", "Antônio", "Francisco", "Carlos",
+    "Paulo", "Pedro", "Lucas", "Luiz", "Marcos", "Luís", "Gabriel", "Rafael", "Daniel",
+    "Marcelo", "Bruno", "Eduardo", "Felipe", "Raimundo", "Rodrigo", "Manoel", "Mateus",
+    "André", "Fernando", "Fábio", "Leonardo", "Gustavo", "Guilherme", "Thiago", "Vinícius",
+    "Sérgio", "Heitor", "Arthur", "Davi", "Bernardo", "Miguel", "Enzo", "Caio", "Otávio",
+)
+SOBRENOMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+    "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes",
+    "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques",
+    "Machado", "Mendes", "Freitas", "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira",
+    "Araújo", "Pinto", "Cavalcanti", "Monteiro", "Moura", "Correia", "Batista", "Campos",
+    "Barros", "Castro", "Rezende", "Azevedo", "Brito", "Melo", "Farias", "Conceição", "Assunção",
+    "Magalhães", "Figueiredo", "Sampaio", "Queiroz", "Xavier", "Borges", "Tavares", "Peixoto",
+)
+PARTICULAS = ("", "", "", "da ", "de ", "dos ")
+DOMINIOS_EMAIL = (
+    "gmail.com", "gmail.com", "gmail.com", "hotmail.com", "hotmail.com", "outlook.com",
+    "yahoo.com.br", "uol.com.br", "bol.com.br", "terra.com.br", "icloud.com", "live.com",
+)
+TIPOS_LOGRADOURO = ("Rua", "Rua", "Rua", "Avenida", "Avenida", "Travessa", "Alameda", "Praça", "Rodovia")
+LOGRADOUROS = (
+    "das Flores", "XV de Novembro", "Sete de Setembro", "Tiradentes", "Getúlio Vargas",
+    "Santos Dumont", "Dom Pedro II", "Rui Barbosa", "Marechal Deodoro", "Floriano Peixoto",
+    "Brasil", "Paulista", "Boa Vista", "São João", "da Paz", "das Palmeiras", "dos Andradas",
+    "Presidente Vargas", "Afonso Pena", "Castro Alves", "Duque de Caxias", "José Bonifácio",
+    "Princesa Isabel", "Barão do Rio Branco", "Monteiro Lobato", "Joaquim Nabuco", "do Comércio",
+    "Independência", "Juscelino Kubitschek", "Osvaldo Cruz", "Bento Gonçalves", "Amazonas",
+)
+BAIRROS = (
+    "Centro", "Centro", "Jardim América", "Vila Nova", "Boa Vista", "Santa Cecília", "Liberdade",
+    "Copacabana", "Tijuca", "Savassi", "Pituba", "Boa Viagem", "Aldeota", "Batel", "Moinhos de Vento",
+    "Jardim Botânico", "Vila Mariana", "Santo Amaro", "Campo Grande", "São Cristóvão", "Industrial",
+)
+CIDADES = (
+    ("São Paulo", "SP"), ("São Paulo", "SP"), ("São Paulo", "SP"), ("Rio de Janeiro", "RJ"),
+    ("Rio de Janeiro", "RJ"), ("Belo Horizonte", "MG"), ("Salvador", "BA"), ("Fortaleza", "CE"),
+    ("Brasília", "DF"), ("Curitiba", "PR"), ("Manaus", "AM"), ("Recife", "PE"), ("Porto Alegre", "RS"),
+    ("Belém", "PA"), ("Goiânia", "GO"), ("Campinas", "SP"), ("São Luís", "MA"), ("Maceió", "AL"),
+    ("Natal", "RN"), ("Teresina", "PI"), ("João Pessoa", "PB"), ("Florianópolis", "SC"),
+    ("Vitória", "ES"), ("Cuiabá", "MT"), ("Campo Grande", "MS"), ("Aracaju", "SE"),
+    ("Ribeirão Preto", "SP"), ("Uberlândia", "MG"), ("Londrina", "PR"), ("Joinville", "SC"),
+)
+
+
+def minusculas_sem_acento(texto: str) -> str:
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower()
+
+
+PRIMEIROS_NOMES_EMAIL = tuple(minusculas_sem_acento(nome) for nome in PRIMEIROS_NOMES)
+SOBRENOMES_EMAIL = tuple(minusculas_sem_acento(nome) for nome in SOBRENOMES)
+
+
+def permutacao(semente: int) -> Tuple[int, int]:
+    """Coeficientes (a, b) da permutação afim i -> (a·i + b) mod TOTAL_BASES da semente"""
+    rng = np.random.default_rng([semente, 0])
+    while True:
+        a = int(rng.integers(1, TOTAL_BASES))
+        if math.gcd(a, TOTAL_BASES) == 1:
+            return a, int(rng.integers(TOTAL_BASES))
+
+
+def gerar_cpfs(semente: int, inicio: int, quantidade: int) -> List[str]:
+    """CPFs válidos das pessoas inicio..inicio+quantidade-1 (distintos entre si para a mesma semente)"""
+    a, b = permutacao(semente)
+    # a < 10^9 e i < 10^9: o produto cabe em int64
+    posicoes = (np.arange(inicio, inicio + quantidade, dtype=np.int64) * a + b) % TOTAL_BASES
+    base = (posicoes // BASES_ENTRE_REPETIDAS) * (BASES_ENTRE_REPETIDAS + 1) + 1 + posicoes % BASES_ENTRE_REPETIDAS
+    digitos = (base[:, None] // 10 ** np.arange(8, -1, -1, dtype=np.int64)) % 10
+    verificadores = calcular_digitos_verificadores(digitos)
+    numeros = base * 100 + verificadores[:, 0] * 10 + verificadores[:, 1]
+    return [f"{numero:011d}" for numero in numeros.tolist()]
+
+
+def gerar_pessoas(semente: int, bloco: int, quantidade: int, dias: int = 0) -> List[dict]:
+    """
+    Pessoas do bloco (da posição bloco·TAMANHO_BLOCO em diante), determinísticas pela semente.
+
+    Com dias > 0, cada pessoa tem "segundos_atras": idade do cadastro, uniforme nos últimos `dias`.
+    """
+    rng = np.random.default_rng([semente, bloco + 1])
+    cpfs = gerar_cpfs(semente, bloco * TAMANHO_BLOCO, quantidade)
+
+    # Sorteios sempre do bloco inteiro: as primeiras N pessoas são as mesmas para qualquer total
+    def sortear(inicio: int, fim: int) -> List[int]:
+        return rng.integers(inicio, fim, size=TAMANHO_BLOCO)[:quantidade].tolist()
+
+    def indices(opcoes: tuple) -> List[int]:
+        return sortear(0, len(opcoes))
+
+    def chance(probabilidade: float) -> np.ndarray:
+        return rng.random(TAMANHO_BLOCO)[:quantidade] < probabilidade
+
+    primeiros, sobrenomes1, sobrenomes2 = indices(PRIMEIROS_NOMES), indices(SOBRENOMES), indices(SOBRENOMES)
+    particulas, dois_sobrenomes = indices(PARTICULAS), chance(0.7).tolist()
+    separadores, sufixos, dominios = indices((".", "_", "")), sortear(1, 1000), indices(DOMINIOS_EMAIL)
+    tipos, logradouros, numeros = indices(TIPOS_LOGRADOURO), indices(LOGRADOUROS), sortear(1, 5000)
+    apartamentos = np.where(chance(0.3), sortear(11, 2405), 0).tolist()
+    bairros, cidades = indices(BAIRROS), indices(CIDADES)
+
+    pessoas = []
+    for i in range(quantidade):
+        nome = f"{PRIMEIROS_NOMES[primeiros[i]]} {SOBRENOMES[sobrenomes1[i]]}"
+        if dois_sobrenomes[i]:
+            nome += f" {PARTICULAS[particulas[i]]}{SOBRENOMES[sobrenomes2[i]]}"
+        sobrenome_email = SOBRENOMES_EMAIL[sobrenomes2[i] if dois_sobrenomes[i] else sobrenomes1[i]]
+        email = (
+            f"{PRIMEIROS_NOMES_EMAIL[primeiros[i]]}{('.', '_', '')[separadores[i]]}{sobrenome_email}"
+            f"{sufixos[i]}@{DOMINIOS_EMAIL[dominios[i]]}"
+        )
+        cidade, uf = CIDADES[cidades[i]]
+        complemento = f", Apto {apartamentos[i]}" if apartamentos[i] else ""
+        endereco = (
+            f"{TIPOS_LOGRADOURO[tipos[i]]} {LOGRADOUROS[logradouros[i]]}, {numeros[i]}{complemento}"
+            f" - {BAIRROS[bairros[i]]}, {cidade}/{uf}"
+        )
+        pessoas.append({"cpf": cpfs[i], "nome": nome, "email": email, "endereco": endereco})
+
+    if dias > 0:
+        for pessoa, segundos in zip(pessoas, sortear(0, dias * 86400)):
+            pessoa["segundos_atras"] = segundos
+    return pessoas
+
+
+def serializar(pessoas: List[dict], formato: str) -> bytes:
+    """Linhas NDJSON ou CSV (sem cabeçalho) com os campos de POST /api/pessoas/bulk (CAMPOS_ARQUIVO)"""
+    if formato == "ndjson":
+        return b"".join(orjson.dumps(pessoa, option=orjson.OPT_APPEND_NEWLINE) for pessoa in pessoas)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(
+        [pessoa[campo] for campo in CAMPOS_ARQUIVO] for pessoa in pessoas
+    )
+    return buffer.getvalue().encode()
+
+
+def gerar_bloco(semente: int, bloco: int, quantidade: int, formato: Optional[str], dias: int):
+    """Tarefa de cada processo: as pessoas do bloco, já serializadas quando o destino é um arquivo"""
+    pessoas = gerar_pessoas(semente, bloco, quantidade, dias)
+    return pessoas if formato is None else serializar(pessoas, formato)
+
+
+def blocos(total: int) -> Iterator[Tuple[int, int]]:
+    """(número do bloco, tamanho) até completar o total"""
+    for bloco, inicio in enumerate(range(0, total, TAMANHO_BLOCO)):
+        yield bloco, min(TAMANHO_BLOCO, total - inicio)
+
+
+class Progresso:
+    """Relatório de pessoas por segundo, no stderr a cada bloco e no stdout (JSON) ao final"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.feitas = 0
+        self.inicio = time.perf_counter()
+
+    @property
+    def duracao(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def avancar(self, quantidade: int) -> None:
+        self.feitas += quantidade
+        typer.echo(f"{self.feitas}/{self.total} pessoas ({self.feitas / self.duracao:,.0f}/s)", err=True)
+
+    def relatorio(self, **extras) -> Dict[str, object]:
+        duracao = self.duracao
+        return {
+            "rows": self.feitas,
+            **extras,
+            "duration_s": round(duracao, 3),
+            "rows_per_second": round(self.feitas / duracao, 1) if duracao else 0.0,
+        }
+
+
+def gravar_arquivo(saida: Path, formato: str, total: int, semente: int, processos: int) -> Dict[str, object]:
+    progresso = Progresso(total)
+    with ProcessPoolExecutor(processos) as executor, saida.open("wb") as arquivo:
+        if formato == "csv":
+            arquivo.write((",".join(CAMPOS_ARQUIVO) + "\n").encode())
+        lista = list(blocos(total))
+        partes = executor.map(
+            gerar_bloco, *zip(*((semente, bloco, tamanho, formato, 0) for bloco, tamanho in lista))
+        )
+        for (_, tamanho), parte in zip(lista, partes):
+            arquivo.write(parte)
+            progresso.avancar(tamanho)
+    return progresso.relatorio(output=str(saida), format=formato, bytes=saida.stat().st_size)
+
+
+async def carregar_mongo(total: int, semente: int, processos: int, tamanho_lote: int, paralelas: int, dias: int) -> Dict[str, object]:
+    """Grava as pessoas como a importação em massa: campos de busca, timestamps e insert_many não ordenado"""
+    from pymongo.errors import BulkWriteError
+
+    from server import CODIGO_CHAVE_DUPLICADA, campos_busca, clientes, criar_indices, db
+
+    progresso = Progresso(total)
+    duplicados = 0
+    vagas = asyncio.Semaphore(paralelas)
+    gravacoes: List[asyncio.Task] = []
+    agora = datetime.now(timezone.utc)
+
+    async def gravar(docs: List[dict]) -> None:
+        nonlocal duplicados
+        try:
+            await db.pessoas.insert_many(docs, ordered=False)
+        except BulkWriteError as erro:
+            falhas = erro.details['writeErrors']
+            if any(falha['code'] != CODIGO_CHAVE_DUPLICADA for falha in falhas):
+                raise
+            duplicados += len(falhas)  # carga repetida com a mesma semente
+        finally:
+            vagas.release()
+        progresso.avancar(len(docs))
+
+    async def enfileirar(pessoas: List[dict]) -> None:
+        """Monta os documentos do bloco e dispara os insert_many, no máximo `paralelas` ao mesmo tempo"""
+        for inicio in range(0, len(pessoas), tamanho_lote):
+            docs = []
+            for pessoa in pessoas[inicio:inicio + tamanho_lote]:
+                criada_em = agora - timedelta(seconds=pessoa.pop("segundos_atras", 0))
+                docs.append({**pessoa, **campos_busca(pessoa), 'created_at': criada_em, 'updated_at': criada_em})
+            await vagas.acquire()
+            gravacoes.append(asyncio.create_task(gravar(docs)))
+
+    laco = asyncio.get_running_loop()
+    try:
+        await criar_indices()
+        with ProcessPoolExecutor(processos) as executor:
+            # Até 2 blocos por processo são gerados adiantados, enquanto os anteriores são gravados
+            pendentes: List[asyncio.Future] = []
+            for bloco, tamanho in blocos(total):
+                pendentes.append(laco.run_in_executor(executor, gerar_bloco, semente, bloco, tamanho, None, dias))
+                if len(pendentes) >= 2 * processos:
+                    await enfileirar(await pendentes.pop(0))
+            for pendente in pendentes:
+                await enfileirar(await pendente)
+            await asyncio.gather(*gravacoes)
+    finally:
+        for cliente in clientes.values():
+            cliente.close()
+    return progresso.relatorio(inserted=progresso.feitas - duplicados, duplicates=duplicados)
+
+
+app = typer.Typer(add_completion=False, help=__doc__, rich_markup_mode=None)
+
+
+@app.command()
+def gerar(
+    quantidade: int = typer.Argument(..., min=1, max=TOTAL_BASES, help="Pessoas a gerar"),
+    saida: Optional[Path] = typer.Option(None, help="Arquivo .ndjson/.jsonl/.csv de saída"),
+    mongo: bool = typer.Option(False, help="Grava direto no MongoDB da API (MONGO_URL/DB_NAME ou MONGO_PARTICOES)"),
+    semente: int = typer.Option(42, min=0, help="Semente: a mesma semente gera as mesmas pessoas"),
+    processos: int = typer.Option(os.cpu_count() or 1, min=1, help="Processos geradores"),
+    lote: int = typer.Option(1000, min=1, help="Documentos por insert_many (--mongo)"),
+    paralelas: int = typer.Option(4, min=1, help="insert_many simultâneos (--mongo)"),
+    dias: int = typer.Option(0, min=0, help="Distribui created_at nos últimos N dias (--mongo; 0: agora)"),
+) -> None:
+    """Gera pessoas sintéticas com CPFs válidos para um arquivo ou para o MongoDB"""
+    if (saida is None) == (not mongo):
+        raise typer.BadParameter("Informe --saida ARQUIVO ou --mongo (só um dos dois)")
+
+    if mongo:
+        relatorio = asyncio.run(carregar_mongo(quantidade, semente, processos, lote, paralelas, dias))
+    else:
+        formato = FORMATOS.get(saida.suffix.lower())
+        if formato is None:
+            raise typer.BadParameter(f"Extensão não suportada: use {', '.join(FORMATOS)}", param_hint="--saida")
+        relatorio = gravar_arquivo(saida, formato, quantidade, semente, processos)
+    typer.echo(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    app()
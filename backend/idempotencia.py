@@ -0,0 +1,191 @@
+"""
+IDEMPOTÊNCIA DAS ESCRITAS (header Idempotency-Key)
+
+O cliente envia uma chave única por operação no header Idempotency-Key. A
+primeira resposta (status < 500) fica registrada; uma nova tentativa com a
+mesma chave recebe essa mesma resposta imediatamente, sem validar de novo e
+sem tocar na collection pessoas. Assim, retentativas após um timeout não caem
+no "CPF já cadastrado" nem repetem a escrita.
+
+- A mesma chave com outra requisição (método, caminho ou corpo diferentes): 422
+- A mesma chave enquanto a primeira requisição ainda está em andamento: 409
+- Respostas 5xx não são registradas: a operação pode ser tentada de novo
+
+O registro fica em memória, por processo (IdempotenciaMemoria), ou em uma
+collection do MongoDB com índice TTL, compartilhada entre os workers
+(IdempotenciaMongo).
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from cache import CacheLRU
+from limites import enviar_erro, identificar_rota
+
+TAMANHO_MAXIMO_CHAVE = 255
+
+
+class IdempotenciaMemoria:
+    """Registro das respostas em um CacheLRU com TTL (por processo)"""
+
+    def __init__(self, tamanho_maximo: int, ttl_segundos: float):
+        self._cache = CacheLRU(tamanho_maximo=tamanho_maximo, ttl_segundos=ttl_segundos)
+
+    async def preparar(self) -> None:
+        pass
+
+    async def reservar(self, chave: str, impressao: str) -> Optional[dict]:
+        """Reserva a chave para esta requisição; se ela já existir, retorna o registro existente"""
+        existente = self._cache.get(chave)
+        if existente is not None:
+            return existente
+        self._cache.set(chave, {"impressao": impressao, "concluida": False})
+        return None
+
+    async def concluir(self, chave: str, registro: dict) -> None:
+        self._cache.set(chave, registro)
+
+    async def liberar(self, chave: str) -> None:
+        self._cache.invalidar(chave)
+
+
+class IdempotenciaMongo:
+    """
+    Registro das respostas em uma collection do MongoDB, compartilhado entre os workers.
+
+    A reserva é um insert_one com a chave no _id (o índice único do _id resolve
+    a disputa entre tentativas simultâneas). Reservas de um worker que caiu no
+    meio da requisição expiram após `reserva_segundos`.
+    """
+
+    def __init__(self, colecao, ttl_segundos: float, reserva_segundos: float = 60):
+        self._colecao = colecao
+        self.ttl_segundos = ttl_segundos
+        self.reserva_segundos = reserva_segundos
+
+    async def preparar(self) -> None:
+        await self._colecao.create_index("expira_em", expireAfterSeconds=0)
+
+    async def reservar(self, chave: str, impressao: str) -> Optional[dict]:
+        expira_em = datetime.now(timezone.utc) + timedelta(seconds=self.reserva_segundos)
+        try:
+            await self._colecao.insert_one(
+                {"_id": chave, "impressao": impressao, "concluida": False, "expira_em": expira_em}
+            )
+            return None
+        except DuplicateKeyError:
+            return await self._colecao.find_one({"_id": chave})
+
+    async def concluir(self, chave: str, registro: dict) -> None:
+        expira_em = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_segundos)
+        await self._colecao.update_one({"_id": chave}, {"$set": {**registro, "expira_em": expira_em}})
+
+    async def liberar(self, chave: str) -> None:
+        await self._colecao.delete_one({"_id": chave})
+
+
+class MiddlewareIdempotencia:
+    """
+    Middleware ASGI que registra e repete as respostas das rotas de escrita
+    que recebem o header Idempotency-Key.
+
+    Args:
+        rotas: Rotas da aplicação (app.router.routes)
+        armazenamento: IdempotenciaMemoria ou IdempotenciaMongo
+        rotas_idempotentes: Rotas atendidas, no formato "MÉTODO /template"
+    """
+
+    def __init__(self, app, rotas: Iterable, armazenamento, rotas_idempotentes: Iterable[str]):
+        self.app = app
+        self.rotas = rotas
+        self.armazenamento = armazenamento
+        self.rotas_idempotentes = set(rotas_idempotentes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        chave_cliente = headers.get(b"idempotency-key")
+        template = identificar_rota(self.rotas, scope) if chave_cliente else None
+        if template is None or f'{scope["method"]} {template}' not in self.rotas_idempotentes:
+            await self.app(scope, receive, send)
+            return
+
+        if len(chave_cliente) > TAMANHO_MAXIMO_CHAVE:
+            await enviar_erro(send, 400, f"Idempotency-Key deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres")
+            return
+
+        # Corpos das rotas de escrita individuais são pequenos: lidos por inteiro para a impressão
+        corpo = b""
+        mais_partes = True
+        while mais_partes:
+            mensagem = await receive()
+            if mensagem["type"] == "http.disconnect":
+                return
+            corpo += mensagem.get("body", b"")
+            mais_partes = mensagem.get("more_body", False)
+
+        impressao = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope["query_string"], corpo])
+        ).hexdigest()
+        # Chaves de clientes diferentes (API keys) nunca colidem
+        chave = headers.get(b"x-api-key", b"").decode('latin-1') + ":" + chave_cliente.decode('latin-1')
+
+        existente = await self.armazenamento.reservar(chave, impressao)
+        if existente is not None:
+            await self.repetir(send, existente, impressao)
+            return
+
+        async def receive_corpo_lido():
+            nonlocal corpo
+            if corpo is not None:
+                mensagem, corpo = {"type": "http.request", "body": corpo, "more_body": False}, None
+                return mensagem
+            return await receive()
+
+        resposta = {"status": None, "headers": [], "corpo": b""}
+
+        async def send_registrando(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+                resposta["headers"] = [
+                    [nome.decode('latin-1'), valor.decode('latin-1')] for nome, valor in mensagem.get("headers", [])
+                ]
+            elif mensagem["type"] == "http.response.body":
+                resposta["corpo"] += mensagem.get("body", b"")
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive_corpo_lido, send_registrando)
+        except BaseException:
+            await self.armazenamento.liberar(chave)
+            raise
+
+        if resposta["status"] is not None and resposta["status"] < 500:
+            await self.armazenamento.concluir(chave, {"impressao": impressao, "concluida": True, **resposta})
+        else:
+            await self.armazenamento.liberar(chave)
+
+    async def repetir(self, send, registro: dict, impressao: str) -> None:
+        """Responde a uma nova tentativa com a resposta registrada (ou 409/422)"""
+        if registro["impressao"] != impressao:
+            await enviar_erro(send, 422, "Idempotency-Key já utilizada com uma requisição diferente")
+            return
+        if not registro["concluida"]:
+            await enviar_erro(
+                send, 409, "Requisição com esta Idempotency-Key ainda em andamento", [(b"retry-after", b"1")]
+            )
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": registro["status"],
+            "headers": [(nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in registro["headers"]]
+            + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": registro["corpo"]})
@@ -0,0 +1,217 @@
+"""
+CONTROLE DE ADMISSÃO: LIMITE DE TAXA E DE CONCORRÊNCIA
+
+Protege o pool do Motor e o MongoDB de um cliente que dispara requisições demais:
+- Limite de taxa por cliente (API key no header X-API-Key, ou IP) com token
+  bucket: `taxa` requisições por segundo, com rajadas de até `capacidade`
+- Limite de requisições simultâneas por rota (método + template da rota)
+
+Requisições acima dos limites são recusadas na hora (429 ou 503, com
+Retry-After) em vez de esperarem em uma fila sem limite: a latência de quem é
+atendido continua limitada mesmo em sobrecarga.
+
+Os baldes ficam em memória, por processo (BaldesMemoria). Com vários workers,
+BaldesMongo compartilha os baldes entre eles em uma collection do MongoDB.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import orjson
+from pymongo import ReturnDocument
+from starlette.routing import Match
+
+from metricas import Contador, registro
+
+requisicoes_recusadas = registro.registrar(Contador(
+    "http_requests_shed_total", "Requisições recusadas pelo controle de admissão", ("reason", "route")))
+
+
+def identificar_rota(rotas: Iterable, scope) -> Optional[str]:
+    """
+    Template da rota que atende a requisição (ex: /api/pessoas/{cpf}), ou None.
+
+    A rota também é registrada no scope: requisições respondidas pelos
+    middlewares aparecem com a rota certa em /metrics.
+    """
+    for rota in rotas:
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            scope["route"] = rota
+            return getattr(rota, "path", None)
+    return None
+
+
+async def enviar_erro(send, status_code: int, detalhe: str, headers: Iterable[Tuple[bytes, bytes]] = ()) -> None:
+    """Responde diretamente do middleware com {"detail": ...}, no mesmo formato do HTTPException"""
+    corpo = orjson.dumps({"detail": detalhe})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+class BaldesMemoria:
+    """
+    Token buckets em memória, um por cliente.
+
+    Exemplo de BOA PRÁTICA KISS:
+    - Cada balde é só (tokens, instante da última consulta); a recarga é calculada na consulta
+    - Um OrderedDict descarta os clientes inativos há mais tempo ao atingir `max_clientes`
+    """
+
+    def __init__(self, max_clientes: int = 100000, relogio=time.monotonic):
+        self.max_clientes = max_clientes
+        self._relogio = relogio
+        self._baldes: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def preparar(self) -> None:
+        pass
+
+    async def consumir(self, chave: str, taxa: float, capacidade: float) -> float:
+        """Consome um token do balde; retorna 0 se permitido ou os segundos até haver um token"""
+        agora = self._relogio()
+        tokens, ultimo = self._baldes.pop(chave, (capacidade, agora))
+        tokens = min(capacidade, tokens + (agora - ultimo) * taxa)
+        espera = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            espera = (1 - tokens) / taxa
+
+        self._baldes[chave] = (tokens, agora)
+        while len(self._baldes) > self.max_clientes:
+            self._baldes.popitem(last=False)
+        return espera
+
+
+class BaldesMongo:
+    """
+    Token buckets compartilhados por todos os workers, um documento por cliente.
+
+    A recarga e o consumo são feitos atomicamente no servidor, com um
+    find_one_and_update em pipeline; clientes inativos expiram por índice TTL.
+    """
+
+    def __init__(self, colecao, expiracao_segundos: int = 3600):
+        self._colecao = colecao
+        self.expiracao_segundos = expiracao_segundos
+
+    async def preparar(self) -> None:
+        await self._colecao.create_index("atualizado_em", expireAfterSeconds=self.expiracao_segundos)
+
+    async def consumir(self, chave: str, taxa: float, capacidade: float) -> float:
+        agora = time.time()
+        recarregado = {"$min": [capacidade, {"$add": [
+            {"$ifNull": ["$tokens", capacidade]},
+            {"$multiply": [{"$subtract": [agora, {"$ifNull": ["$ultimo", agora]}]}, taxa]},
+        ]}]}
+        balde = await self._colecao.find_one_and_update(
+            {"_id": chave},
+            [
+                {"$set": {"tokens": recarregado, "ultimo": agora, "atualizado_em": "$$NOW"}},
+                {"$set": {
+                    "permitido": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return 0.0 if balde["permitido"] else (1 - balde["tokens"]) / taxa
+
+
+class MiddlewareAdmissao:
+    """
+    Middleware ASGI que aplica o limite de taxa por cliente e o limite de
+    concorrência por rota antes de a requisição chegar à aplicação.
+
+    Args:
+        rotas: Rotas da aplicação (app.router.routes), para identificar o template da rota
+        baldes: BaldesMemoria ou BaldesMongo
+        taxa: Requisições por segundo por cliente (0 desabilita o limite de taxa)
+        capacidade: Tamanho da rajada permitida por cliente
+        concorrencia_padrao: Requisições simultâneas por rota (0 desabilita)
+        concorrencia_rotas: Limites específicos, ex: {"GET /api/pessoas/export": 4}
+        isentos: Templates de rota sem limites (healthcheck, métricas)
+        confiar_proxy: Usa o primeiro IP de X-Forwarded-For (apenas atrás de um proxy confiável)
+        chaves_api: Chaves de API conhecidas; só elas identificam o cliente pelo X-API-Key
+    """
+
+    def __init__(
+        self,
+        app,
+        rotas: Iterable,
+        baldes,
+        taxa: float = 0.0,
+        capacidade: float = 0.0,
+        concorrencia_padrao: int = 0,
+        concorrencia_rotas: Optional[Dict[str, int]] = None,
+        isentos: Iterable[str] = (),
+        confiar_proxy: bool = False,
+        chaves_api: Iterable[str] = (),
+    ):
+        self.app = app
+        self.rotas = rotas
+        self.baldes = baldes
+        self.taxa = taxa
+        self.capacidade = max(capacidade, 1.0)
+        self.concorrencia_padrao = concorrencia_padrao
+        self.concorrencia_rotas = concorrencia_rotas or {}
+        self.isentos = set(isentos)
+        self.confiar_proxy = confiar_proxy
+        self.chaves_api = {chave.encode('latin-1') for chave in chaves_api}
+        self.em_andamento: Dict[str, int] = {}
+
+    def identificar_cliente(self, scope) -> str:
+        headers = dict(scope["headers"])
+        # Uma chave qualquer não identifica ninguém: variar o header fugiria do limite
+        # e encheria os baldes. Chaves desconhecidas contam pelo IP.
+        chave_api = headers.get(b"x-api-key")
+        if chave_api in self.chaves_api:
+            return "key:" + chave_api.decode('latin-1')
+        if self.confiar_proxy and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].decode('latin-1').split(',')[0].strip()
+        cliente = scope.get("client")
+        return "ip:" + (cliente[0] if cliente else "desconhecido")
+
+    async def recusar(self, send, status_code: int, espera: float, detalhe: str) -> None:
+        await enviar_erro(send, status_code, detalhe, [(b"retry-after", str(max(1, math.ceil(espera))).encode())])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        template = identificar_rota(self.rotas, scope)
+        if template is None or template in self.isentos:
+            await self.app(scope, receive, send)
+            return
+        rota = f'{scope["method"]} {template}'
+
+        if self.taxa > 0:
+            espera = await self.baldes.consumir(self.identificar_cliente(scope), self.taxa, self.capacidade)
+            if espera > 0:
+                requisicoes_recusadas.inc("rate_limit", rota)
+                await self.recusar(send, 429, espera, "Limite de requisições excedido; tente novamente mais tarde")
+                return
+
+        limite = self.concorrencia_rotas.get(rota, self.concorrencia_padrao)
+        if limite and self.em_andamento.get(rota, 0) >= limite:
+            requisicoes_recusadas.inc("concurrency", rota)
+            await self.recusar(send, 503, 1, "Servidor ocupado nesta rota; tente novamente em instantes")
+            return
+
+        self.em_andamento[rota] = self.em_andamento.get(rota, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.em_andamento[rota] -= 1
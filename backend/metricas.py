@@ -0,0 +1,298 @@
+"""
+MÉTRICAS NO FORMATO PROMETHEUS E SERVER-TIMING
+
+- Contadores, medidores e histogramas simples, em memória, exportados no
+  formato texto do Prometheus (GET /metrics)
+- Middleware ASGI que mede cada requisição (contagem e latência por rota,
+  requisições em andamento) e devolve o header Server-Timing
+- Wrappers de Database/Collection do Motor que medem cada operação no MongoDB
+
+As métricas são por processo: com vários workers, cada um exporta as suas.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Buckets (em segundos) dos histogramas de latência
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def formatar_rotulos(nomes: Tuple[str, ...], valores: Tuple[str, ...], extra: str = '') -> str:
+    pares = [f'{nome}="{valor}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Metrica:
+    """Base das métricas: nome, descrição, tipo e nomes dos rótulos"""
+    tipo = 'untyped'
+
+    def __init__(self, nome: str, descricao: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+
+    def cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+
+    def exportar(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(Metrica):
+    """
+    Counter: valor que só cresce. Com `funcao`, o valor é lido dela no momento da
+    exportação (para contadores mantidos por outro componente, ex: o cache).
+    """
+    tipo = 'counter'
+
+    def __init__(self, *args, funcao: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._funcao = funcao
+
+    def inc(self, *rotulos: str, valor: float = 1.0) -> None:
+        self._valores[rotulos] = self._valores.get(rotulos, 0.0) + valor
+
+    def exportar(self) -> List[str]:
+        valores = {(): self._funcao()} if self._funcao else self._valores
+        return self.cabecalho() + [
+            f"{self.nome}{formatar_rotulos(self.rotulos, chave)} {valor}"
+            for chave, valor in valores.items()
+        ]
+
+
+class Medidor(Contador):
+    """Gauge: valor que sobe e desce (ou é lido de `funcao` na exportação)"""
+    tipo = 'gauge'
+
+    def dec(self, *rotulos: str, valor: float = 1.0) -> None:
+        self.inc(*rotulos, valor=-valor)
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, *args, buckets: Iterable[float] = BUCKETS_LATENCIA, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # rótulos -> [contagem por bucket..., soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observar(self, valor: float, *rotulos: str) -> None:
+        serie = self._series.get(rotulos)
+        if serie is None:
+            serie = self._series[rotulos] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self) -> List[str]:
+        linhas = self.cabecalho()
+        for chave, serie in self._series.items():
+            limites = [*self.buckets, '+Inf']
+            for limite, contagem in zip(limites, serie[:len(self.buckets)] + [serie[-1]]):
+                rotulos = formatar_rotulos(self.rotulos, chave, 'le="%s"' % limite)
+                linhas.append(f"{self.nome}_bucket{rotulos} {contagem}")
+            linhas.append(f"{self.nome}_sum{formatar_rotulos(self.rotulos, chave)} {serie[-2]}")
+            linhas.append(f"{self.nome}_count{formatar_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportadas juntas em /metrics"""
+
+    def __init__(self):
+        self.metricas: List[Metrica] = []
+
+    def registrar(self, metrica: Metrica) -> Metrica:
+        self.metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        return '\n'.join(linha for metrica in self.metricas for linha in metrica.exportar()) + '\n'
+
+
+registro = Registro()
+
+requisicoes_total = registro.registrar(Contador(
+    "http_requests_total", "Requisições HTTP por método, rota e status", ("method", "route", "status")))
+duracao_requisicoes = registro.registrar(Histograma(
+    "http_request_duration_seconds", "Latência das requisições HTTP por método e rota", ("method", "route")))
+requisicoes_em_andamento = registro.registrar(Medidor(
+    "http_requests_in_progress", "Requisições HTTP em andamento por método", ("method",)))
+duracao_mongodb = registro.registrar(Histograma(
+    "mongodb_operation_duration_seconds", "Duração das operações no MongoDB por operação", ("operation",)))
+
+
+# ========================================
+# TEMPOS DA REQUISIÇÃO (Server-Timing)
+# ========================================
+# Cada requisição acumula o tempo gasto no banco e na serialização; o restante
+# do tempo até o início da resposta é validação e lógica da rota ("app").
+tempos_requisicao: ContextVar[Optional[Dict[str, float]]] = ContextVar("tempos_requisicao", default=None)
+
+
+def acumular_tempo(fase: str, segundos: float) -> None:
+    """Soma `segundos` à fase da requisição atual (se houver uma)"""
+    tempos = tempos_requisicao.get()
+    if tempos is not None:
+        tempos[fase] = tempos.get(fase, 0.0) + segundos
+
+
+def header_server_timing(tempos: Dict[str, float], total: float) -> bytes:
+    db = tempos.get('db', 0.0)
+    serializacao = tempos.get('ser', 0.0)
+    app = max(total - db - serializacao, 0.0)
+    return (
+        f'app;desc="validacao e logica";dur={app * 1000:.2f}, '
+        f'db;desc="MongoDB";dur={db * 1000:.2f}, '
+        f'ser;desc="serializacao";dur={serializacao * 1000:.2f}, '
+        f'total;dur={total * 1000:.2f}'
+    ).encode()
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que registra contagem e latência por rota (o template da
+    rota, ex: /api/pessoas/{cpf}), as requisições em andamento e adiciona o header
+    Server-Timing com a divisão do tempo até o início da resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        requisicoes_em_andamento.inc(metodo)
+        tempos = {}
+        token = tempos_requisicao.set(tempos)
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def send_com_timing(mensagem):
+            nonlocal status_code
+            if mensagem["type"] == "http.response.start":
+                status_code = mensagem["status"]
+                headers = list(mensagem.get("headers", []))
+                headers.append((b"server-timing", header_server_timing(tempos, time.perf_counter() - inicio)))
+                mensagem = {**mensagem, "headers": headers}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            duracao = time.perf_counter() - inicio
+            tempos_requisicao.reset(token)
+            requisicoes_em_andamento.dec(metodo)
+            # Template da rota (definido pelo roteamento): evita um rótulo por CPF
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            requisicoes_total.inc(metodo, rota, str(status_code))
+            duracao_requisicoes.observar(duracao, metodo, rota)
+
+
+# ========================================
+# MEDIÇÃO DAS OPERAÇÕES NO MONGODB
+# ========================================
+OPERACOES_MEDIDAS = {
+    'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'find_one_and_update', 'find_one_and_delete', 'bulk_write',
+    'count_documents', 'estimated_document_count', 'create_index', 'distinct',
+}
+
+
+def registrar_operacao(operacao: str, segundos: float) -> None:
+    duracao_mongodb.observar(segundos, operacao)
+    acumular_tempo('db', segundos)
+
+
+def medir_operacao(operacao: str, funcao):
+    async def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await funcao(*args, **kwargs)
+        finally:
+            registrar_operacao(operacao, time.perf_counter() - inicio)
+    return medida
+
+
+class CursorMedido:
+    """Cursor do Motor cujas idas ao banco (to_list e cada lote da iteração) são medidas como `find`/`aggregate`"""
+
+    def __init__(self, cursor, operacao: str):
+        self._cursor = cursor
+        self._operacao = operacao
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._cursor, nome)
+        if not callable(atributo):
+            return atributo
+
+        def encadear(*args, **kwargs):
+            resultado = atributo(*args, **kwargs)
+            # sort/limit/batch_size devolvem o próprio cursor: mantém o wrapper
+            return self if resultado is self._cursor else resultado
+        return encadear
+
+    async def to_list(self, length):
+        inicio = time.perf_counter()
+        try:
+            return await self._cursor.to_list(length)
+        finally:
+            registrar_operacao(self._operacao, time.perf_counter() - inicio)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Só a espera por um lote novo (find/getMore) é uma ida ao banco; os demais
+        # documentos já estão no buffer do cursor e medi-los diluiria o histograma
+        em_buffer = getattr(self._cursor, '_buffer_size', None)
+        if em_buffer is not None and em_buffer():
+            return await self._cursor.__anext__()
+        inicio = time.perf_counter()
+        try:
+            return await self._cursor.__anext__()
+        finally:
+            registrar_operacao(self._operacao, time.perf_counter() - inicio)
+
+
+class ColecaoMedida:
+    """Collection do Motor com as operações medidas; o restante é repassado sem alteração"""
+
+    def __init__(self, colecao):
+        self._colecao = colecao
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._colecao, nome)
+        if nome in OPERACOES_MEDIDAS:
+            return medir_operacao(nome, atributo)
+        return atributo
+
+    def find(self, *args, **kwargs):
+        return CursorMedido(self._colecao.find(*args, **kwargs), 'find')
+
+    def aggregate(self, *args, **kwargs):
+        return CursorMedido(self._colecao.aggregate(*args, **kwargs), 'aggregate')
+
+
+class BancoMedido:
+    """Database do Motor cujas collections (db.pessoas, db["pessoas"]) são ColecaoMedida"""
+
+    def __init__(self, banco):
+        self._banco = banco
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._banco, nome)
+        return ColecaoMedida(atributo) if hasattr(atributo, 'insert_one') else atributo
+
+    def __getitem__(self, nome):
+        return ColecaoMedida(self._banco[nome])
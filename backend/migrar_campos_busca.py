@@ -0,0 +1,49 @@
+"""
+MIGRAÇÃO: CAMPOS DE BUSCA (nome_busca / email_busca)
+
+Preenche os campos sombra usados pelos filtros de GET /api/pessoas nos
+documentos gravados antes da busca indexada existir. Online e retomável,
+com o mesmo mecanismo de lotes de `migrar_timestamps.py`.
+
+Uso (a partir de backend/):
+    python migrar_campos_busca.py --lote 1000 --pausa 0.05
+"""
+
+import asyncio
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from migrar_timestamps import criar_parser, executar_migracao
+from server import campos_busca, client
+
+NOME_MIGRACAO = "campos_busca"
+FILTRO_PENDENTES = {"$or": [{"nome_busca": {"$exists": False}}, {"email_busca": {"$exists": False}}]}
+
+
+def montar_atualizacao(pessoa: dict) -> Optional[UpdateOne]:
+    """Calcula os campos de busca, condicionado a nome/email ainda serem os lidos"""
+    campos = campos_busca(pessoa)
+    if not campos:
+        return None
+    filtro = {"_id": pessoa["_id"], "nome": pessoa.get("nome"), "email": pessoa.get("email")}
+    return UpdateOne(filtro, {"$set": campos})
+
+
+async def migrar(tamanho_lote: int, pausa: float, reiniciar: bool) -> int:
+    return await executar_migracao(
+        NOME_MIGRACAO, FILTRO_PENDENTES, {"nome": 1, "email": 1},
+        montar_atualizacao, tamanho_lote, pausa, reiniciar
+    )
+
+
+def main() -> None:
+    args = criar_parser(__doc__).parse_args()
+    try:
+        asyncio.run(migrar(args.lote, args.pausa, args.reiniciar))
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
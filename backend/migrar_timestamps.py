@@ -0,0 +1,140 @@
+"""
+MIGRAÇÃO: TIMESTAMPS ISO (string) -> DATAS BSON NATIVAS
+
+Converte created_at/updated_at gravados como string ISO pelas versões antigas
+da API para datas BSON nativas, que podem ser indexadas e consultadas por faixa.
+
+A migração é online e retomável:
+- Percorre a collection em lotes ordenados por _id, com pausa opcional entre lotes
+- Cada documento só é alterado se o timestamp ainda for a string lida
+  (uma atualização concorrente da API nunca é sobrescrita)
+- O último _id processado fica salvo em `migracoes`, e uma nova execução
+  continua de onde parou (--reiniciar volta ao início)
+
+Uso (a partir de backend/):
+    python migrar_timestamps.py --lote 1000 --pausa 0.05
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+
+from pymongo import UpdateOne
+
+from server import client, db
+
+logger = logging.getLogger("migracoes")
+
+NOME_MIGRACAO = "timestamps_bson"
+CAMPOS_TIMESTAMP = ('created_at', 'updated_at')
+FILTRO_PENDENTES = {"$or": [{campo: {"$type": "string"}} for campo in CAMPOS_TIMESTAMP]}
+
+
+def montar_atualizacao(pessoa: dict) -> Optional[UpdateOne]:
+    """Monta o UpdateOne que troca as strings ISO do documento por datas nativas"""
+    filtro = {"_id": pessoa["_id"]}
+    novos_valores = {}
+    for campo in CAMPOS_TIMESTAMP:
+        valor = pessoa.get(campo)
+        if isinstance(valor, str):
+            filtro[campo] = valor
+            novos_valores[campo] = datetime.fromisoformat(valor)
+    return UpdateOne(filtro, {"$set": novos_valores}) if novos_valores else None
+
+
+async def executar_migracao(
+    nome: str,
+    filtro_pendentes: dict,
+    projecao: dict,
+    montar: Callable[[dict], Optional[UpdateOne]],
+    tamanho_lote: int,
+    pausa: float,
+    reiniciar: bool,
+) -> int:
+    """
+    Percorre os documentos pendentes em lotes por _id, aplicando as atualizações
+    montadas por `montar` com um bulk_write por lote e salvando o progresso.
+
+    Returns:
+        int: Quantidade de documentos alterados
+    """
+    if reiniciar:
+        await db.migracoes.delete_one({"_id": nome})
+
+    progresso = await db.migracoes.find_one({"_id": nome}) or {}
+    ultimo_id = progresso.get("ultimo_id")
+    convertidos = progresso.get("convertidos", 0)
+
+    while True:
+        filtro = dict(filtro_pendentes)
+        if ultimo_id is not None:
+            filtro["_id"] = {"$gt": ultimo_id}
+
+        lote = await db.pessoas.find(
+            filtro, {"_id": 1, **projecao}
+        ).sort("_id", 1).limit(tamanho_lote).to_list(tamanho_lote)
+        if not lote:
+            break
+
+        operacoes = [op for op in map(montar, lote) if op is not None]
+        if operacoes:
+            resultado = await db.pessoas.bulk_write(operacoes, ordered=False)
+            convertidos += resultado.modified_count
+
+        ultimo_id = lote[-1]["_id"]
+        await db.migracoes.update_one(
+            {"_id": nome},
+            {"$set": {"ultimo_id": ultimo_id, "convertidos": convertidos}},
+            upsert=True
+        )
+        logger.info("%s: lote migrado até _id=%s (%d documentos convertidos)", nome, ultimo_id, convertidos)
+
+        if pausa:
+            await asyncio.sleep(pausa)
+
+    # Documentos atualizados por versões antigas da API durante a migração ficam
+    # antes do cursor: uma nova varredura completa só é necessária se restarem pendentes
+    pendentes = await db.pessoas.count_documents(filtro_pendentes)
+    if pendentes:
+        logger.warning("%s: %d documentos ainda pendentes; execute com --reiniciar", nome, pendentes)
+    else:
+        await db.migracoes.update_one(
+            {"_id": nome},
+            {"$set": {"concluida_em": datetime.now().astimezone()}},
+            upsert=True
+        )
+        logger.info("%s: migração concluída, %d documentos convertidos", nome, convertidos)
+
+    return convertidos
+
+
+async def migrar(tamanho_lote: int, pausa: float, reiniciar: bool) -> int:
+    """Executa a migração dos timestamps e retorna a quantidade de documentos convertidos"""
+    return await executar_migracao(
+        NOME_MIGRACAO, FILTRO_PENDENTES, {campo: 1 for campo in CAMPOS_TIMESTAMP},
+        montar_atualizacao, tamanho_lote, pausa, reiniciar
+    )
+
+
+def criar_parser(descricao: str) -> argparse.ArgumentParser:
+    """Parser com as opções comuns às migrações em lote"""
+    parser = argparse.ArgumentParser(description=descricao, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lote', type=int, default=1000, help="Documentos por lote")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Pausa em segundos entre lotes")
+    parser.add_argument('--reiniciar', action='store_true', help="Ignora o progresso salvo e recomeça")
+    return parser
+
+
+def main() -> None:
+    args = criar_parser(__doc__).parse_args()
+
+    try:
+        asyncio.run(migrar(args.lote, args.pausa, args.reiniciar))
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
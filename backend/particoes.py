@@ -0,0 +1,367 @@
+"""
+PARTICIONAMENTO DAS PESSOAS POR CPF (VÁRIOS MONGODB)
+
+Uma única collection em um único mongod limita a vazão de escrita. Com
+MONGO_PARTICOES, a collection pessoas é distribuída entre N bancos (pares
+URL/DB_NAME), e cada pessoa fica na partição escolhida por um hash estável do
+CPF (jump consistent hash: ao passar de N para N+1 partições, só ~1/(N+1)
+das pessoas muda de lugar).
+
+- Operações por CPF (inserção, busca, atualização, exclusão) vão a uma partição
+- Filtros com {"cpf": {"$in": [...]}} consultam só as partições dos CPFs pedidos
+- Os demais filtros consultam todas as partições ao mesmo tempo (asyncio.gather);
+  cursores ordenados são intercalados pela mesma ordenação, e contagens somadas
+- As outras collections (exclusões, idempotência...) ficam na primeira partição
+
+ColecaoParticionada imita a parte da API de collection do Motor usada pela
+aplicação, para que as rotas não mudem. Mudar o número de partições exige
+redistribuir as pessoas: ver rebalancear.py.
+"""
+
+import asyncio
+import heapq
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult
+
+MULTIPLICADOR_JUMP = 2862933555777941757
+MASCARA_64 = (1 << 64) - 1
+CAMPOS_RESULTADO_LOTE = ("nInserted", "nUpserted", "nMatched", "nModified", "nRemoved")
+
+
+def particao_do_cpf(cpf: str, total: int) -> int:
+    """
+    Partição (0 a total-1) do CPF de 11 dígitos: jump consistent hash (Lamping e Veach)
+    sobre o CRC32 do CPF, estável entre processos e versões do Python.
+    """
+    chave = zlib.crc32(cpf.encode())
+    particao, proxima = -1, 0
+    while proxima < total:
+        particao = proxima
+        chave = (chave * MULTIPLICADOR_JUMP + 1) & MASCARA_64
+        proxima = int((particao + 1) * ((1 << 31) / ((chave >> 33) + 1)))
+    return particao
+
+
+def ler_particoes(valor: str) -> List[Tuple[str, str]]:
+    """
+    Lê MONGO_PARTICOES: lista JSON de pares URL/banco, na ordem das partições.
+
+    Exemplo: [{"url": "mongodb://mongo-0:27017", "db": "pessoas"}, {"url": "mongodb://mongo-1:27017", "db": "pessoas"}]
+
+    Raises:
+        ValueError: se o valor não for uma lista não vazia de {"url", "db"}
+    """
+    particoes = json.loads(valor)
+    if not isinstance(particoes, list) or not particoes:
+        raise ValueError("MONGO_PARTICOES deve ser uma lista JSON não vazia")
+    try:
+        return [(particao["url"], particao["db"]) for particao in particoes]
+    except (KeyError, TypeError):
+        raise ValueError('Cada partição de MONGO_PARTICOES deve ter "url" e "db"')
+
+
+def ordem_bson(valor) -> tuple:
+    """
+    Chave de comparação na ordem de tipos do MongoDB (ausente/null < números < strings
+    < documentos < arrays < binários < ObjectId < booleanos < datas): a intercalação
+    não quebra quando partições trazem tipos diferentes no mesmo campo.
+    """
+    if valor is None:
+        return (0,)
+    if isinstance(valor, bool):
+        return (8, valor)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    if isinstance(valor, str):
+        return (2, valor)
+    if isinstance(valor, dict):
+        return (3,)
+    if isinstance(valor, (list, tuple)):
+        return (4,)
+    if isinstance(valor, bytes):
+        return (5, valor)
+    if isinstance(valor, ObjectId):
+        return (7, valor)
+    if isinstance(valor, datetime):
+        return (9, valor.timestamp())
+    return (10,)
+
+
+class Invertida:
+    """Valor com a comparação invertida, para intercalar ordenações decrescentes"""
+    __slots__ = ("valor",)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, outra: "Invertida") -> bool:
+        return outra.valor < self.valor
+
+    def __eq__(self, outra) -> bool:
+        return self.valor == outra.valor
+
+
+class CursorParticionado:
+    """
+    Cursor sobre várias partições: sort/limit/batch_size/hint são repassados a
+    cada uma, e os documentos são intercalados pela ordenação (k-way merge).
+
+    Campos da ordenação fora da projeção são buscados para a intercalação e
+    retirados dos documentos entregues.
+    """
+
+    def __init__(self, destinos: List[Tuple[Any, dict]], projecao: Optional[dict]):
+        self._destinos = destinos
+        self._projecao = projecao
+        self._ordenacao: List[Tuple[str, int]] = []
+        self._limite = 0
+        self._opcoes: List[Tuple[str, tuple]] = []
+        self._documentos = None
+
+    def sort(self, chave, direcao: Optional[int] = None) -> "CursorParticionado":
+        self._ordenacao = [(chave, direcao or 1)] if isinstance(chave, str) else list(chave)
+        return self
+
+    def limit(self, limite: int) -> "CursorParticionado":
+        self._limite = limite
+        return self
+
+    def batch_size(self, tamanho: int) -> "CursorParticionado":
+        self._opcoes.append(("batch_size", (tamanho,)))
+        return self
+
+    def hint(self, indice) -> "CursorParticionado":
+        self._opcoes.append(("hint", (indice,)))
+        return self
+
+    def _abrir(self):
+        projecao, retirar = self._projecao, ()
+        if projecao is not None and self._ordenacao:
+            if any(valor for campo, valor in projecao.items() if campo != "_id"):
+                # Projeção de inclusão: acrescenta os campos da ordenação que faltam
+                retirar = tuple(campo for campo, _ in self._ordenacao if not projecao.get(campo))
+                projecao = {**projecao, **{campo: 1 for campo in retirar}}
+            else:
+                # Projeção de exclusão (ex: {"_id": 0}): deixa de excluir os campos da ordenação
+                retirar = tuple(campo for campo, _ in self._ordenacao if campo in projecao)
+                projecao = {campo: valor for campo, valor in projecao.items() if campo not in retirar}
+        cursores = []
+        for colecao, filtro in self._destinos:
+            cursor = colecao.find(filtro, projecao)
+            if self._ordenacao:
+                cursor = cursor.sort(self._ordenacao)
+            if self._limite:
+                cursor = cursor.limit(self._limite)
+            for metodo, argumentos in self._opcoes:
+                cursor = getattr(cursor, metodo)(*argumentos)
+            cursores.append(cursor)
+        return self._intercalar(cursores, retirar)
+
+    def _chave(self, doc: dict):
+        return tuple(
+            ordem_bson(doc.get(campo)) if direcao == 1 else Invertida(ordem_bson(doc.get(campo)))
+            for campo, direcao in self._ordenacao
+        )
+
+    async def _intercalar(self, cursores: list, retirar: Tuple[str, ...]):
+        async def proximo(cursor):
+            try:
+                return await cursor.__anext__()
+            except StopAsyncIteration:
+                return None
+
+        heap = []
+        primeiros = await asyncio.gather(*(proximo(cursor) for cursor in cursores))
+        for indice, doc in enumerate(primeiros):
+            if doc is not None:
+                heap.append((self._chave(doc), indice, doc))
+        heapq.heapify(heap)
+
+        entregues = 0
+        while heap and (not self._limite or entregues < self._limite):
+            _, indice, doc = heapq.heappop(heap)
+            seguinte = await proximo(cursores[indice])
+            if seguinte is not None:
+                heapq.heappush(heap, (self._chave(seguinte), indice, seguinte))
+            for campo in retirar:
+                doc.pop(campo, None)
+            entregues += 1
+            yield doc
+
+    def __aiter__(self):
+        if self._documentos is None:
+            self._documentos = self._abrir()
+        return self
+
+    async def __anext__(self):
+        return await self.__aiter__()._documentos.__anext__()
+
+    async def to_list(self, length: Optional[int]) -> List[dict]:
+        documentos = []
+        async for doc in self:
+            documentos.append(doc)
+            if length and len(documentos) >= length:
+                break
+        return documentos
+
+
+class AgregacaoParticionada:
+    """Resultado de aggregate() em todas as partições: um resultado por partição, concatenados"""
+
+    def __init__(self, colecoes: Sequence, pipeline: list):
+        self._colecoes = colecoes
+        self._pipeline = pipeline
+
+    async def to_list(self, length: Optional[int]) -> List[dict]:
+        resultados = await asyncio.gather(
+            *(colecao.aggregate(self._pipeline).to_list(length) for colecao in self._colecoes)
+        )
+        return [doc for resultado in resultados for doc in resultado]
+
+
+class ColecaoParticionada:
+    """
+    Collection distribuída entre as partições pelo CPF.
+
+    Exemplo de BOA PRÁTICA KISS:
+    - A partição sai só do CPF: nenhuma tabela de roteamento para manter
+    - Escritas em lote são divididas por partição e os índices dos erros,
+      remapeados para a lista original, como se fosse uma única collection
+    """
+
+    def __init__(self, colecoes: Sequence):
+        self.colecoes = list(colecoes)
+
+    def colecao_do_cpf(self, cpf: str):
+        return self.colecoes[particao_do_cpf(cpf, len(self.colecoes))]
+
+    def _destinos(self, filtro: Optional[dict]) -> List[Tuple[Any, dict]]:
+        """Partições (e filtro de cada uma) que podem ter documentos do filtro"""
+        filtro = filtro or {}
+        cpf = filtro.get("cpf")
+        if isinstance(cpf, str):
+            return [(self.colecao_do_cpf(cpf), filtro)]
+        if isinstance(cpf, dict) and set(cpf) == {"$in"}:
+            por_particao: Dict[int, List[str]] = {}
+            for valor in cpf["$in"]:
+                por_particao.setdefault(particao_do_cpf(valor, len(self.colecoes)), []).append(valor)
+            return [
+                (self.colecoes[particao], {**filtro, "cpf": {"$in": valores}})
+                for particao, valores in sorted(por_particao.items())
+            ]
+        return [(colecao, filtro) for colecao in self.colecoes]
+
+    def find(self, filtro: Optional[dict] = None, projecao: Optional[dict] = None) -> CursorParticionado:
+        return CursorParticionado(self._destinos(filtro), projecao)
+
+    async def find_one(self, filtro: Optional[dict] = None, projecao: Optional[dict] = None):
+        destinos = self._destinos(filtro)
+        encontrados = await asyncio.gather(*(colecao.find_one(f, projecao) for colecao, f in destinos))
+        return next((doc for doc in encontrados if doc is not None), None)
+
+    async def find_one_and_update(self, filtro: dict, atualizacao, **opcoes):
+        return await self.colecao_do_cpf(filtro["cpf"]).find_one_and_update(filtro, atualizacao, **opcoes)
+
+    async def insert_one(self, doc: dict):
+        return await self.colecao_do_cpf(doc["cpf"]).insert_one(doc)
+
+    async def insert_many(self, docs: List[dict], ordered: bool = False) -> InsertManyResult:
+        resultado = await self._dividir_lote(docs, [doc["cpf"] for doc in docs], "insert_many", ordered)
+        return InsertManyResult([doc["_id"] for doc in docs], resultado.acknowledged)
+
+    async def bulk_write(
+        self, operacoes: list, ordered: bool = False, cpfs: Optional[Sequence[Optional[str]]] = None
+    ) -> BulkWriteResult:
+        """
+        bulk_write dividido por partição: `cpfs[i]` é o CPF da operação i e escolhe a
+        partição dela. Sem `cpfs` (ex: operações por _id, nas migrações) ou com None
+        no lugar do CPF, a operação vai a todas as partições.
+        """
+        if cpfs is None:
+            cpfs = [None] * len(operacoes)
+        elif len(cpfs) != len(operacoes):
+            raise ValueError("cpfs deve ter um CPF (ou None) por operação")
+        return await self._dividir_lote(operacoes, cpfs, "bulk_write", ordered)
+
+    async def _dividir_lote(self, itens: list, cpfs: Sequence[Optional[str]], metodo: str, ordered: bool) -> BulkWriteResult:
+        """Executa o lote dividido por partição; soma os resultados e remapeia os índices dos erros"""
+        por_particao: Dict[int, List[int]] = {}
+        for indice, cpf in enumerate(cpfs):
+            particoes = range(len(self.colecoes)) if not isinstance(cpf, str) else [particao_do_cpf(cpf, len(self.colecoes))]
+            for particao in particoes:
+                por_particao.setdefault(particao, []).append(indice)
+        particoes = sorted(por_particao)
+        respostas = await asyncio.gather(*(
+            getattr(self.colecoes[particao], metodo)([itens[i] for i in por_particao[particao]], ordered=ordered)
+            for particao in particoes
+        ), return_exceptions=True)
+
+        total = {campo: 0 for campo in CAMPOS_RESULTADO_LOTE}
+        total.update({"upserted": [], "writeErrors": [], "writeConcernErrors": []})
+        for particao, resposta in zip(particoes, respostas):
+            indices = por_particao[particao]
+            if isinstance(resposta, BulkWriteError):
+                detalhes = resposta.details
+            elif isinstance(resposta, BaseException):
+                raise resposta
+            elif metodo == "insert_many":
+                detalhes = {"nInserted": len(resposta.inserted_ids)}
+            else:
+                detalhes = resposta.bulk_api_result
+            for campo in CAMPOS_RESULTADO_LOTE:
+                total[campo] += detalhes.get(campo, 0)
+            for chave in ("upserted", "writeErrors"):
+                total[chave] += [{**item, "index": indices[item["index"]]} for item in detalhes.get(chave, [])]
+            total["writeConcernErrors"] += detalhes.get("writeConcernErrors", [])
+
+        if total["writeErrors"] or total["writeConcernErrors"]:
+            total["writeErrors"].sort(key=lambda erro: erro["index"])
+            raise BulkWriteError(total)
+        return BulkWriteResult(total, True)
+
+    async def delete_many(self, filtro: dict) -> DeleteResult:
+        resultados = await asyncio.gather(*(colecao.delete_many(f) for colecao, f in self._destinos(filtro)))
+        return DeleteResult({"n": sum(resultado.deleted_count for resultado in resultados)}, True)
+
+    async def count_documents(self, filtro: dict) -> int:
+        return sum(await asyncio.gather(*(colecao.count_documents(f) for colecao, f in self._destinos(filtro))))
+
+    async def estimated_document_count(self) -> int:
+        return sum(await asyncio.gather(*(colecao.estimated_document_count() for colecao in self.colecoes)))
+
+    def aggregate(self, pipeline: list) -> AgregacaoParticionada:
+        return AgregacaoParticionada(self.colecoes, pipeline)
+
+    async def create_index(self, chaves, **opcoes) -> str:
+        nomes = await asyncio.gather(*(colecao.create_index(chaves, **opcoes) for colecao in self.colecoes))
+        return nomes[0]
+
+
+class BancoParticionado:
+    """
+    Database cuja collection pessoas é particionada; as demais collections e os
+    comandos (ping, collMod...) vão para o banco da primeira partição.
+    """
+
+    def __init__(self, bancos: Sequence):
+        self.bancos = list(bancos)
+        self.pessoas = ColecaoParticionada([banco.pessoas for banco in self.bancos])
+
+    def __getattr__(self, nome):
+        return getattr(self.bancos[0], nome)
+
+    def __getitem__(self, nome):
+        return self.pessoas if nome == "pessoas" else self.bancos[0][nome]
+
+    async def command(self, *args, **kwargs):
+        """Comando na primeira partição; ping é enviado a todas"""
+        if args and args[0] == "ping":
+            respostas = await asyncio.gather(*(banco.command(*args, **kwargs) for banco in self.bancos))
+            return respostas[0]
+        return await self.bancos[0].command(*args, **kwargs)
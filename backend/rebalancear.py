@@ -0,0 +1,146 @@
+"""
+REBALANCEAMENTO DAS PARTIÇÕES DE PESSOAS
+
+Muda o número (ou a lista) de partições de MONGO_PARTICOES: percorre cada
+partição de origem e move para a partição de destino as pessoas cujo CPF passa
+a pertencer a outra partição na nova configuração. Com o jump consistent hash,
+ao acrescentar uma partição só ~1/N das pessoas muda de lugar.
+
+- Cada lote é copiado para o destino (upsert pelo _id) e só então removido da origem:
+  se o processo parar no meio, basta executar de novo
+- Um CPF que já existe no destino com outro _id (cadastrado durante a migração)
+  é contado como conflito e fica na origem, para análise
+- As demais collections (versões, exclusões, idempotência...) ficam na primeira
+  partição: mantenha a mesma primeira partição na nova configuração
+
+Execute com as escritas pausadas (ou em janela de manutenção) e, ao final,
+reinicie a API com a nova MONGO_PARTICOES.
+
+Uso (a partir de backend/):
+    python rebalancear.py --para '[{"url": "mongodb://m0:27017", "db": "pessoas"}, {"url": "mongodb://m1:27017", "db": "pessoas"}]'
+    python rebalancear.py --de "$MONGO_PARTICOES" --para "$NOVAS_PARTICOES" --simular
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from particoes import ler_particoes, particao_do_cpf
+
+Particao = Tuple[Tuple[str, str], object]  # ((url, banco), collection pessoas)
+
+
+async def mover_lote(origem, destino, docs: List[dict]) -> Tuple[int, int]:
+    """Copia os documentos para o destino e remove da origem os copiados; retorna (movidos, conflitos)"""
+    falhas = set()
+    try:
+        await destino.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False
+        )
+    except BulkWriteError as erro:
+        falhas = {falha['index'] for falha in erro.details['writeErrors']}
+    copiados = [doc["_id"] for indice, doc in enumerate(docs) if indice not in falhas]
+    if copiados:
+        await origem.delete_many({"_id": {"$in": copiados}})
+    return len(copiados), len(falhas)
+
+
+async def rebalancear(
+    origens: List[Particao], destinos: List[Particao], tamanho_lote: int = 1000, simular: bool = False
+) -> Dict[str, object]:
+    """
+    Move as pessoas das partições de origem para as de destino conforme o hash do CPF.
+
+    Returns:
+        Dict: Pessoas lidas, movidas por par origem->destino, conflitos e duração
+    """
+    inicio = time.perf_counter()
+    chaves_destino = [chave for chave, _ in destinos]
+    if not simular:
+        await asyncio.gather(*(
+            colecao.create_index([("cpf", ASCENDING)], unique=True) for _, colecao in destinos
+        ))
+
+    lidas = conflitos = 0
+    movidas: Counter = Counter()
+    for numero_origem, (chave_origem, origem) in enumerate(origens):
+        pendentes: Dict[int, List[dict]] = {}
+        async for doc in origem.find({}).batch_size(tamanho_lote):
+            lidas += 1
+            numero_destino = particao_do_cpf(doc["cpf"], len(destinos))
+            if chaves_destino[numero_destino] == chave_origem:
+                continue
+            lote = pendentes.setdefault(numero_destino, [])
+            lote.append(doc)
+            if len(lote) >= tamanho_lote:
+                pendentes[numero_destino] = []
+                movidos, falhas = (len(lote), 0) if simular else await mover_lote(origem, destinos[numero_destino][1], lote)
+                movidas[f"{numero_origem}->{numero_destino}"] += movidos
+                conflitos += falhas
+        for numero_destino, lote in pendentes.items():
+            if lote:
+                movidos, falhas = (len(lote), 0) if simular else await mover_lote(origem, destinos[numero_destino][1], lote)
+                movidas[f"{numero_origem}->{numero_destino}"] += movidos
+                conflitos += falhas
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "simulated": simular,
+        "read": lidas,
+        "moved": sum(movidas.values()),
+        "moved_by_partition": dict(sorted(movidas.items())),
+        "conflicts": conflitos,
+        "duration_s": round(duracao, 3),
+        "rows_per_second": round(lidas / duracao, 1) if duracao else 0.0,
+    }
+
+
+def abrir_particoes(particoes: List[Tuple[str, str]], clientes: Dict[str, AsyncIOMotorClient]) -> List[Particao]:
+    for url, _ in particoes:
+        if url not in clientes:
+            clientes[url] = AsyncIOMotorClient(url)
+    return [((url, banco), clientes[url][banco].pessoas) for url, banco in particoes]
+
+
+async def executar(args) -> Dict[str, object]:
+    clientes: Dict[str, AsyncIOMotorClient] = {}
+    try:
+        origens = abrir_particoes(ler_particoes(args.de), clientes)
+        destinos = abrir_particoes(ler_particoes(args.para), clientes)
+        if origens[0][0] != destinos[0][0]:
+            print("Aviso: a primeira partição mudou; as demais collections continuam em", origens[0][0], file=sys.stderr)
+        return await rebalancear(origens, destinos, args.lote, args.simular)
+    finally:
+        for cliente in clientes.values():
+            cliente.close()
+
+
+def main() -> None:
+    configuracao_atual = os.environ.get('MONGO_PARTICOES') or json.dumps(
+        [{"url": os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), "db": os.environ.get('DB_NAME', 'test_database')}]
+    )
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--de', default=configuracao_atual, help="Partições atuais (padrão: MONGO_PARTICOES ou MONGO_URL/DB_NAME)")
+    parser.add_argument('--para', required=True, help="Novas partições, no formato de MONGO_PARTICOES")
+    parser.add_argument('--lote', type=int, default=1000, help="Documentos por lote movido")
+    parser.add_argument('--simular', action='store_true', help="Só conta o que seria movido")
+    args = parser.parse_args()
+
+    try:
+        relatorio = asyncio.run(executar(args))
+    except ValueError as erro:
+        sys.exit(str(erro))
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, field_validator
+from pymongo import ASCENDING, DESCENDING, TEXT, DeleteOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+from agrupamento import AgrupadorInclusoes
+from cache import CacheLRU
+from compressao import MiddlewareCompressao
+from filtro_bloom import FiltroCpfs
+from limites import BaldesMemoria, BaldesMongo, MiddlewareAdmissao
+from particoes import BancoParticionado, ler_particoes
+from idempotencia import IdempotenciaMemoria, IdempotenciaMongo, MiddlewareIdempotencia
+from cpf_lote import validar_cpfs_em_lote
+from metricas import BancoMedido, Contador, Medidor, MiddlewareMetricas, acumular_tempo, registro
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
+from collections import Counter
+import binascii
+import csv
+import email.utils
+import hashlib
+import heapq
+import io
+import json
 import re
+import unicodedata
+import zlib
+import orjson
 
 
 ROOT_DIR = Path(__file__).parent
@@ -17,11 +45,141 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+
+
+def opcoes_pool_mongo() -> dict:
+    """
+    Configuração do pool de conexões do Motor a partir do ambiente.
+    
+    O pool é por processo: com N workers, o MongoDB recebe até N x MONGO_MAX_POOL_SIZE conexões.
+    """
+    opcoes = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+        "readPreference": os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+    }
+    for variavel, opcao in (
+        ('MONGO_MAX_IDLE_TIME_MS', 'maxIdleTimeMS'),
+        ('MONGO_WAIT_QUEUE_TIMEOUT_MS', 'waitQueueTimeoutMS'),
+        ('MONGO_SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS'),
+        ('MONGO_CONNECT_TIMEOUT_MS', 'connectTimeoutMS'),
+        ('MONGO_SOCKET_TIMEOUT_MS', 'socketTimeoutMS'),
+    ):
+        if variavel in os.environ:
+            opcoes[opcao] = int(os.environ[variavel])
+    return opcoes
+
+
+# Particionamento (opcional): MONGO_PARTICOES lista os pares URL/banco entre os quais
+# a collection pessoas é distribuída pelo CPF; sem ele, um único banco (MONGO_URL/DB_NAME)
+particoes_mongo = (
+    ler_particoes(os.environ['MONGO_PARTICOES']) if os.environ.get('MONGO_PARTICOES')
+    else [(mongo_url, os.environ['DB_NAME'])]
+)
+# tz_aware: os timestamps (datas BSON nativas, sempre em UTC) voltam como datetime com fuso.
+# Um cliente (pool) por servidor: partições no mesmo servidor compartilham o pool
+clientes = {
+    url: AsyncIOMotorClient(url, tz_aware=True, **opcoes_pool_mongo())
+    for url in dict.fromkeys(url for url, _ in particoes_mongo)
+}
+# BancoMedido: cada operação no MongoDB alimenta /metrics e o header Server-Timing
+bancos = [BancoMedido(clientes[url][nome]) for url, nome in particoes_mongo]
+db = bancos[0] if len(bancos) == 1 else BancoParticionado(bancos)
+# Cliente da primeira partição (usado pelos scripts de migração)
+client = clientes[particoes_mongo[0][0]]
+
+# Controle de admissão: baldes do limite de taxa por processo ou compartilhados no MongoDB
+baldes_limite_taxa = (
+    BaldesMongo(db.limites_taxa)
+    if os.environ.get('RATE_LIMIT_BACKEND', 'memoria') == 'mongodb'
+    else BaldesMemoria()
+)
+
+# Respostas registradas pelo Idempotency-Key, por processo ou compartilhadas no MongoDB.
+# Com vários workers, a nova tentativa pode cair em outro processo, que não a
+# reconheceria no registro em memória: o padrão passa a ser o MongoDB e a
+# combinação insegura é recusada na inicialização.
+TTL_IDEMPOTENCIA = float(os.environ.get('IDEMPOTENCIA_TTL_HORAS', '24')) * 3600
+WORKERS = int(os.environ.get('WEB_CONCURRENCY') or '1')
+BACKEND_IDEMPOTENCIA = os.environ.get('IDEMPOTENCIA_BACKEND', 'mongodb' if WORKERS > 1 else 'memoria')
+if BACKEND_IDEMPOTENCIA == 'memoria' and WORKERS > 1:
+    raise ValueError(
+        f"IDEMPOTENCIA_BACKEND=memoria não funciona com WEB_CONCURRENCY={WORKERS}: use IDEMPOTENCIA_BACKEND=mongodb"
+    )
+registro_idempotencia = (
+    IdempotenciaMongo(db.idempotencia, ttl_segundos=TTL_IDEMPOTENCIA)
+    if BACKEND_IDEMPOTENCIA == 'mongodb'
+    else IdempotenciaMemoria(
+        tamanho_maximo=int(os.environ.get('IDEMPOTENCIA_TAMANHO', '100000')), ttl_segundos=TTL_IDEMPOTENCIA
+    )
+)
+
+# Estatísticas agregadas: poucas entradas, recalculadas no máximo uma vez por janela
+cache_estatisticas = CacheLRU(
+    tamanho_maximo=32,
+    ttl_segundos=float(os.environ.get('PESSOAS_STATS_TTL', '300')),
+)
+
+# Cache de leitura por CPF (PESSOAS_CACHE_TAMANHO=0 desabilita). Cada worker só invalida
+# o próprio cache: com vários workers, uma alteração feita em outro processo fica invisível
+# por até PESSOAS_CACHE_TTL segundos, por isso o padrão passa a ser desabilitado.
+cache_pessoas = CacheLRU(
+    tamanho_maximo=int(os.environ.get('PESSOAS_CACHE_TAMANHO', '0' if WORKERS > 1 else '10000')),
+    ttl_segundos=float(os.environ.get('PESSOAS_CACHE_TTL', '60')),
+)
+
+# Agrupamento das inclusões (opcional): POSTs simultâneos gravados em um insert_many
+# quando o lote junta AGRUPAMENTO_TAMANHO documentos ou espera AGRUPAMENTO_ESPERA_MS;
+# os CPFs gravados entram no filtro de Bloom uma vez por lote
+agrupador_inclusoes = AgrupadorInclusoes(
+    lambda docs: db.pessoas.insert_many(docs, ordered=False),
+    tamanho_maximo=int(os.environ.get('AGRUPAMENTO_TAMANHO', '500')),
+    espera_ms=float(os.environ.get('AGRUPAMENTO_ESPERA_MS', '5')),
+    apos_gravar=lambda docs: filtro_cpfs.adicionar([doc['cpf'] for doc in docs]),
+) if os.environ.get('AGRUPAR_INCLUSOES', 'false').lower() == 'true' else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação.
+    
+    Na subida: abre o pool e confirma que o MongoDB responde (ping), garante os
+    índices e faz uma consulta de aquecimento, para que a primeira requisição
+    tenha a mesma latência das seguintes. Só então o worker aceita tráfego.
+    Em seguida inicia, em segundo plano, o arquivador das pessoas excluídas e, se
+    habilitados, o filtro de CPFs e o agrupamento das inclusões.
+    Na descida: o servidor já esperou as requisições em andamento terminarem;
+    as inclusões na fila são gravadas, as tarefas de segundo plano são
+    interrompidas e as conexões do pool são fechadas.
+    """
+    await db.command("ping")
+    await criar_indices()
+    await baldes_limite_taxa.preparar()
+    await registro_idempotencia.preparar()
+    await db.pessoas.find_one({"cpf": {"$exists": True}}, PROJECAO_PESSOA)
+    # A primeira validação de email/CPF carrega módulos e compila validadores
+    Pessoa(**PessoaCreate(
+        cpf="529.982.247-25", nome="Aquecimento", email="aquecimento@exemplo.com", endereco="Rua Aquecimento, 1"
+    ).model_dump())
+    logger.info("MongoDB pronto (%d partição(ões), pool: %s)", len(bancos), opcoes_pool_mongo())
+    tarefas = [asyncio.create_task(arquivar_periodicamente())]
+    if FILTRO_CPFS_HABILITADO:
+        tarefas.append(asyncio.create_task(manter_filtro_cpfs()))
+    if agrupador_inclusoes is not None:
+        await agrupador_inclusoes.iniciar()
+    yield
+    if agrupador_inclusoes is not None:
+        await agrupador_inclusoes.encerrar()
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    for cliente in clientes.values():
+        cliente.close()
+
 
 # Create the main app without a prefix
-app = FastAPI(title="API de Cadastro de Pessoas", version="1.0.0")
+app = FastAPI(title="API de Cadastro de Pessoas", version="1.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -90,6 +248,472 @@ def formatar_cpf(cpf: str) -> str:
     return re.sub(r'[^0-9]', '', cpf)
 
 
+# ========================================
+# CAMPOS DE BUSCA (SOMBRA)
+# ========================================
+# nome_busca e email_busca guardam nome e email em minúsculas e sem acentos,
+# para que a busca por prefixo/igualdade use índice comum, sem regex case-insensitive.
+def normalizar_busca(texto: str) -> str:
+    """Normaliza texto para busca: sem acentos, minúsculo e com espaços simples"""
+    sem_acentos = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return ' '.join(sem_acentos.lower().split())
+
+
+def campos_busca(dados: dict) -> dict:
+    """Calcula os campos sombra de busca a partir dos campos presentes em `dados`"""
+    campos = {}
+    if dados.get('nome') is not None:
+        campos['nome_busca'] = normalizar_busca(dados['nome'])
+    if dados.get('email') is not None:
+        campos['email_busca'] = dados['email'].strip().lower()
+    return campos
+
+
+def montar_filtro_busca(nome: Optional[str], email: Optional[str], endereco: Optional[str]) -> dict:
+    """
+    Monta o filtro do MongoDB para a listagem, usando apenas consultas indexadas:
+    - nome: prefixo em nome_busca (regex ancorada usa o índice como faixa)
+    - email: igualdade em email_busca
+    - endereco: busca textual no índice de texto (palavras, sem acento)
+    """
+    filtro = {}
+    if nome:
+        filtro['nome_busca'] = {"$regex": "^" + re.escape(normalizar_busca(nome))}
+    if email:
+        filtro['email_busca'] = email.strip().lower()
+    if endereco:
+        filtro['$text'] = {"$search": endereco}
+    return filtro
+
+
+# ========================================
+# RESPOSTA RÁPIDA PARA AS ROTAS DE LEITURA
+# ========================================
+# Os documentos já foram validados na escrita: as rotas de leitura projetam
+# exatamente os campos de Pessoa e os serializam direto com orjson, sem
+# revalidar cada linha pelo response_model. O JSON gerado é o mesmo
+# (mesmos campos, mesma ordem, datas UTC terminadas em "Z").
+PROJECAO_PESSOA = {
+    "_id": 0, "cpf": 1, "nome": 1, "email": 1, "endereco": 1, "created_at": 1, "updated_at": 1
+}
+CAMPOS_PESSOA = tuple(campo for campo, incluir in PROJECAO_PESSOA.items() if incluir)
+CAMPOS_DATA = ("created_at", "updated_at")
+
+
+def normalizar_instante(valor):
+    """
+    Data gravada -> datetime UTC. Documentos anteriores às datas BSON nativas
+    (ver migrar_timestamps.py) guardam strings ISO 8601, com ou sem fuso.
+    """
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if isinstance(valor, datetime) and valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor
+
+
+def normalizar_datas(pessoa: dict) -> dict:
+    """Normaliza created_at/updated_at do documento (no lugar) para todas as rotas de leitura"""
+    for campo in CAMPOS_DATA:
+        if campo in pessoa:
+            pessoa[campo] = normalizar_instante(pessoa[campo])
+    return pessoa
+
+
+def formatar_instante(valor: datetime) -> str:
+    """Data no mesmo formato das respostas JSON (UTC terminado em "Z")"""
+    return orjson.dumps(valor, option=orjson.OPT_UTC_Z)[1:-1].decode()
+
+
+class RespostaJSONRapida(ORJSONResponse):
+    """Resposta JSON serializada com orjson, com datas UTC no mesmo formato do Pydantic"""
+    def render(self, content) -> bytes:
+        inicio = time.perf_counter()
+        corpo = orjson.dumps(content, option=orjson.OPT_UTC_Z)
+        acumular_tempo('ser', time.perf_counter() - inicio)
+        return corpo
+
+
+# ========================================
+# CAMPOS ESPARSOS (?fields=cpf,nome)
+# ========================================
+# Consumidores de alto volume (ex: um dropdown) pedem só os campos que usam: a
+# projeção do MongoDB traz apenas esses campos (e os necessários para o cursor
+# ou o ETag), e a resposta é montada sem os demais. A listagem por CPF pedindo
+# só cpf e nome é respondida pelo índice (cpf, nome, deleted_at), sem ler os
+# documentos (consulta coberta).
+INDICE_CPF_NOME = [("cpf", ASCENDING), ("nome", ASCENDING), ("deleted_at", ASCENDING)]
+CAMPOS_INDICE_CPF_NOME = {"cpf", "nome"}
+
+
+def campos_solicitados(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Valida ?fields= contra os campos de Pessoa.
+    
+    Returns:
+        Tuple: Campos pedidos, na ordem do modelo; None se fields não foi enviado (todos)
+    
+    Raises:
+        HTTPException: 400 se algum campo não existir em Pessoa
+    """
+    if fields is None:
+        return None
+    pedidos = {campo.strip() for campo in fields.split(',') if campo.strip()}
+    invalidos = sorted(pedidos - set(Pessoa.model_fields))
+    if invalidos or not pedidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos em fields: {', '.join(invalidos) or '(vazio)'}. "
+                   f"Use: {', '.join(Pessoa.model_fields)}"
+        )
+    return tuple(campo for campo in Pessoa.model_fields if campo in pedidos)
+
+
+def projecao_esparsa(campos: Optional[Tuple[str, ...]], internos: Tuple[str, ...] = ()) -> dict:
+    """Projeção com os campos pedidos e os usados internamente (cursor, ETag)"""
+    if campos is None:
+        return PROJECAO_PESSOA
+    return {"_id": 0, **{campo: 1 for campo in (*campos, *internos)}}
+
+
+def recortar(pessoa: dict, campos: Optional[Tuple[str, ...]]) -> dict:
+    """Documento só com os campos pedidos (sem os usados internamente)"""
+    if campos is None or len(pessoa) == len(campos):
+        return pessoa
+    return {campo: pessoa[campo] for campo in campos if campo in pessoa}
+
+
+# ========================================
+# EXCLUSÃO LÓGICA E ARQUIVAMENTO
+# ========================================
+# A exclusão é um único update_one que marca deleted_at; as leituras ignoram
+# as pessoas marcadas. Em segundo plano, o arquivador move as excluídas há mais
+# de ARQUIVAMENTO_CARENCIA_SEGUNDOS para pessoas_arquivo, em lotes, e as remove
+# de pessoas. Com EXCLUSAO_LOGICA=false a exclusão volta a ser física (sem arquivo).
+EXCLUSAO_LOGICA = os.environ.get('EXCLUSAO_LOGICA', 'true').lower() == 'true'
+ARQUIVAMENTO_CARENCIA_SEGUNDOS = float(os.environ.get('ARQUIVAMENTO_CARENCIA_SEGUNDOS', '3600'))
+ARQUIVAMENTO_INTERVALO_SEGUNDOS = float(os.environ.get('ARQUIVAMENTO_INTERVALO_SEGUNDOS', '300'))
+ARQUIVO_RETENCAO_DIAS = float(os.environ.get('PESSOAS_ARQUIVO_RETENCAO_DIAS', '0'))
+TAMANHO_LOTE_ARQUIVAMENTO = 1000
+
+# Filtro das pessoas não excluídas (deleted_at ausente)
+FILTRO_ATIVAS = {"deleted_at": None}
+# Filtro das excluídas: atendido pelo índice parcial de deleted_at, que só contém as excluídas
+FILTRO_EXCLUIDAS = {"deleted_at": {"$exists": True}}
+
+pessoas_arquivadas = registro.registrar(Contador(
+    "pessoas_arquivadas_total", "Pessoas excluídas movidas para pessoas_arquivo"))
+
+
+def filtro_ativa(cpf: str) -> dict:
+    return {"cpf": cpf, **FILTRO_ATIVAS}
+
+
+def operacao_exclusao(cpf: str, agora: datetime):
+    """Exclusão de uma pessoa ativa: lógica (marca deleted_at) ou física, conforme EXCLUSAO_LOGICA"""
+    if EXCLUSAO_LOGICA:
+        return UpdateOne(filtro_ativa(cpf), {"$set": {"deleted_at": agora, "updated_at": agora}})
+    return DeleteOne(filtro_ativa(cpf))
+
+
+async def gravar_operacoes(operacoes: list, cpfs: List[str]):
+    """bulk_write não ordenado em pessoas; com partições, cada operação vai só à partição do seu CPF"""
+    if len(bancos) > 1:
+        return await db.pessoas.bulk_write(operacoes, ordered=False, cpfs=cpfs)
+    return await db.pessoas.bulk_write(operacoes, ordered=False)
+
+
+async def excluir_pessoa(cpf: str) -> int:
+    """Exclui a pessoa ativa com o CPF; retorna 1 se ela existia, 0 se não"""
+    resultado = await gravar_operacoes([operacao_exclusao(cpf, datetime.now(timezone.utc))], [cpf])
+    return resultado.modified_count + resultado.deleted_count
+
+
+async def mover_para_arquivo(filtro: dict, limite: int) -> List[str]:
+    """
+    Copia até `limite` pessoas excluídas para pessoas_arquivo e as remove de pessoas.
+    
+    O _id é preservado: se o processo parar entre as duas etapas (ou dois workers
+    arquivarem ao mesmo tempo), a cópia repetida é ignorada e nada se perde.
+    
+    Returns:
+        List: CPFs arquivados
+    """
+    excluidas = await db.pessoas.find({**filtro, **FILTRO_EXCLUIDAS}).limit(limite).to_list(limite)
+    if not excluidas:
+        return []
+    
+    agora = datetime.now(timezone.utc)
+    try:
+        await db.pessoas_arquivo.insert_many([{**doc, "arquivado_em": agora} for doc in excluidas], ordered=False)
+    except BulkWriteError as erro:
+        if any(falha['code'] != CODIGO_CHAVE_DUPLICADA for falha in erro.details['writeErrors']):
+            raise
+    await db.pessoas.delete_many({"_id": {"$in": [doc["_id"] for doc in excluidas]}, **FILTRO_EXCLUIDAS})
+    pessoas_arquivadas.inc(valor=len(excluidas))
+    return [doc["cpf"] for doc in excluidas]
+
+
+async def arquivar_periodicamente() -> None:
+    """Tarefa de segundo plano: arquiva as excluídas após a carência, a cada intervalo"""
+    while True:
+        try:
+            limite = datetime.now(timezone.utc) - timedelta(seconds=ARQUIVAMENTO_CARENCIA_SEGUNDOS)
+            filtro = {"deleted_at": {"$exists": True, "$lte": limite}}
+            while len(await mover_para_arquivo(filtro, TAMANHO_LOTE_ARQUIVAMENTO)) == TAMANHO_LOTE_ARQUIVAMENTO:
+                pass
+        except PyMongoError:
+            logger.exception("Falha no arquivamento das pessoas excluídas")
+        await asyncio.sleep(ARQUIVAMENTO_INTERVALO_SEGUNDOS)
+
+
+# ========================================
+# FILTRO DE BLOOM DOS CPFs
+# ========================================
+# Com FILTRO_CPFS=true, cada worker mantém em memória um filtro de Bloom dos CPFs
+# ativos: buscas de CPFs que com certeza não existem respondem 404 sem consultar o
+# banco. Escritas (PUT, DELETE e operações em massa) sempre consultam o banco: um
+# 404 falso ali descartaria a alteração. O filtro é construído em segundo plano na
+# subida (até lá, toda consulta vai ao banco), recebe as inclusões deste worker na
+# hora e as dos outros workers e das cargas externas (gerar_dados.py) a cada
+# FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS, a partir do último _id lido (o ObjectId é
+# gerado na gravação, ao contrário de created_at, que uma carga pode trazer no
+# passado), e é
+# reconstruído a cada FILTRO_CPFS_RECONSTRUCAO_SEGUNDOS ou quando enche, para
+# descartar os CPFs excluídos. Sem sincronizar por várias rodadas seguidas, o
+# filtro deixa de ser usado até voltar a sincronizar.
+FILTRO_CPFS_HABILITADO = os.environ.get('FILTRO_CPFS', 'false').lower() == 'true'
+FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS = float(os.environ.get('FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS', '1'))
+FILTRO_CPFS_RECONSTRUCAO_SEGUNDOS = float(os.environ.get('FILTRO_CPFS_RECONSTRUCAO_SEGUNDOS', '3600'))
+# Inclusões gravadas fora de ordem (o ObjectId é gerado pelo driver antes do
+# insert) ainda são vistas: cada sincronização relê este trecho antes do último
+# _id lido. O ObjectId traz o relógio de quem gravou: inclusões de um cliente com
+# o relógio mais atrasado que isso só entram na próxima reconstrução
+SOBREPOSICAO_SINCRONIZACAO_FILTRO = timedelta(seconds=1)
+
+filtro_cpfs = FiltroCpfs(
+    taxa_falsos_positivos=float(os.environ.get('FILTRO_CPFS_TAXA_FALSOS_POSITIVOS', '0.01')),
+    validade_segundos=max(5.0, 5 * FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS),
+)
+
+
+async def consultar_se_pode_existir(cpf: str, consulta: Callable[[], Awaitable[Any]]) -> Any:
+    """Executa a consulta só se o CPF pode existir; None se o filtro garante que não existe"""
+    if not filtro_cpfs.pode_existir(cpf):
+        return None
+    resultado = await consulta()
+    if not resultado:
+        filtro_cpfs.registrar_falso_positivo()
+    return resultado
+
+
+async def cpfs_ativos() -> AsyncIterator[List[str]]:
+    cursor = db.pessoas.find(FILTRO_ATIVAS, {"_id": 0, "cpf": 1}).batch_size(TAMANHO_LOTE_EXPORTACAO)
+    async for lote in lotes_do_cursor(cursor, TAMANHO_LOTE_EXPORTACAO):
+        yield [doc["cpf"] for doc in lote]
+
+
+async def manter_filtro_cpfs() -> None:
+    """Tarefa de segundo plano: constrói, sincroniza e reconstrói o filtro de CPFs"""
+    ultimo_id: Optional[ObjectId] = None
+    reconstruido_em = 0.0
+    while True:
+        try:
+            if (ultimo_id is None or filtro_cpfs.precisa_reconstruir()
+                    or time.monotonic() - reconstruido_em >= FILTRO_CPFS_RECONSTRUCAO_SEGUNDOS):
+                inicio = datetime.now(timezone.utc)
+                await filtro_cpfs.reconstruir(await db.pessoas.estimated_document_count(), cpfs_ativos())
+                ultimo_id, reconstruido_em = ObjectId.from_datetime(inicio), time.monotonic()
+                logger.info("Filtro de CPFs construído: %s", filtro_cpfs.estatisticas())
+            else:
+                desde = ultimo_id.generation_time - SOBREPOSICAO_SINCRONIZACAO_FILTRO
+                cursor = db.pessoas.find(
+                    {"_id": {"$gte": ObjectId.from_datetime(desde)}}, {"_id": 1, "cpf": 1},
+                ).batch_size(TAMANHO_LOTE_EXPORTACAO)
+                async for lote in lotes_do_cursor(cursor, TAMANHO_LOTE_EXPORTACAO):
+                    filtro_cpfs.adicionar([doc["cpf"] for doc in lote])
+                    ultimo_id = max(ultimo_id, *(doc["_id"] for doc in lote))
+                filtro_cpfs.registrar_sincronizacao()
+        except PyMongoError:
+            logger.exception("Falha na manutenção do filtro de CPFs")
+        await asyncio.sleep(FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS)
+
+
+# ========================================
+# GET CONDICIONAL (ETag / Last-Modified)
+# ========================================
+# Clientes que repetem a mesma leitura recebem 304, sem corpo:
+# - Pessoa: ETag e Last-Modified derivados de updated_at (304 antes de serializar)
+# - Listagem: ETag derivado da própria página (o corpo e o cursor da próxima),
+#   sem leituras extras no banco e sem estado a manter nas escritas. Qualquer
+#   inclusão, alteração ou exclusão (lógica ou física) visível na página muda o
+#   ETag, inclusive as feitas fora da API (gerar_dados.py, migrações). Não há
+#   Last-Modified: uma exclusão física não move nenhum updated_at
+def milissegundos(instante: datetime) -> int:
+    return int(normalizar_instante(instante).timestamp() * 1000)
+
+
+def etag_pessoa(pessoa: dict) -> str:
+    return f'W/"{pessoa["cpf"]}-{milissegundos(pessoa["updated_at"])}"'
+
+
+def etag_listagem(corpo: bytes, proximo: Optional[str]) -> str:
+    """ETag fraco da página: o corpo JSON e o token da próxima página (enviado só no header)"""
+    resumo = hashlib.blake2b(corpo, digest_size=16)
+    resumo.update((proximo or '').encode())
+    return f'W/"{resumo.hexdigest()}"'
+
+
+def nao_modificado(request: Request, etag: str, ultima_modificacao: Optional[datetime]) -> bool:
+    """Confere If-None-Match (comparação fraca) ou, na ausência dele, If-Modified-Since"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        etags = {valor.strip().removeprefix('W/') for valor in if_none_match.split(',')}
+        return '*' in etags or etag.removeprefix('W/') in etags
+    
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and ultima_modificacao is not None:
+        try:
+            data = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Last-Modified tem resolução de segundos
+        return data.tzinfo is not None and ultima_modificacao.replace(microsecond=0) <= data
+    return False
+
+
+def cabecalhos_condicionais(etag: str, ultima_modificacao: Optional[datetime]) -> Dict[str, str]:
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if ultima_modificacao is not None:
+        cabecalhos["Last-Modified"] = email.utils.format_datetime(
+            ultima_modificacao.astimezone(timezone.utc), usegmt=True
+        )
+    return cabecalhos
+
+
+# ========================================
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# ========================================
+# O cursor guarda a ordenação, o CPF e o valor do campo de ordenação do último
+# registro da página, codificados em base64 para serem opacos ao cliente.
+# A próxima página é buscada a partir desses valores (ex: {"cpf": {"$gt": ultimo_cpf}}),
+# o que usa o índice e tem custo constante independente da profundidade da página.
+# O CPF desempata ordenações por campos não únicos.
+LIMITE_PAGINA_PADRAO = 1000
+LIMITE_PAGINA_MAXIMO = 1000
+TAMANHO_LOTE_CURSOR = 1000
+
+# Ordenação aceita em ?sort= -> (campo indexado, direção)
+ORDENACOES = {
+    "cpf": ("cpf", ASCENDING),
+    "nome": ("nome_busca", ASCENDING),
+    "-nome": ("nome_busca", DESCENDING),
+    "created_at": ("created_at", ASCENDING),
+    "-created_at": ("created_at", DESCENDING),
+}
+
+
+def ordenacao_mongo(ordenacao: str) -> List[Tuple[str, int]]:
+    """Especificação de sort do MongoDB, com o CPF como desempate na mesma direção"""
+    campo, direcao = ORDENACOES[ordenacao]
+    if campo == 'cpf':
+        return [('cpf', direcao)]
+    return [(campo, direcao), ('cpf', direcao)]
+
+
+def campos_do_cursor(ordenacao: str) -> Tuple[str, ...]:
+    """Campos do documento que codificar_cursor usa para a ordenação"""
+    campo, _ = ORDENACOES[ordenacao]
+    if campo == 'cpf':
+        return ('cpf',)
+    return ('cpf', 'nome' if campo == 'nome_busca' else campo)
+
+
+def codificar_cursor(ordenacao: str, pessoa: dict) -> str:
+    """
+    Gera o token opaco da próxima página a partir do último registro retornado.
+    
+    Recebe o documento como veio do banco, antes de normalizar_datas: um created_at
+    legado em string continua string no token (marcado como legado), porque o
+    MongoDB ordena e compara strings e datas separadamente.
+    """
+    campo, _ = ORDENACOES[ordenacao]
+    legado = False
+    if campo == 'nome_busca':
+        valor = normalizar_busca(pessoa['nome'])
+    elif campo == 'cpf':
+        valor = None
+    else:
+        valor = pessoa[campo]
+        legado = isinstance(valor, str)
+    payload = orjson.dumps([ordenacao, pessoa['cpf'], valor, legado], option=orjson.OPT_UTC_Z)
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decodificar_cursor(token: str, ordenacao: str) -> dict:
+    """
+    Converte o token opaco de paginação no filtro que busca a página seguinte.
+    
+    Com created_at legado em string, a ordenação do MongoDB traz todas as strings
+    antes de todas as datas e $gt/$lt só comparam valores do mesmo tipo: o filtro
+    inclui também o tipo que vem depois na ordem (datas na crescente, strings na
+    decrescente) para que a paginação atravesse a fronteira.
+    
+    Raises:
+        HTTPException: 400 se o token não for um cursor válido para esta ordenação
+    """
+    try:
+        token_ordenacao, cpf, valor, legado = orjson.loads(
+            base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        )
+        campo, direcao = ORDENACOES[ordenacao]
+        if token_ordenacao != ordenacao or len(cpf) != 11 or not cpf.isdigit() or not isinstance(legado, bool):
+            raise ValueError(token)
+        if campo == 'created_at' and not legado:
+            valor = datetime.fromisoformat(valor)
+        elif campo != 'cpf' and not isinstance(valor, str):
+            raise ValueError(token)
+    except (binascii.Error, orjson.JSONDecodeError, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
+    
+    operador = "$gt" if direcao == ASCENDING else "$lt"
+    if campo == 'cpf':
+        return {"cpf": {operador: cpf}}
+    seguintes = [{campo: {operador: valor}}, {campo: valor, "cpf": {operador: cpf}}]
+    if campo == 'created_at' and legado == (direcao == ASCENDING):
+        seguintes.append({campo: {"$type": "date" if legado else "string"}})
+    return {"$or": seguintes}
+
+
+async def stream_ndjson(cursor) -> AsyncIterator[bytes]:
+    """
+    Emite cada documento do cursor do Motor como uma linha JSON assim que chega.
+    
+    A memória fica limitada a um lote do cursor, qualquer que seja o tamanho da collection.
+    """
+    async for pessoa in cursor:
+        yield orjson.dumps(normalizar_datas(pessoa), option=orjson.OPT_UTC_Z) + b'\n'
+
+
+def mensagem_cpf_duplicado(cpf: str) -> str:
+    """Mensagem padrão para CPF já cadastrado (cadastro individual e em massa)"""
+    return f"CPF {PessoaResponse.formatar_cpf_display(cpf)} já cadastrado no sistema"
+
+
+def agora_utc() -> datetime:
+    """
+    Instante atual em UTC, na resolução das datas BSON (milissegundos).
+    
+    O documento devolvido e guardado no cache na criação fica igual ao relido do
+    banco: mesmos timestamps e, portanto, mesmo ETag antes e depois do cache.
+    """
+    agora = datetime.now(timezone.utc)
+    return agora.replace(microsecond=agora.microsecond // 1000 * 1000)
+
+
 # Define Models
 class Pessoa(BaseModel):
     """
@@ -105,8 +729,8 @@ class Pessoa(BaseModel):
     nome: str = Field(..., min_length=3, max_length=200, description="Nome completo da pessoa")
     email: EmailStr = Field(..., description="Email da pessoa")
     endereco: str = Field(..., min_length=5, max_length=500, description="Endereço completo")
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=agora_utc)
+    updated_at: datetime = Field(default_factory=agora_utc)
     
     @field_validator('cpf')
     @classmethod
@@ -159,6 +783,18 @@ class PessoaResponse(BaseModel):
 # ROTAS DA API - CRUD COMPLETO
 # ========================================
 
+async def inserir_pessoa(doc: dict) -> None:
+    """
+    insert_one, ou a vez do documento no próximo insert_many do agrupamento (AGRUPAR_INCLUSOES).
+    Em ambos os casos o CPF já está no filtro de Bloom quando a função retorna.
+    """
+    if agrupador_inclusoes is not None:
+        await agrupador_inclusoes.inserir(doc)
+    else:
+        await db.pessoas.insert_one(doc)
+        filtro_cpfs.adicionar([doc['cpf']])
+
+
 @api_router.post(
     "/pessoas",
     response_model=Pessoa,
@@ -181,52 +817,1005 @@ async def criar_pessoa(pessoa: PessoaCreate):
     - Uma responsabilidade: criar pessoa
     - Validações claras e organizadas
     """
-    # Verifica se CPF já existe
-    cpf_existente = await db.pessoas.find_one({"cpf": pessoa.cpf})
-    if cpf_existente:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"CPF {PessoaResponse.formatar_cpf_display(pessoa.cpf)} já cadastrado no sistema"
-        )
-    
     # Cria objeto Pessoa com timestamps
     pessoa_obj = Pessoa(**pessoa.model_dump())
     
-    # Prepara documento para MongoDB
+    # Prepara documento para MongoDB (timestamps gravados como datas BSON nativas)
     doc = pessoa_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
+    doc.update(campos_busca(doc))
+    
+    # Insere no banco - a unicidade do CPF é garantida pelo índice único,
+    # sem consulta prévia e sem condição de corrida entre requisições concorrentes.
+    # Se o CPF pertence a uma pessoa excluída ainda não arquivada, ela é arquivada
+    # na hora e o cadastro é refeito uma única vez.
+    try:
+        await inserir_pessoa(doc)
+    except DuplicateKeyError:
+        try:
+            if not await mover_para_arquivo({"cpf": pessoa_obj.cpf}, 1):
+                raise
+            await inserir_pessoa(doc)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=mensagem_cpf_duplicado(pessoa.cpf)
+            )
     
-    # Insere no banco
-    await db.pessoas.insert_one(doc)
+    cache_pessoas.set(pessoa_obj.cpf, pessoa_obj.model_dump())
     
     return pessoa_obj
 
 
+# ========================================
+# IMPORTAÇÃO EM MASSA (CSV / NDJSON)
+# ========================================
+# O upload é lido em streaming, validado em lotes com o mesmo PessoaCreate do
+# cadastro individual e gravado com um insert_many não ordenado por lote.
+TAMANHO_LOTE_IMPORTACAO = 1000
+CODIGO_CHAVE_DUPLICADA = 11000
+MAXIMO_ERROS_RELATORIO = 1000
+CAMPOS_IMPORTACAO = ('cpf', 'nome', 'email', 'endereco')
+CONTENT_TYPES_IMPORTACAO = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+class ImportacaoResultado(BaseModel):
+    """Relatório da importação em massa, com os erros identificados pela linha do arquivo"""
+    total: int = 0
+    inserted_count: int = 0
+    error_count: int = 0
+    errors: List[Dict] = Field(default_factory=list)
+    errors_truncated: bool = False
+
+    def registrar_erro(self, linha: int, cpf: Optional[str], detail: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAXIMO_ERROS_RELATORIO:
+            self.errors.append({"line": linha, "cpf": cpf, "detail": detail})
+        else:
+            self.errors_truncated = True
+
+
+async def ler_linhas(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    """Lê o corpo da requisição em streaming, emitindo (número da linha, conteúdo) das linhas não vazias"""
+    numero = 0
+    resto = b''
+    async for pedaco in request.stream():
+        resto += pedaco
+        *linhas, resto = resto.split(b'\n')
+        for linha in linhas:
+            numero += 1
+            if linha.strip():
+                yield numero, linha.decode('utf-8-sig').rstrip('\r')
+    if resto.strip():
+        yield numero + 1, resto.decode('utf-8-sig').rstrip('\r')
+
+
+async def ler_registros(request: Request, formato: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Converte as linhas do upload em registros (dict) conforme o formato.
+    
+    No CSV a primeira linha é o cabeçalho e cada registro ocupa uma única linha,
+    com exatamente as colunas do cabeçalho (ex: um endereço com vírgula sem aspas
+    vira uma coluna a mais e a linha é rejeitada, em vez de gravada truncada).
+    Linhas que não puderem ser interpretadas são emitidas como string de erro.
+    """
+    cabecalho = None
+    async for numero, linha in ler_linhas(request):
+        if formato == 'ndjson':
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                registro = None
+            yield numero, registro if isinstance(registro, dict) else "Linha não é um objeto JSON válido"
+        elif cabecalho is None:
+            cabecalho = [campo.strip() for campo in next(csv.reader([linha]))]
+        else:
+            valores = next(csv.reader([linha]))
+            if len(valores) != len(cabecalho):
+                dica = " (valores com vírgula devem estar entre aspas)" if len(valores) > len(cabecalho) else ""
+                yield numero, f"Linha com {len(valores)} colunas; o cabeçalho tem {len(cabecalho)}{dica}"
+                continue
+            yield numero, dict(zip(cabecalho, valores))
+
+
+def descrever_erro_validacao(erro: ValidationError) -> str:
+    """Resume os erros do Pydantic em uma mensagem curta: 'campo: mensagem'"""
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in e['loc'])}: {e['msg'].removeprefix('Value error, ')}"
+        for e in erro.errors()
+    )
+
+
+async def gravar_lote(lote: List[Tuple[int, dict]], resultado: ImportacaoResultado, repetir: bool = True) -> None:
+    """
+    Grava um lote já validado com um único insert_many não ordenado.
+    
+    CPFs repetidos dentro do lote ou já existentes no banco são rejeitados pelo
+    índice único e entram no relatório de erros; o restante do lote é gravado.
+    CPFs de pessoas excluídas ainda não arquivadas são arquivados e gravados de novo.
+    Os timestamps são do momento da gravação, não da leitura do lote (ver ATRASO_MUDANCAS).
+    """
+    agora = datetime.now(timezone.utc)
+    for _, doc in lote:
+        doc['created_at'] = doc['updated_at'] = agora
+    # Antes do insert: um CPF rejeitado a mais no filtro só custa uma consulta
+    filtro_cpfs.adicionar([doc['cpf'] for _, doc in lote])
+    try:
+        resposta = await db.pessoas.insert_many([doc for _, doc in lote], ordered=False)
+        resultado.inserted_count += len(resposta.inserted_ids)
+    except BulkWriteError as erro:
+        resultado.inserted_count += erro.details['nInserted']
+        falhas = erro.details['writeErrors']
+        liberados = set()
+        if repetir:
+            duplicados = [lote[falha['index']][1]['cpf'] for falha in falhas if falha['code'] == CODIGO_CHAVE_DUPLICADA]
+            if duplicados:
+                liberados = set(await mover_para_arquivo({"cpf": {"$in": duplicados}}, len(duplicados)))
+        novamente = []
+        for falha in falhas:
+            linha, doc = lote[falha['index']]
+            if doc['cpf'] in liberados:
+                liberados.discard(doc['cpf'])
+                novamente.append((linha, doc))
+            elif falha['code'] == CODIGO_CHAVE_DUPLICADA:
+                resultado.registrar_erro(linha, doc['cpf'], mensagem_cpf_duplicado(doc['cpf']))
+            else:
+                resultado.registrar_erro(linha, doc['cpf'], falha['errmsg'])
+        if novamente:
+            await gravar_lote(novamente, resultado, repetir=False)
+
+
+@api_router.post(
+    "/pessoas/bulk",
+    response_model=ImportacaoResultado,
+    summary="Importar pessoas em massa",
+    description=(
+        "Importa pessoas a partir de um upload CSV (text/csv, com cabeçalho cpf,nome,email,endereco) "
+        "ou NDJSON (application/x-ndjson). Linhas inválidas ou com CPF duplicado são reportadas "
+        "individualmente sem interromper a importação."
+    )
+)
+async def importar_pessoas(request: Request):
+    """
+    Importa pessoas em massa a partir de um arquivo enviado em streaming.
+    
+    Exemplo de BOA PRÁTICA DRY:
+    - Reutiliza PessoaCreate (e portanto validar_cpf) para validar cada linha
+    - Mesmo formato de documento e mesma mensagem de duplicidade do cadastro individual
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    formato = CONTENT_TYPES_IMPORTACAO.get(content_type)
+    if formato is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Envie o arquivo como text/csv ou application/x-ndjson"
+        )
+    
+    resultado = ImportacaoResultado()
+    lote: List[Tuple[int, dict]] = []
+    
+    async for linha, registro in ler_registros(request, formato):
+        resultado.total += 1
+        if isinstance(registro, str):
+            resultado.registrar_erro(linha, None, registro)
+            continue
+        try:
+            pessoa = PessoaCreate.model_validate(
+                {campo: registro.get(campo) for campo in CAMPOS_IMPORTACAO}
+            )
+        except ValidationError as erro:
+            resultado.registrar_erro(linha, registro.get('cpf'), descrever_erro_validacao(erro))
+            continue
+        
+        doc = pessoa.model_dump()
+        lote.append((linha, {**doc, **campos_busca(doc)}))
+        if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+            await gravar_lote(lote, resultado)
+            lote = []
+    
+    if lote:
+        await gravar_lote(lote, resultado)
+    
+    return resultado
+
+
+# ========================================
+# ATUALIZAÇÃO E EXCLUSÃO EM MASSA
+# ========================================
+# Cada item é validado com as mesmas regras das rotas individuais; os itens
+# válidos são aplicados em lotes, com uma consulta $in (quais CPFs existem) e um
+# bulk_write não ordenado por lote. Com dry_run=true nada é gravado.
+LIMITE_OPERACOES_LOTE = 50000
+
+
+class AtualizacaoLote(BaseModel):
+    """Itens no formato {cpf, campos de PessoaUpdate}"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=LIMITE_OPERACOES_LOTE)
+
+
+class RemocaoLote(BaseModel):
+    """CPFs a remover, com ou sem formatação"""
+    cpfs: List[str] = Field(..., min_length=1, max_length=LIMITE_OPERACOES_LOTE)
+
+
+class OperacaoLoteResultado(BaseModel):
+    """Resultado por item (na ordem enviada) e totais por status"""
+    dry_run: bool
+    total: int
+    summary: Dict[str, int]
+    results: List[Dict]
+
+
+def resultado_item(indice: int, cpf: str, status_item: str, detail: Optional[str] = None) -> dict:
+    item = {"index": indice, "cpf": cpf, "status": status_item}
+    if detail:
+        item["detail"] = detail
+    return item
+
+
+def separar_validos(cpfs: List[str], resultados: List[Optional[dict]]) -> List[Tuple[int, str]]:
+    """
+    Valida os CPFs de uma vez, registrando os inválidos e os repetidos na requisição
+    (em um bulk_write não ordenado, a ordem entre operações do mesmo CPF não é garantida).
+    
+    Returns:
+        List: (índice, CPF normalizado) dos itens válidos
+    """
+    validos, normalizados = validar_cpfs_em_lote(cpfs)
+    vistos = set()
+    aceitos = []
+    for indice, (cpf, valido, normalizado) in enumerate(zip(cpfs, validos.tolist(), normalizados.tolist())):
+        if not valido:
+            resultados[indice] = resultado_item(indice, cpf, "invalid", "CPF inválido")
+        elif normalizado in vistos:
+            resultados[indice] = resultado_item(indice, normalizado, "invalid", "CPF repetido na requisição")
+        else:
+            vistos.add(normalizado)
+            aceitos.append((indice, normalizado))
+    return aceitos
+
+
+async def aplicar_em_lotes(
+    pendentes: List[Tuple[int, str, Any]],
+    montar: Callable[[str, Any, datetime], Any],
+    status_sucesso: str,
+    dry_run: bool,
+    resultados: List[Optional[dict]],
+) -> List[str]:
+    """
+    Aplica as operações montadas por `montar` com um bulk_write não ordenado por lote.
+    `montar(cpf, dados, agora)` recebe o instante de cada lote, tomado logo antes da
+    gravação: lotes seguintes não ficam com updated_at atrasado (ver ATRASO_MUDANCAS).
+    
+    Returns:
+        List: CPFs alterados (em dry_run, os que seriam alterados)
+    """
+    aplicados = []
+    for inicio in range(0, len(pendentes), TAMANHO_LOTE_IMPORTACAO):
+        lote = pendentes[inicio:inicio + TAMANHO_LOTE_IMPORTACAO]
+        # Escrita: todos os CPFs vão ao banco, sem o filtro de CPFs (ver FILTRO DE BLOOM DOS CPFs)
+        candidatos = [cpf for _, cpf, _ in lote]
+        existentes = {
+            doc["cpf"] for doc in await db.pessoas.find(
+                {"cpf": {"$in": candidatos}, **FILTRO_ATIVAS}, {"_id": 0, "cpf": 1}
+            ).to_list(len(candidatos))
+        }
+        encontrados = []
+        for indice, cpf, dados in lote:
+            if cpf in existentes:
+                encontrados.append((indice, cpf, dados))
+            else:
+                resultados[indice] = resultado_item(indice, cpf, "not_found", "Pessoa não encontrada")
+        
+        falhas = {}
+        if encontrados and not dry_run:
+            agora = datetime.now(timezone.utc)
+            try:
+                await gravar_operacoes(
+                    [montar(cpf, dados, agora) for _, cpf, dados in encontrados], [cpf for _, cpf, _ in encontrados]
+                )
+            except BulkWriteError as erro:
+                falhas = {falha['index']: falha['errmsg'] for falha in erro.details['writeErrors']}
+        
+        for posicao, (indice, cpf, _) in enumerate(encontrados):
+            if posicao in falhas:
+                resultados[indice] = resultado_item(indice, cpf, "error", falhas[posicao])
+            else:
+                resultados[indice] = resultado_item(indice, cpf, status_sucesso)
+                aplicados.append(cpf)
+    return aplicados
+
+
+def resposta_operacao_lote(resultados: List[dict], dry_run: bool) -> RespostaJSONRapida:
+    return RespostaJSONRapida({
+        "dry_run": dry_run,
+        "total": len(resultados),
+        "summary": dict(Counter(item["status"] for item in resultados)),
+        "results": resultados,
+    })
+
+
+@api_router.patch(
+    "/pessoas/bulk",
+    response_model=OperacaoLoteResultado,
+    summary="Atualizar pessoas em massa",
+    description=(
+        f"Atualiza até {LIMITE_OPERACOES_LOTE} pessoas: cada item traz o CPF e os campos de PessoaUpdate. "
+        "O resultado informa, por item, updated, not_found, invalid ou error. "
+        "Com dry_run=true os itens são validados e conferidos sem gravar nada."
+    )
+)
+async def atualizar_pessoas(
+    lote: AtualizacaoLote,
+    dry_run: bool = Query(False, description="Valida e confere os itens sem gravar"),
+):
+    """
+    Atualiza várias pessoas com um bulk_write por lote.
+    
+    Exemplo de BOA PRÁTICA DRY:
+    - Reutiliza PessoaUpdate, campos_busca e as regras de validar_cpf da rota individual
+    """
+    resultados: List[Optional[dict]] = [None] * len(lote.items)
+    pendentes = []
+    for indice, cpf in separar_validos([str(item.get('cpf', '')) for item in lote.items], resultados):
+        try:
+            update_data = PessoaUpdate.model_validate(lote.items[indice]).model_dump(exclude_unset=True)
+        except ValidationError as erro:
+            resultados[indice] = resultado_item(indice, cpf, "invalid", descrever_erro_validacao(erro))
+            continue
+        if not update_data:
+            resultados[indice] = resultado_item(indice, cpf, "invalid", "Nenhum campo para atualizar foi fornecido")
+            continue
+        update_data.update(campos_busca(update_data))
+        pendentes.append((indice, cpf, update_data))
+    
+    atualizados = await aplicar_em_lotes(
+        pendentes,
+        lambda cpf, dados, agora: UpdateOne(filtro_ativa(cpf), {"$set": {**dados, "updated_at": agora}}),
+        "updated", dry_run, resultados
+    )
+    if not dry_run and atualizados:
+        for cpf in atualizados:
+            cache_pessoas.invalidar(cpf)
+    
+    return resposta_operacao_lote(resultados, dry_run)
+
+
+@api_router.delete(
+    "/pessoas/bulk",
+    response_model=OperacaoLoteResultado,
+    summary="Remover pessoas em massa",
+    description=(
+        f"Remove até {LIMITE_OPERACOES_LOTE} pessoas pelo CPF. "
+        "O resultado informa, por item, deleted, not_found, invalid ou error. "
+        "Com dry_run=true nada é removido."
+    )
+)
+async def deletar_pessoas(
+    lote: RemocaoLote,
+    dry_run: bool = Query(False, description="Valida e confere os CPFs sem remover"),
+):
+    """
+    Remove várias pessoas com um bulk_write por lote (ex: pedidos de exclusão pela LGPD).
+    
+    Exemplo de BOA PRÁTICA KISS:
+    - Mesmo fluxo da atualização em massa, trocando apenas a operação de cada item
+    """
+    resultados: List[Optional[dict]] = [None] * len(lote.cpfs)
+    pendentes = [(indice, cpf, None) for indice, cpf in separar_validos(lote.cpfs, resultados)]
+    
+    removidos = await aplicar_em_lotes(
+        pendentes, lambda cpf, _, agora: operacao_exclusao(cpf, agora), "deleted", dry_run, resultados
+    )
+    if not dry_run and removidos:
+        for cpf in removidos:
+            cache_pessoas.invalidar(cpf)
+        await registrar_remocoes(removidos)
+    
+    return resposta_operacao_lote(resultados, dry_run)
+
+
+# ========================================
+# CONSULTA EM LOTE
+# ========================================
+# Substitui milhares de GET /api/pessoas/{cpf} por uma requisição: os CPFs são
+# validados de uma vez (NumPy) e buscados com um único $in no índice de cpf.
+LIMITE_CONSULTA_LOTE = 5000
+
+
+class ConsultaLote(BaseModel):
+    """CPFs a consultar, com ou sem formatação"""
+    cpfs: List[str] = Field(..., min_length=1, max_length=LIMITE_CONSULTA_LOTE)
+
+
+class ConsultaLoteResultado(BaseModel):
+    """Pessoas encontradas (na ordem pedida) e CPFs não encontrados ou inválidos"""
+    found: List[Pessoa]
+    missing: List[str]
+    invalid: List[str]
+
+
+@api_router.post(
+    "/pessoas/lookup",
+    response_model=ConsultaLoteResultado,
+    summary="Buscar várias pessoas por CPF",
+    description=(
+        f"Busca até {LIMITE_CONSULTA_LOTE} CPFs em uma única requisição. Retorna as pessoas encontradas, "
+        "os CPFs válidos sem cadastro (missing, normalizados) e os CPFs inválidos (invalid, como enviados)."
+    )
+)
+async def consultar_pessoas(consulta: ConsultaLote):
+    """
+    Busca várias pessoas pelo CPF com uma única consulta ao banco.
+    
+    Exemplo de BOA PRÁTICA DRY:
+    - validar_cpfs_em_lote aplica as mesmas regras de validar_cpf a todos os CPFs de uma vez
+    - Mesma projeção e serialização rápida da busca individual
+    """
+    validos, normalizados = validar_cpfs_em_lote(consulta.cpfs)
+    invalidos = [cpf for cpf, valido in zip(consulta.cpfs, validos.tolist()) if not valido]
+    # Sem repetições, preservando a ordem do pedido
+    cpfs = list(dict.fromkeys(normalizados[validos].tolist()))
+    
+    candidatos = filtro_cpfs.filtrar(cpfs)
+    pessoas = await db.pessoas.find(
+        {"cpf": {"$in": candidatos}, **FILTRO_ATIVAS}, PROJECAO_PESSOA
+    ).batch_size(len(candidatos)).to_list(len(candidatos)) if candidatos else []
+    filtro_cpfs.registrar_falso_positivo(len(candidatos) - len(pessoas))
+    por_cpf = {pessoa["cpf"]: normalizar_datas(pessoa) for pessoa in pessoas}
+    
+    return RespostaJSONRapida({
+        "found": [por_cpf[cpf] for cpf in cpfs if cpf in por_cpf],
+        "missing": [cpf for cpf in cpfs if cpf not in por_cpf],
+        "invalid": invalidos,
+    })
+
+
 @api_router.get(
     "/pessoas",
     response_model=List[Pessoa],
-    summary="Listar todas as pessoas",
-    description="Retorna lista de todas as pessoas cadastradas"
+    summary="Listar e buscar pessoas (paginado)",
+    description=(
+        "Retorna pessoas filtradas por nome (prefixo), email (exato) e endereço (busca textual), "
+        "ordenadas por `sort` e paginadas por cursor. "
+        "O token da próxima página vem no header X-Next-Cursor e deve ser enviado em `after`. "
+        "Com format=ndjson, todas as pessoas a partir do cursor são transmitidas em streaming, uma por linha."
+    )
+)
+async def listar_pessoas(
+    request: Request,
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho da página"),
+    after: Optional[str] = Query(None, description="Token opaco da próxima página (header X-Next-Cursor)"),
+    formato: Literal["json", "ndjson"] = Query("json", alias="format", description="json (página) ou ndjson (streaming)"),
+    nome: Optional[str] = Query(None, description="Prefixo do nome (ignora maiúsculas e acentos)"),
+    email: Optional[str] = Query(None, description="Email exato (ignora maiúsculas)"),
+    endereco: Optional[str] = Query(None, description="Palavras do endereço (busca textual)"),
+    ordenacao: Literal[tuple(ORDENACOES)] = Query("cpf", alias="sort", description="Campo de ordenação (prefixo '-' = decrescente)"),
+    fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula (ex: cpf,nome)"),
+):
+    """
+    Lista as pessoas cadastradas com filtros indexados e paginação por cursor (keyset).
+    
+    Exemplo de BOA PRÁTICA KISS:
+    - Uma única consulta indexada por página, sem skip
+    - O streaming NDJSON repassa os documentos do cursor sem acumulá-los em memória
+    - Página igual à que o cliente já tem (If-None-Match): 304, sem enviar o corpo
+    - Com fields, o MongoDB só envia os campos pedidos
+    """
+    campos = campos_solicitados(fields)
+    busca = montar_filtro_busca(nome, email, endereco)
+    filtro = {**busca, **FILTRO_ATIVAS}
+    if after:
+        filtro.update(decodificar_cursor(after, ordenacao))
+    internos = () if formato == "ndjson" else campos_do_cursor(ordenacao)
+    projecao = projecao_esparsa(campos, internos)
+    cursor = db.pessoas.find(filtro, projecao).sort(ordenacao_mongo(ordenacao))
+    # Só cpf e nome, por CPF e sem busca: consulta coberta pelo índice (cpf, nome, deleted_at)
+    if not busca and ordenacao == "cpf" and set(projecao) - {"_id"} <= CAMPOS_INDICE_CPF_NOME:
+        cursor = cursor.hint(INDICE_CPF_NOME)
+    
+    if formato == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(cursor.batch_size(TAMANHO_LOTE_CURSOR)),
+            media_type="application/x-ndjson"
+        )
+    
+    pessoas = await cursor.limit(limit).to_list(limit)
+    
+    # Página cheia: pode haver mais registros depois do último CPF (cursor antes de normalizar as datas)
+    proximo = codificar_cursor(ordenacao, pessoas[-1]) if len(pessoas) == limit else None
+    response = RespostaJSONRapida([recortar(normalizar_datas(pessoa), campos) for pessoa in pessoas])
+    cabecalhos = cabecalhos_condicionais(etag_listagem(response.body, proximo), None)
+    if proximo:
+        cabecalhos["X-Next-Cursor"] = proximo
+    if nao_modificado(request, cabecalhos["ETag"], None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    response.headers.update(cabecalhos)
+    
+    return response
+
+
+# ========================================
+# EXPORTAÇÃO COMPLETA (CSV / NDJSON / PARQUET)
+# ========================================
+# O cadastro inteiro é lido de um único cursor com lotes grandes e enviado em
+# partes de TAMANHO_LOTE_EXPORTACAO linhas, comprimidas à medida que são geradas:
+# a memória fica limitada a um lote, qualquer que seja o tamanho da collection.
+TAMANHO_LOTE_EXPORTACAO = 10000
+NIVEL_GZIP_EXPORTACAO = 6
+TIPOS_EXPORTACAO = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+async def lotes_do_cursor(cursor, tamanho: int) -> AsyncIterator[List[dict]]:
+    """Agrupa os documentos do cursor (com as datas normalizadas) em listas de até `tamanho` itens"""
+    lote = []
+    async for doc in cursor:
+        lote.append(normalizar_datas(doc))
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+async def exportar_csv(lotes: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow(CAMPOS_PESSOA)
+    async for lote in lotes:
+        escritor.writerows(
+            [formatar_instante(pessoa[campo]) if isinstance(pessoa[campo], datetime) else pessoa[campo]
+             for campo in CAMPOS_PESSOA]
+            for pessoa in lote
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def exportar_ndjson(lotes: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for lote in lotes:
+        yield b''.join(orjson.dumps(pessoa, option=orjson.OPT_UTC_Z) + b'\n' for pessoa in lote)
+
+
+class SaidaDrenavel:
+    """Arquivo somente-escrita em memória, esvaziado a cada parte enviada ao cliente"""
+
+    def __init__(self):
+        self.partes: List[bytes] = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados) -> int:
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self.posicao
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drenar(self) -> bytes:
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+async def exportar_parquet(lotes: AsyncIterator[List[dict]], compressao: str) -> AsyncIterator[bytes]:
+    """Cada lote vira um row group (colunar); o rodapé do Parquet é enviado ao final"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema(
+        [(campo, pa.string()) for campo in ('cpf', 'nome', 'email', 'endereco')]
+        + [(campo, pa.timestamp('ms', tz='UTC')) for campo in ('created_at', 'updated_at')]
+    )
+    saida = SaidaDrenavel()
+    escritor = pq.ParquetWriter(saida, schema, compression=compressao)
+    async for lote in lotes:
+        colunas = {campo: [pessoa[campo] for pessoa in lote] for campo in schema.names}
+        escritor.write_table(pa.Table.from_pydict(colunas, schema=schema))
+        yield saida.drenar()
+    escritor.close()
+    yield saida.drenar()
+
+
+async def comprimir_gzip(partes: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Comprime o fluxo em gzip incrementalmente, sem acumular o arquivo inteiro"""
+    compressor = zlib.compressobj(NIVEL_GZIP_EXPORTACAO, zlib.DEFLATED, 31)
+    async for parte in partes:
+        comprimido = compressor.compress(parte)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+@api_router.get(
+    "/pessoas/export",
+    summary="Exportar o cadastro completo",
+    description=(
+        "Exporta todas as pessoas (ordenadas por CPF) em CSV, NDJSON ou Parquet, em streaming. "
+        "Com compression=gzip (padrão), CSV e NDJSON são enviados como .gz e o Parquet usa "
+        "compressão gzip interna nas colunas."
+    )
+)
+async def exportar_pessoas(
+    formato: Literal["csv", "ndjson", "parquet"] = Query("csv", alias="format", description="Formato do arquivo"),
+    compressao: Literal["gzip", "none"] = Query("gzip", alias="compression", description="gzip ou none"),
+):
+    """
+    Exporta o cadastro inteiro para BI sem paginar.
+    
+    Exemplo de BOA PRÁTICA KISS:
+    - Um cursor, um lote em memória por vez e compressão no próprio fluxo
+    """
+    if formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Exportação Parquet requer o pacote pyarrow"
+            )
+    
+    cursor = db.pessoas.find(FILTRO_ATIVAS, PROJECAO_PESSOA).sort("cpf", ASCENDING).batch_size(TAMANHO_LOTE_EXPORTACAO)
+    lotes = lotes_do_cursor(cursor, TAMANHO_LOTE_EXPORTACAO)
+    nome_arquivo = f"pessoas-{datetime.now(timezone.utc):%Y%m%d}.{formato}"
+    media_type = TIPOS_EXPORTACAO[formato]
+    
+    if formato == 'parquet':
+        partes = exportar_parquet(lotes, compressao)
+    else:
+        partes = exportar_csv(lotes) if formato == 'csv' else exportar_ndjson(lotes)
+        if compressao == 'gzip':
+            partes = comprimir_gzip(partes)
+            nome_arquivo += '.gz'
+            media_type = 'application/gzip'
+    
+    return StreamingResponse(
+        partes,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'},
+    )
+
+
+# ========================================
+# ESTATÍSTICAS DO CADASTRO
+# ========================================
+# Contagem e agregações para dashboards, calculadas em uma única passada pela
+# collection ($facet) e guardadas em cache por PESSOAS_STATS_TTL segundos.
+# Prefixo da data ISO 8601 em UTC que identifica o dia ou o mês
+TAMANHOS_PERIODO = {"day": len("AAAA-MM-DD"), "month": len("AAAA-MM")}
+MAXIMO_DOMINIOS_ESTATISTICAS = 100
+
+
+def somar_contagens(facetas: List[dict], faceta: str, campo: str) -> Counter:
+    """Soma as contagens de uma faceta entre os resultados das partições"""
+    contagens = Counter()
+    for resultado in facetas:
+        for item in resultado[faceta]:
+            contagens[item[campo]] += item["count"]
+    return contagens
+
+
+async def calcular_estatisticas(exata: bool, periodo: str, dominios: int) -> dict:
+    """
+    Agregações em uma passada por partição; os resultados das partições são somados.
+    Com partições, cada uma devolve todos os domínios e o corte em `dominios` é feito
+    depois da soma (um domínio fora do topo de uma partição pode estar no topo geral).
+    """
+    if exata:
+        total = await db.pessoas.count_documents(FILTRO_ATIVAS)
+    else:
+        # Estimativa dos metadados menos as excluídas ainda não arquivadas (índice parcial de deleted_at)
+        estimado, excluidas = await asyncio.gather(
+            db.pessoas.estimated_document_count(), db.pessoas.count_documents(FILTRO_EXCLUIDAS)
+        )
+        total = max(estimado - excluidas, 0)
+    facetas = await db.pessoas.aggregate([
+        {"$match": FILTRO_ATIVAS},
+        {"$project": {"_id": 0, "created_at": 1, "email": 1}},
+        {"$facet": {
+            "registrations": [
+                {"$match": {"created_at": {"$ne": None}}},
+                {"$group": {
+                    # Datas viram ISO em UTC e documentos legados já guardam created_at assim (em UTC):
+                    # o prefixo agrupa os dois sem converter texto em data ($substr = $substrBytes)
+                    "_id": {"$substr": [{"$toString": "$created_at"}, 0, TAMANHOS_PERIODO[periodo]]},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "period": "$_id", "count": "$count"}},
+            ],
+            "email_domains": [
+                {"$group": {
+                    "_id": {"$arrayElemAt": [{"$split": [{"$toLower": "$email"}, "@"]}, 1]},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"count": -1, "_id": 1}},
+                *([{"$limit": dominios}] if len(bancos) == 1 else []),
+                {"$project": {"_id": 0, "domain": "$_id", "count": "$count"}},
+            ],
+        }},
+    ]).to_list(None)
+    registros = somar_contagens(facetas, "registrations", "period")
+    dominios_email = somar_contagens(facetas, "email_domains", "domain")
+    return {
+        "total": total,
+        "total_exact": exata,
+        "period": periodo,
+        "registrations": [{"period": p, "count": registros[p]} for p in sorted(registros)],
+        "email_domains": [
+            {"domain": d, "count": c}
+            for d, c in sorted(dominios_email.items(), key=lambda item: (-item[1], item[0]))[:dominios]
+        ],
+        "generated_at": datetime.now(timezone.utc),
+        "cache_ttl_seconds": cache_estatisticas.ttl_segundos,
+    }
+
+
+@api_router.get(
+    "/pessoas/stats",
+    summary="Estatísticas do cadastro",
+    description=(
+        "Total de pessoas ativas (estimado pelos metadados da collection, ou exato com exact=true), "
+        "cadastros por dia ou mês (UTC) e os domínios de email mais comuns. "
+        "O resultado fica em cache por PESSOAS_STATS_TTL segundos (padrão 300)."
+    )
 )
-async def listar_pessoas():
+async def estatisticas_pessoas(
+    exata: bool = Query(False, alias="exact", description="Contagem exata (percorre o índice) em vez da estimada"),
+    periodo: Literal["day", "month"] = Query("day", alias="period", description="Agrupamento dos cadastros"),
+    dominios: int = Query(20, alias="top_domains", ge=1, le=MAXIMO_DOMINIOS_ESTATISTICAS, description="Quantidade de domínios"),
+):
     """
-    Lista todas as pessoas cadastradas.
+    Estatísticas para dashboards sem baixar a listagem.
     
     Exemplo de BOA PRÁTICA KISS:
-    - Endpoint simples
-    - Retorna dados diretos sem transformações complexas
+    - Uma contagem e uma agregação; atualizações do dashboard dentro da janela vêm do cache
+    """
+    chave = (exata, periodo, dominios)
+    estatisticas = cache_estatisticas.get(chave)
+    if estatisticas is None:
+        estatisticas = await calcular_estatisticas(exata, periodo, dominios)
+        cache_estatisticas.set(chave, estatisticas)
+    return RespostaJSONRapida(estatisticas)
+
+
+# ========================================
+# SINCRONIZAÇÃO INCREMENTAL
+# ========================================
+# Espelhos do cadastro recebem só as mudanças em vez de reler a collection:
+# - GET /api/pessoas/changes?since=  (polling pelo índice de updated_at)
+# - GET /api/pessoas/changes/stream  (Server-Sent Events via change streams)
+# Exclusões deixam um registro em pessoas_removidas (cpf + updated_at), expirado
+# por um índice TTL, para que também apareçam no polling.
+COLECAO_REMOVIDAS = "pessoas_removidas"
+RETENCAO_REMOVIDAS_DIAS = float(os.environ.get('PESSOAS_REMOVIDAS_RETENCAO_DIAS', '30'))
+INTERVALO_HEARTBEAT_SSE = float(os.environ.get('SSE_HEARTBEAT_SEGUNDOS', '15'))
+# updated_at vem do relógio da aplicação antes da escrita: uma gravação lenta pode
+# chegar ao banco com um instante anterior ao último já entregue. O polling só
+# entrega mudanças com mais de ATRASO_MUDANCAS de idade, para que não sejam puladas.
+ATRASO_MUDANCAS = timedelta(seconds=float(os.environ.get('PESSOAS_CHANGES_ATRASO_SEGUNDOS', '5')))
+ORDENACAO_MUDANCAS = [("updated_at", ASCENDING), ("cpf", ASCENDING)]
+INICIO_DOS_TEMPOS = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def evento_mudanca(doc: dict, removida: bool) -> dict:
+    """Evento de sincronização: upsert com a pessoa atual ou delete apenas com o CPF"""
+    return {
+        "operation": "delete" if removida else "upsert",
+        "cpf": doc["cpf"],
+        "updated_at": normalizar_instante(doc["updated_at"]),
+        "pessoa": None if removida else normalizar_datas({campo: doc[campo] for campo in CAMPOS_PESSOA if campo in doc}),
+    }
+
+
+def codificar_marca(updated_at: datetime, cpf: str) -> str:
+    """Token opaco da posição de sincronização: (updated_at, cpf) do último evento entregue"""
+    payload = orjson.dumps([updated_at, cpf], option=orjson.OPT_UTC_Z)
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decodificar_marca(since: str) -> Tuple[datetime, str]:
+    """
+    Interpreta `since`: uma data ISO 8601 (mudanças a partir dela) ou o token `next`
+    de uma resposta anterior (mudanças depois do último evento entregue, ou a partir
+    do mesmo instante se a resposta veio sem eventos).
+    
+    Raises:
+        HTTPException: 400 se não for nenhum dos dois
     """
-    pessoas = await db.pessoas.find({}, {"_id": 0}).to_list(1000)
+    try:
+        instante = datetime.fromisoformat(since)
+        return (instante if instante.tzinfo else instante.replace(tzinfo=timezone.utc)), ''
+    except ValueError:
+        pass
+    try:
+        valor, cpf = orjson.loads(base64.urlsafe_b64decode(since + '=' * (-len(since) % 4)))
+        # CPF vazio: next de uma consulta sem eventos, tudo a partir do instante
+        if not isinstance(cpf, str) or cpf and not (len(cpf) == 11 and cpf.isdigit()):
+            raise ValueError(since)
+        return datetime.fromisoformat(valor), cpf
+    except (binascii.Error, orjson.JSONDecodeError, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parâmetro since inválido: use uma data ISO 8601 ou o token next"
+        )
+
+
+async def registrar_remocoes(cpfs: List[str]) -> None:
+    """Marca a exclusão dos CPFs para os clientes de sincronização (instante tomado a cada lote)"""
+    for inicio in range(0, len(cpfs), TAMANHO_LOTE_IMPORTACAO):
+        agora = datetime.now(timezone.utc)
+        await db.pessoas_removidas.bulk_write([
+            ReplaceOne({"cpf": cpf}, {"cpf": cpf, "updated_at": agora}, upsert=True)
+            for cpf in cpfs[inicio:inicio + TAMANHO_LOTE_IMPORTACAO]
+        ], ordered=False)
+
+
+@api_router.get(
+    "/pessoas/changes",
+    summary="Mudanças desde uma posição (sincronização incremental)",
+    description=(
+        "Retorna inclusões/alterações (upsert) e exclusões (delete) em ordem de updated_at. "
+        "Envie em `since` uma data ISO 8601 ou o token `next` da resposta anterior; sem `since`, "
+        "retorna tudo desde o início (carga inicial). Mudanças aparecem com alguns segundos de "
+        "atraso (PESSOAS_CHANGES_ATRASO_SEGUNDOS, padrão 5). Responde 410 se `since` for mais antigo "
+        "que a retenção das exclusões: nesse caso, refaça a carga completa."
+    )
+)
+async def listar_mudancas(
+    since: Optional[str] = Query(None, description="Data ISO 8601 ou token next da resposta anterior"),
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Máximo de eventos"),
+):
+    """
+    Polling de mudanças: duas consultas indexadas por (updated_at, cpf), uma nas
+    pessoas e outra nas exclusões, intercaladas na ordem de updated_at.
+    
+    Exemplo de BOA PRÁTICA KISS:
+    - Mesma ideia da paginação por cursor: a posição é o último (updated_at, cpf) entregue
+    - Eventos mais novos que ATRASO_MUDANCAS ficam para a próxima consulta: gravações
+      ainda em andamento não podem mais surgir atrás da posição do cliente
+    """
+    if since is None:
+        instante, cpf = INICIO_DOS_TEMPOS, ''
+    else:
+        instante, cpf = decodificar_marca(since)
+        limite_retencao = datetime.now(timezone.utc) - timedelta(days=RETENCAO_REMOVIDAS_DIAS)
+        # O início dos tempos (next de uma carga inicial ainda vazia) é uma carga completa, não uma posição vencida
+        if INICIO_DOS_TEMPOS < instante < limite_retencao:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Posição anterior à retenção das exclusões: refaça a sincronização completa"
+            )
+    
+    filtro = {
+        "$or": [{"updated_at": {"$gt": instante}}, {"updated_at": instante, "cpf": {"$gt": cpf}}],
+        "updated_at": {"$lte": datetime.now(timezone.utc) - ATRASO_MUDANCAS},
+    }
+    alteradas, removidas = await asyncio.gather(
+        db.pessoas.find({**filtro, **FILTRO_ATIVAS}, PROJECAO_PESSOA).sort(ORDENACAO_MUDANCAS).limit(limit).to_list(limit),
+        db.pessoas_removidas.find(filtro, {"_id": 0}).sort(ORDENACAO_MUDANCAS).limit(limit).to_list(limit),
+    )
+    eventos = list(heapq.merge(
+        (evento_mudanca(doc, removida=False) for doc in alteradas),
+        (evento_mudanca(doc, removida=True) for doc in removidas),
+        key=lambda evento: (evento["updated_at"], evento["cpf"]),
+    ))[:limit]
+    
+    if eventos:
+        instante, cpf = eventos[-1]["updated_at"], eventos[-1]["cpf"]
+    return RespostaJSONRapida({
+        "changes": eventos,
+        "next": codificar_marca(instante, cpf),
+        "has_more": len(eventos) == limit,
+    })
+
+
+def evento_de_change_stream(mudanca: dict) -> Optional[dict]:
+    """
+    Converte um evento do change stream; None se a pessoa já não existe mais (updateLookup)
+    ou foi excluída logicamente (a exclusão chega pelo evento de pessoas_removidas).
+    """
+    doc = mudanca.get("fullDocument")
+    if doc is None or doc.get("deleted_at") is not None:
+        return None
+    return evento_mudanca(doc, removida=mudanca["ns"]["coll"] == COLECAO_REMOVIDAS)
+
+
+async def stream_sse(request: Request, stream) -> AsyncIterator[bytes]:
+    """
+    Repassa o change stream como Server-Sent Events.
+    
+    O `id` de cada evento é o resume token: ao reconectar, o navegador o envia no
+    header Last-Event-ID e o feed continua de onde parou. Sem mudanças, um
+    comentário é enviado a cada INTERVALO_HEARTBEAT_SSE para manter a conexão.
+    """
+    try:
+        async with stream:
+            while not await request.is_disconnected():
+                mudanca = await stream.try_next()
+                if mudanca is None:
+                    yield b": heartbeat\n\n"
+                    continue
+                evento = evento_de_change_stream(mudanca)
+                if evento is not None:
+                    yield (
+                        f"id: {mudanca['_id']['_data']}\nevent: {evento['operation']}\ndata: ".encode()
+                        + orjson.dumps(evento, option=orjson.OPT_UTC_Z) + b"\n\n"
+                    )
+    except OperationFailure as erro:
+        # Ex: token de retomada que já saiu do oplog - o cliente deve voltar ao polling
+        logger.warning("Feed de mudanças encerrado: %s", erro)
+        yield b"event: error\ndata: " + orjson.dumps({
+            "detail": "Não foi possível continuar o feed; sincronize por GET /api/pessoas/changes"
+        }) + b"\n\n"
+
+
+@api_router.get(
+    "/pessoas/changes/stream",
+    summary="Feed de mudanças em tempo real (Server-Sent Events)",
+    description=(
+        "Emite eventos upsert/delete conforme o cadastro muda, a partir de change streams do MongoDB "
+        "(requer replica set e um único banco; caso contrário responde 503 e o polling deve ser usado). "
+        "Para retomar, envie o id do último evento no header Last-Event-ID ou em `resume_after`."
+    )
+)
+async def acompanhar_mudancas(
+    request: Request,
+    resume_after: Optional[str] = Query(None, description="id do último evento recebido"),
+    last_event_id: Optional[str] = Header(None),
+):
+    token = last_event_id or resume_after
+    if token is not None and not re.fullmatch(r'[0-9A-Fa-f]+', token):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token de retomada inválido"
+        )
     
-    # Converte timestamps ISO de volta para datetime
-    for pessoa in pessoas:
-        if isinstance(pessoa.get('created_at'), str):
-            pessoa['created_at'] = datetime.fromisoformat(pessoa['created_at'])
-        if isinstance(pessoa.get('updated_at'), str):
-            pessoa['updated_at'] = datetime.fromisoformat(pessoa['updated_at'])
+    # Com partições, o resume token de um único change stream não cobre todos os bancos
+    if len(bancos) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Feed de mudanças indisponível com MONGO_PARTICOES; use GET /api/pessoas/changes"
+        )
+    
+    # Change streams só existem em replica set/cluster fragmentado
+    hello = await db.command("hello")
+    if "setName" not in hello and hello.get("msg") != "isdbgrid":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Feed de mudanças indisponível (MongoDB sem replica set); use GET /api/pessoas/changes"
+        )
     
-    return pessoas
+    stream = db.watch(
+        [{"$match": {
+            "ns.coll": {"$in": ["pessoas", COLECAO_REMOVIDAS]},
+            "operationType": {"$in": ["insert", "update", "replace"]},
+        }}],
+        full_document="updateLookup",
+        resume_after={"_data": token} if token else None,
+        max_await_time_ms=int(INTERVALO_HEARTBEAT_SSE * 1000),
+    )
+    return StreamingResponse(
+        stream_sse(request, stream),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_router.get(
@@ -235,12 +1824,17 @@ async def listar_pessoas():
     summary="Buscar pessoa por CPF",
     description="Retorna os dados de uma pessoa específica pelo CPF"
 )
-async def buscar_pessoa(cpf: str):
+async def buscar_pessoa(
+    cpf: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula (ex: cpf,nome)"),
+):
     """
     Busca uma pessoa pelo CPF.
     
     Args:
         cpf: CPF da pessoa (com ou sem formatação)
+        fields: Campos da resposta (padrão: todos)
     
     Exemplo de BOA PRÁTICA DRY:
     - Reutiliza função de formatação de CPF
@@ -254,23 +1848,34 @@ async def buscar_pessoa(cpf: str):
         )
     
     cpf_formatado = formatar_cpf(cpf)
+    campos = campos_solicitados(fields)
     
-    # Busca no banco
-    pessoa = await db.pessoas.find_one({"cpf": cpf_formatado}, {"_id": 0})
-    
-    if not pessoa:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} não encontrada"
+    # Cache hit: responde sem ir ao banco; senão, busca no banco (com fields, só os
+    # campos pedidos e os do ETag, e o documento parcial não vai para o cache)
+    pessoa = cache_pessoas.get(cpf_formatado)
+    if pessoa is None:
+        projecao = projecao_esparsa(campos, ("cpf", "updated_at"))
+        pessoa = await consultar_se_pode_existir(
+            cpf_formatado, lambda: db.pessoas.find_one(filtro_ativa(cpf_formatado), projecao)
         )
+        
+        if not pessoa:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} não encontrada"
+            )
+        
+        normalizar_datas(pessoa)
+        if campos is None:
+            cache_pessoas.set(cpf_formatado, pessoa)
     
-    # Converte timestamps
-    if isinstance(pessoa.get('created_at'), str):
-        pessoa['created_at'] = datetime.fromisoformat(pessoa['created_at'])
-    if isinstance(pessoa.get('updated_at'), str):
-        pessoa['updated_at'] = datetime.fromisoformat(pessoa['updated_at'])
+    # Cliente já tem esta versão: 304 sem serializar
+    etag = etag_pessoa(pessoa)
+    cabecalhos = cabecalhos_condicionais(etag, pessoa["updated_at"])
+    if nao_modificado(request, etag, pessoa["updated_at"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
     
-    return pessoa
+    return RespostaJSONRapida(recortar(pessoa, campos), headers=cabecalhos)
 
 
 @api_router.put(
@@ -300,14 +1905,6 @@ async def atualizar_pessoa(cpf: str, pessoa_update: PessoaUpdate):
     
     cpf_formatado = formatar_cpf(cpf)
     
-    # Verifica se pessoa existe
-    pessoa_existente = await db.pessoas.find_one({"cpf": cpf_formatado}, {"_id": 0})
-    if not pessoa_existente:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} não encontrada"
-        )
-    
     # Prepara dados para atualização (apenas campos não nulos)
     update_data = pessoa_update.model_dump(exclude_unset=True)
     
@@ -317,23 +1914,26 @@ async def atualizar_pessoa(cpf: str, pessoa_update: PessoaUpdate):
             detail="Nenhum campo para atualizar foi fornecido"
         )
     
-    # Adiciona timestamp de atualização
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    # Adiciona campos de busca e timestamp de atualização
+    update_data.update(campos_busca(update_data))
+    update_data['updated_at'] = datetime.now(timezone.utc)
     
-    # Atualiza no banco
-    await db.pessoas.update_one(
-        {"cpf": cpf_formatado},
-        {"$set": update_data}
+    # Atualiza e retorna o documento atualizado em uma única ida ao banco
+    # Sem o filtro de CPFs: um 404 falso (CPF recém-cadastrado em outro worker) perderia a alteração
+    pessoa_atualizada = await db.pessoas.find_one_and_update(
+        filtro_ativa(cpf_formatado),
+        {"$set": update_data},
+        projection=PROJECAO_PESSOA,
+        return_document=ReturnDocument.AFTER
     )
     
-    # Busca e retorna pessoa atualizada
-    pessoa_atualizada = await db.pessoas.find_one({"cpf": cpf_formatado}, {"_id": 0})
+    if not pessoa_atualizada:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} não encontrada"
+        )
     
-    # Converte timestamps
-    if isinstance(pessoa_atualizada.get('created_at'), str):
-        pessoa_atualizada['created_at'] = datetime.fromisoformat(pessoa_atualizada['created_at'])
-    if isinstance(pessoa_atualizada.get('updated_at'), str):
-        pessoa_atualizada['updated_at'] = datetime.fromisoformat(pessoa_atualizada['updated_at'])
+    cache_pessoas.set(cpf_formatado, normalizar_datas(pessoa_atualizada))
     
     return pessoa_atualizada
 
@@ -364,23 +1964,40 @@ async def deletar_pessoa(cpf: str):
     
     cpf_formatado = formatar_cpf(cpf)
     
-    # Verifica se pessoa existe
-    pessoa = await db.pessoas.find_one({"cpf": cpf_formatado})
-    if not pessoa:
+    # Exclui (lógica ou fisicamente) - a contagem indica se a pessoa ativa existia
+    excluidas = await excluir_pessoa(cpf_formatado)
+    cache_pessoas.invalidar(cpf_formatado)
+    if excluidas == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} não encontrada"
         )
-    
-    # Deleta
-    resultado = await db.pessoas.delete_one({"cpf": cpf_formatado})
+    await registrar_remocoes([cpf_formatado])
     
     return {
         "message": f"Pessoa com CPF {PessoaResponse.formatar_cpf_display(cpf_formatado)} deletada com sucesso",
-        "deleted_count": resultado.deleted_count
+        "deleted_count": excluidas
     }
 
 
+@api_router.get(
+    "/cache/stats",
+    summary="Estatísticas do cache de pessoas",
+    description="Contadores do cache de leitura por CPF (hits, misses, evictions) para dimensionamento"
+)
+async def estatisticas_cache():
+    return cache_pessoas.estatisticas()
+
+
+@api_router.get(
+    "/cache/bloom",
+    summary="Estatísticas do filtro de CPFs",
+    description="Memória, taxa de falsos positivos (estimada e observada) e consultas evitadas pelo filtro de Bloom"
+)
+async def estatisticas_filtro_cpfs():
+    return {"enabled": FILTRO_CPFS_HABILITADO, **filtro_cpfs.estatisticas()}
+
+
 # Rota de healthcheck
 @api_router.get("/")
 async def root():
@@ -389,25 +2006,99 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "criar": "POST /api/pessoas",
-            "listar": "GET /api/pessoas",
-            "buscar": "GET /api/pessoas/{cpf}",
+            "importar": "POST /api/pessoas/bulk",
+            "atualizar_em_massa": "PATCH /api/pessoas/bulk?dry_run=",
+            "deletar_em_massa": "DELETE /api/pessoas/bulk?dry_run=",
+            "buscar_varias": "POST /api/pessoas/lookup",
+            "listar": "GET /api/pessoas?limit=&after=&format=json|ndjson&nome=&email=&endereco=&sort=&fields=",
+            "exportar": "GET /api/pessoas/export?format=csv|ndjson|parquet&compression=gzip|none",
+            "estatisticas": "GET /api/pessoas/stats?exact=&period=day|month&top_domains=",
+            "mudancas": "GET /api/pessoas/changes?since=&limit=",
+            "mudancas_tempo_real": "GET /api/pessoas/changes/stream (Server-Sent Events)",
+            "buscar": "GET /api/pessoas/{cpf}?fields=",
             "atualizar": "PUT /api/pessoas/{cpf}",
-            "deletar": "DELETE /api/pessoas/{cpf}"
+            "deletar": "DELETE /api/pessoas/{cpf}",
+            "filtro_cpfs": "GET /api/cache/bloom"
         }
     }
 
 
+# ========================================
+# MÉTRICAS (formato Prometheus)
+# ========================================
+registro.registrar(Contador("pessoas_cache_hits_total", "Acertos do cache de pessoas", funcao=lambda: cache_pessoas.hits))
+registro.registrar(Contador("pessoas_cache_misses_total", "Faltas do cache de pessoas", funcao=lambda: cache_pessoas.misses))
+registro.registrar(Contador("pessoas_cache_evictions_total", "Descartes por tamanho do cache de pessoas", funcao=lambda: cache_pessoas.evictions))
+registro.registrar(Medidor("pessoas_cache_size", "Entradas no cache de pessoas", funcao=lambda: len(cache_pessoas)))
+registro.registrar(Medidor("pessoas_bloom_memory_bytes", "Memória do filtro de Bloom de CPFs", funcao=lambda: filtro_cpfs.filtro.memoria_bytes if filtro_cpfs.pronto else 0))
+registro.registrar(Medidor("pessoas_bloom_estimated_false_positive_rate", "Taxa estimada de falsos positivos do filtro de CPFs", funcao=lambda: filtro_cpfs.estatisticas().get("estimated_false_positive_rate", 0)))
+registro.registrar(Contador("pessoas_bloom_short_circuited_total", "CPFs respondidos como inexistentes sem consultar o banco", funcao=lambda: filtro_cpfs.ausentes))
+registro.registrar(Contador("pessoas_bloom_false_positives_total", "CPFs que o filtro deixou passar e o banco não encontrou", funcao=lambda: filtro_cpfs.falsos_positivos))
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4")
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Mais interno: registra a resposta da rota sem compressão e sem os headers de CORS,
+# que são aplicados de novo, conforme a requisição, também nas respostas repetidas
+app.add_middleware(
+    MiddlewareIdempotencia,
+    rotas=app.router.routes,
+    armazenamento=registro_idempotencia,
+    rotas_idempotentes={
+        "POST /api/pessoas",
+        "PUT /api/pessoas/{cpf}",
+        "DELETE /api/pessoas/{cpf}",
+    },
+)
+
+# Rotas pesadas têm limite de concorrência próprio, abaixo do padrão
+LIMITES_CONCORRENCIA_ROTAS = {
+    "GET /api/pessoas/export": 4,
+    "POST /api/pessoas/bulk": 4,
+    "PATCH /api/pessoas/bulk": 4,
+    "DELETE /api/pessoas/bulk": 4,
+    "GET /api/pessoas/stats": 8,
+}
+
+# Por dentro do CORS: as respostas 429/503 levam os headers de CORS, e o navegador
+# entrega ao cliente o status e o Retry-After em vez de um erro de rede opaco
+app.add_middleware(
+    MiddlewareAdmissao,
+    rotas=app.router.routes,
+    baldes=baldes_limite_taxa,
+    taxa=float(os.environ.get('RATE_LIMIT_POR_SEGUNDO', '0')),
+    capacidade=float(os.environ.get('RATE_LIMIT_RAJADA', '100')),
+    concorrencia_padrao=int(os.environ.get('CONCORRENCIA_MAXIMA_ROTA', '100')),
+    concorrencia_rotas=LIMITES_CONCORRENCIA_ROTAS,
+    isentos={"/api/", "/metrics"},
+    confiar_proxy=os.environ.get('RATE_LIMIT_CONFIAR_PROXY', 'false').lower() == 'true',
+    chaves_api=[chave.strip() for chave in os.environ.get('RATE_LIMIT_API_KEYS', '').split(',') if chave.strip()],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", "Last-Modified", "Retry-After"],
 )
 
+# Compressão por dentro das métricas: o Server-Timing inclui o tempo de compressão
+app.add_middleware(
+    MiddlewareCompressao,
+    tamanho_minimo=int(os.environ.get('COMPRESSAO_TAMANHO_MINIMO', '1000')),
+)
+
+# Adicionado por último: é o middleware mais externo e mede a requisição inteira
+app.add_middleware(MiddlewareMetricas)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -415,6 +2106,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+
+async def criar_indices():
+    """Garante os índices de pessoas (unicidade do CPF, buscas, ordenações e sincronização) e das exclusões"""
+    await db.pessoas.create_index([("cpf", ASCENDING)], unique=True)
+    await db.pessoas.create_index([("nome_busca", ASCENDING), ("cpf", ASCENDING)])
+    await db.pessoas.create_index([("email_busca", ASCENDING)])
+    await db.pessoas.create_index([("created_at", ASCENDING), ("cpf", ASCENDING)])
+    await db.pessoas.create_index([("endereco", TEXT)], default_language="portuguese")
+    await db.pessoas.create_index([("updated_at", ASCENDING), ("cpf", ASCENDING)])
+    # Listagens com fields=cpf,nome respondidas só pelo índice (consulta coberta)
+    await db.pessoas.create_index(INDICE_CPF_NOME)
+    # Índice parcial: contém só as excluídas logicamente, que o arquivador procura
+    await db.pessoas.create_index(
+        [("deleted_at", ASCENDING)], partialFilterExpression={"deleted_at": {"$exists": True}}
+    )
+    
+    # Exclusões para a sincronização incremental, expiradas após a retenção
+    await db.pessoas_removidas.create_index([("cpf", ASCENDING)], unique=True)
+    await db.pessoas_removidas.create_index([("updated_at", ASCENDING), ("cpf", ASCENDING)])
+    await garantir_indice_ttl(COLECAO_REMOVIDAS, "updated_at", RETENCAO_REMOVIDAS_DIAS)
+    
+    # Arquivo das pessoas excluídas (sem expiração com PESSOAS_ARQUIVO_RETENCAO_DIAS=0)
+    await db.pessoas_arquivo.create_index([("cpf", ASCENDING)])
+    if ARQUIVO_RETENCAO_DIAS > 0:
+        await garantir_indice_ttl("pessoas_arquivo", "arquivado_em", ARQUIVO_RETENCAO_DIAS)
+
+
+async def garantir_indice_ttl(colecao: str, campo: str, retencao_dias: float) -> None:
+    """Cria o índice TTL do campo ou, se ele já existe com outra retenção, ajusta em vez de recriar"""
+    retencao = int(retencao_dias * 86400)
+    try:
+        await db[colecao].create_index([(campo, ASCENDING)], expireAfterSeconds=retencao)
+    except OperationFailure:
+        await db.command("collMod", colecao, index={"keyPattern": {campo: 1}, "expireAfterSeconds": retencao})
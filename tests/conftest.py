@@ -0,0 +1,51 @@
+"""
+Fixtures dos testes: a API em processo sobre um MongoDB em memória (mongomock-motor).
+
+Executar a partir da raiz do repositório: python -m pytest -q
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "testes")
+os.environ.setdefault("CONCORRENCIA_MAXIMA_ROTA", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from metricas import BancoMedido  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    """Banco vazio a cada teste, com os caches de leitura zerados"""
+    banco = BancoMedido(AsyncMongoMockClient(tz_aware=True)["testes"])
+    monkeypatch.setattr(server, "db", banco)
+    server.cache_pessoas.limpar()
+    server.cache_estatisticas.limpar()
+    return banco
+
+
+@pytest.fixture
+def api(banco):
+    """Cliente HTTP da API (o lifespan cria os índices e o filtro de CPFs no banco do teste)"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def pessoa():
+    """Monta o corpo de um cadastro válido para o CPF informado"""
+    def montar(cpf: str, indice: int = 0) -> dict:
+        return {
+            "cpf": cpf,
+            "nome": f"Pessoa Teste {indice}",
+            "email": f"pessoa{indice}@exemplo.com",
+            "endereco": f"Rua dos Testes, {indice}",
+        }
+    return montar
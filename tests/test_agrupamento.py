@@ -0,0 +1,48 @@
+"""Agrupamento das inclusões: cada inclusão recebe o resultado do seu lote"""
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from agrupamento import AgrupadorInclusoes
+from mongomock_motor import AsyncMongoMockClient
+
+
+def executar(apos_gravar, lotes):
+    """Grava os lotes em sequência e devolve o resultado de cada inclusão (None ou a exceção)"""
+    async def principal():
+        colecao = AsyncMongoMockClient()["testes"]["pessoas"]
+        await colecao.create_index("cpf", unique=True)
+        agrupador = AgrupadorInclusoes(
+            lambda docs: colecao.insert_many(docs, ordered=False), espera_ms=1, apos_gravar=apos_gravar
+        )
+        await agrupador.iniciar()
+        resultados = []
+        for lote in lotes:
+            resultados.append(await asyncio.wait_for(asyncio.gather(
+                *(agrupador.inserir({"cpf": cpf}) for cpf in lote), return_exceptions=True
+            ), timeout=5))
+        await agrupador.encerrar()
+        return resultados
+    return asyncio.run(principal())
+
+
+def test_duplicado_falha_so_a_propria_inclusao():
+    [resultados] = executar(None, [["1", "2", "1"]])
+
+    assert resultados[:2] == [None, None]
+    assert isinstance(resultados[2], DuplicateKeyError)
+
+
+def test_erro_depois_da_gravacao_falha_o_lote_e_o_agrupador_continua():
+    gravados = []
+
+    def apos_gravar(docs):
+        if not gravados:
+            gravados.append(docs)
+            raise RuntimeError("filtro indisponível")
+
+    primeiro, segundo = executar(apos_gravar, [["1", "2"], ["3"]])
+
+    assert all(isinstance(resultado, RuntimeError) for resultado in primeiro)
+    assert segundo == [None]
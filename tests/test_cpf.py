@@ -0,0 +1,47 @@
+"""Validação de CPF: a versão em lote (cpf_lote) segue as mesmas regras de validar_cpf"""
+import random
+
+from cpf_lote import validar_cpfs_em_lote
+from gerar_dados import gerar_cpfs
+from server import formatar_cpf, validar_cpf
+
+
+def variacoes(rng: random.Random, cpf: str) -> list:
+    """O CPF como os clientes enviam, e versões quase válidas dele"""
+    digito = rng.randrange(11)
+    trocado = cpf[:digito] + str((int(cpf[digito]) + rng.randrange(1, 10)) % 10) + cpf[digito + 1:]
+    return [
+        cpf,
+        f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}",
+        f" {cpf} ",
+        trocado,
+        cpf[:10],
+        cpf + rng.choice("0123456789"),
+        cpf[:5] + rng.choice("abc/-x ") + cpf[5:],
+        cpf[:4] + "٣" + cpf[5:],  # dígito fora do ASCII: não conta como dígito
+    ]
+
+
+def test_lote_concorda_com_validar_cpf_em_entradas_aleatorias():
+    rng = random.Random(2024)
+    entradas = ["", "0", "00000000000", "111.111.111-11", "12345678909", "abcdefghijk", "1" * 30]
+    for cpf in gerar_cpfs(rng.randrange(1000), 0, 300):
+        entradas += variacoes(rng, cpf)
+    for _ in range(2000):
+        tamanho = rng.choice((9, 10, 11, 11, 11, 12, 14))
+        entradas.append("".join(rng.choice("0123456789.-") for _ in range(tamanho)))
+
+    validos, normalizados = validar_cpfs_em_lote(entradas)
+
+    for entrada, valido, normalizado in zip(entradas, validos.tolist(), normalizados.tolist()):
+        assert valido == validar_cpf(entrada), entrada
+        assert normalizado == (formatar_cpf(entrada) if valido else ""), entrada
+
+
+def test_cpfs_gerados_sao_validos_e_distintos():
+    cpfs = gerar_cpfs(7, 0, 5000)
+
+    validos, _ = validar_cpfs_em_lote(cpfs)
+
+    assert validos.all()
+    assert len(set(cpfs)) == len(cpfs)
@@ -0,0 +1,57 @@
+"""Documentos legados com created_at/updated_at em texto ISO saem no mesmo formato UTC dos atuais"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from gerar_dados import gerar_cpfs
+
+INSTANTE = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+TEXTO = "2020-05-17T12:30:00Z"
+
+
+def inserir_legada(api, banco, pessoa, cpf):
+    documento = {**pessoa(cpf), "created_at": "2020-05-17T12:30:00", "updated_at": "2020-05-17T12:30:00+00:00"}
+    api.portal.call(banco.pessoas.insert_one, documento)
+
+
+def test_leituras_normalizam_datas_em_texto(api, banco, pessoa):
+    cpf = gerar_cpfs(41, 0, 1)[0]
+    inserir_legada(api, banco, pessoa, cpf)
+
+    individual = api.get(f"/api/pessoas/{cpf}").json()
+    [listada] = api.get("/api/pessoas").json()
+    [encontrada] = api.post("/api/pessoas/lookup", json={"cpfs": [cpf]}).json()["found"]
+
+    for documento in (individual, listada, encontrada):
+        assert (documento["created_at"], documento["updated_at"]) == (TEXTO, TEXTO)
+
+
+def test_exportacoes_normalizam_datas_em_texto(api, banco, pessoa):
+    import pyarrow.parquet as pq
+
+    cpf = gerar_cpfs(42, 0, 1)[0]
+    inserir_legada(api, banco, pessoa, cpf)
+
+    def exportar(formato):
+        resposta = api.get("/api/pessoas/export", params={"format": formato, "compression": "none"})
+        assert resposta.status_code == 200
+        return resposta.content
+
+    [linha] = csv.DictReader(io.StringIO(exportar("csv").decode()))
+    assert (linha["created_at"], linha["updated_at"]) == (TEXTO, TEXTO)
+    documento = json.loads(exportar("ndjson"))
+    assert (documento["created_at"], documento["updated_at"]) == (TEXTO, TEXTO)
+    [registro] = pq.read_table(io.BytesIO(exportar("parquet"))).to_pylist()
+    assert registro["created_at"] == registro["updated_at"] == INSTANTE
+
+
+def test_listagem_mistura_datas_em_texto_e_nativas(api, banco, pessoa):
+    legado, atual = gerar_cpfs(43, 0, 2)
+    inserir_legada(api, banco, pessoa, legado)
+    assert api.post("/api/pessoas", json=pessoa(atual, 1)).status_code == 201
+
+    pessoas = api.get("/api/pessoas").json()
+
+    assert sorted(p["cpf"] for p in pessoas) == sorted([legado, atual])
+    assert all(p["created_at"].endswith("Z") and p["updated_at"].endswith("Z") for p in pessoas)
@@ -0,0 +1,43 @@
+"""Estatísticas do cadastro: totais das pessoas ativas e cadastros por período com datas legadas"""
+from datetime import datetime, timezone
+
+import pytest
+
+from gerar_dados import gerar_cpfs
+
+
+@pytest.fixture
+def cadastro(api, banco, pessoa):
+    """Cadastros com created_at nativo, em texto (legado) e ausente, mais uma pessoa excluída"""
+    nativa, legada, sem_data, outro_dominio, excluida = gerar_cpfs(51, 0, 5)
+    api.portal.call(banco.pessoas.insert_many, [
+        {**pessoa(nativa, 1), "created_at": datetime(2024, 5, 6, 23, 59, tzinfo=timezone.utc)},
+        {**pessoa(legada, 2), "created_at": "2024-05-06T08:00:00.123456+00:00"},
+        {**pessoa(sem_data, 3)},
+        {**pessoa(outro_dominio, 4), "email": "Alguem@Outro.com.br",
+         "created_at": datetime(2024, 6, 1, tzinfo=timezone.utc)},
+    ])
+    assert api.post("/api/pessoas", json=pessoa(excluida, 5)).status_code == 201
+    assert api.delete(f"/api/pessoas/{excluida}").status_code == 200
+
+
+@pytest.mark.parametrize("exata", ["false", "true"])
+def test_total_conta_apenas_pessoas_ativas(api, cadastro, exata):
+    estatisticas = api.get("/api/pessoas/stats", params={"exact": exata}).json()
+
+    assert estatisticas["total"] == 4
+    assert estatisticas["total_exact"] == (exata == "true")
+
+
+def test_cadastros_por_dia_e_por_mes_incluem_datas_legadas(api, cadastro):
+    por_dia = api.get("/api/pessoas/stats", params={"period": "day"}).json()["registrations"]
+    por_mes = api.get("/api/pessoas/stats", params={"period": "month"}).json()["registrations"]
+
+    assert por_dia == [{"period": "2024-05-06", "count": 2}, {"period": "2024-06-01", "count": 1}]
+    assert por_mes == [{"period": "2024-05", "count": 2}, {"period": "2024-06", "count": 1}]
+
+
+def test_dominios_de_email_mais_comuns(api, cadastro):
+    dominios = api.get("/api/pessoas/stats", params={"top_domains": 1}).json()["email_domains"]
+
+    assert dominios == [{"domain": "exemplo.com", "count": 3}]
@@ -0,0 +1,54 @@
+"""Exclusão lógica: a pessoa excluída some das leituras e o CPF pode ser cadastrado de novo"""
+import json
+
+from gerar_dados import gerar_cpfs
+
+
+def documentos(api, colecao, cpf):
+    return api.portal.call(lambda: colecao.find({"cpf": cpf}, {"_id": 0}).to_list(None))
+
+
+def test_exclusao_marca_deleted_at_e_esconde_a_pessoa(api, banco, pessoa):
+    cpf = gerar_cpfs(21, 0, 1)[0]
+    assert api.post("/api/pessoas", json=pessoa(cpf)).status_code == 201
+
+    assert api.delete(f"/api/pessoas/{cpf}").json()["deleted_count"] == 1
+
+    assert api.get(f"/api/pessoas/{cpf}").status_code == 404
+    assert api.get("/api/pessoas").json() == []
+    assert api.delete(f"/api/pessoas/{cpf}").status_code == 404
+    assert api.put(f"/api/pessoas/{cpf}", json={"nome": "Outro Nome"}).status_code == 404
+    [excluida] = documentos(api, banco.pessoas, cpf)
+    assert excluida["deleted_at"] is not None
+
+
+def test_recadastro_de_cpf_excluido_arquiva_a_versao_anterior(api, banco, pessoa):
+    cpf = gerar_cpfs(22, 0, 1)[0]
+    assert api.post("/api/pessoas", json=pessoa(cpf, 1)).status_code == 201
+    assert api.delete(f"/api/pessoas/{cpf}").status_code == 200
+
+    resposta = api.post("/api/pessoas", json=pessoa(cpf, 2))
+
+    assert resposta.status_code == 201
+    assert api.get(f"/api/pessoas/{cpf}").json()["nome"] == "Pessoa Teste 2"
+    [ativa] = documentos(api, banco.pessoas, cpf)
+    assert ativa.get("deleted_at") is None
+    [arquivada] = documentos(api, banco.pessoas_arquivo, cpf)
+    assert arquivada["nome"] == "Pessoa Teste 1" and arquivada["deleted_at"] is not None
+
+
+def test_importacao_recadastra_cpfs_excluidos(api, banco, pessoa):
+    cpfs = gerar_cpfs(23, 0, 3)
+    for cpf in cpfs:
+        assert api.post("/api/pessoas", json=pessoa(cpf)).status_code == 201
+    assert api.request("DELETE", "/api/pessoas/bulk", json={"cpfs": cpfs[:2]}).status_code == 200
+
+    linhas = "\n".join(json.dumps(pessoa(cpf, 9)) for cpf in cpfs)
+    resultado = api.post(
+        "/api/pessoas/bulk", content=linhas.encode(), headers={"content-type": "application/x-ndjson"}
+    ).json()
+
+    # Os dois excluídos voltam; o ainda ativo continua sendo um CPF duplicado
+    assert resultado["inserted_count"] == 2
+    assert [erro["cpf"] for erro in resultado["errors"]] == [cpfs[2]]
+    assert len(api.get("/api/pessoas").json()) == 3
@@ -0,0 +1,39 @@
+"""Filtro de CPFs: a sincronização inclui os cadastros gravados por outros workers"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+import server
+from filtro_bloom import FiltroCpfs
+from gerar_dados import gerar_cpfs
+
+
+def test_sincronizacao_le_a_partir_do_ultimo_id_com_sobreposicao(banco, pessoa, monkeypatch):
+    antigo, novo, fora_de_ordem, ausente = gerar_cpfs(71, 0, 4)
+    filtro = FiltroCpfs(validade_segundos=60)
+    monkeypatch.setattr(server, "filtro_cpfs", filtro)
+    monkeypatch.setattr(server, "FILTRO_CPFS_SINCRONIZACAO_SEGUNDOS", 0.01)
+    lidos = []
+    adicionar = filtro.adicionar
+    monkeypatch.setattr(filtro, "adicionar", lambda cpfs: (lidos.extend(cpfs), adicionar(cpfs)))
+
+    async def cenario():
+        recente = datetime.now(timezone.utc) - timedelta(seconds=3)
+        await banco.pessoas.insert_one({**pessoa(antigo), "_id": ObjectId.from_datetime(recente)})
+        tarefa = asyncio.create_task(server.manter_filtro_cpfs())
+        await asyncio.sleep(0.05)
+        await banco.pessoas.insert_one(pessoa(novo, 1))
+        await asyncio.sleep(0.05)
+        # Gravado depois, com um ObjectId gerado um pouco antes do último já lido
+        anterior = datetime.now(timezone.utc) - timedelta(milliseconds=500)
+        await banco.pessoas.insert_one({**pessoa(fora_de_ordem, 2), "_id": ObjectId.from_datetime(anterior)})
+        await asyncio.sleep(0.05)
+        tarefa.cancel()
+
+    asyncio.run(cenario())
+
+    assert all(filtro.pode_existir(cpf) for cpf in (antigo, novo, fora_de_ordem))
+    assert not filtro.pode_existir(ausente)
+    # O cadastro anterior à reconstrução ficou fora da sobreposição: as sincronizações não o releem
+    assert antigo not in lidos
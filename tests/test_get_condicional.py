@@ -0,0 +1,74 @@
+"""ETag / Last-Modified de GET /api/pessoas/{cpf} e GET /api/pessoas"""
+from datetime import datetime, timezone
+
+from gerar_dados import gerar_cpfs
+from server import etag_pessoa
+
+
+def test_etag_pessoa_aceita_timestamp_legado_em_string():
+    gravado = datetime(2024, 1, 2, 3, 4, 5, 123000, tzinfo=timezone.utc)
+    esperado = etag_pessoa({"cpf": "12345678909", "updated_at": gravado})
+
+    assert etag_pessoa({"cpf": "12345678909", "updated_at": "2024-01-02T03:04:05.123+00:00"}) == esperado
+    # Strings sem fuso foram gravadas em UTC
+    assert etag_pessoa({"cpf": "12345678909", "updated_at": "2024-01-02T03:04:05.123"}) == esperado
+
+
+def test_get_de_documento_legado_responde_e_revalida(api, banco):
+    cpf = gerar_cpfs(1, 0, 1)[0]
+    api.portal.call(banco.pessoas.insert_one, {
+        "cpf": cpf, "nome": "Pessoa Legada", "email": "legada@exemplo.com", "endereco": "Rua Antiga, 1",
+        "created_at": "2024-01-02T03:04:05", "updated_at": "2024-01-02T03:04:05", "deleted_at": None,
+    })
+
+    resposta = api.get(f"/api/pessoas/{cpf}")
+    assert resposta.status_code == 200
+    assert resposta.json()["updated_at"] == "2024-01-02T03:04:05Z"
+    assert api.get(f"/api/pessoas/{cpf}", headers={"If-None-Match": resposta.headers["etag"]}).status_code == 304
+
+
+def test_etag_da_listagem_muda_com_escritas_fora_da_api(api, banco, pessoa):
+    cpfs = gerar_cpfs(2, 0, 2)
+    assert api.post("/api/pessoas", json=pessoa(cpfs[0])).status_code == 201
+    etag = api.get("/api/pessoas").headers["etag"]
+    assert api.get("/api/pessoas", headers={"If-None-Match": etag}).status_code == 304
+
+    # Carga direta no banco (gerar_dados.py, migrações) com uma data antiga
+    api.portal.call(banco.pessoas.insert_one, {
+        **pessoa(cpfs[1], 1), "deleted_at": None,
+        "created_at": datetime(2020, 1, 1, tzinfo=timezone.utc), "updated_at": datetime(2020, 1, 1, tzinfo=timezone.utc),
+    })
+    resposta = api.get("/api/pessoas", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert len(resposta.json()) == 2
+
+
+def test_listagem_consulta_o_banco_uma_vez_por_pagina(api, pessoa, monkeypatch):
+    import metricas
+
+    cpf = gerar_cpfs(3, 0, 1)[0]
+    assert api.post("/api/pessoas", json=pessoa(cpf)).status_code == 201
+    operacoes = []
+    monkeypatch.setattr(metricas, "registrar_operacao", lambda operacao, _: operacoes.append(operacao))
+
+    resposta = api.get("/api/pessoas")
+
+    assert operacoes == ["find"]
+    assert "etag" in resposta.headers and "last-modified" not in resposta.headers
+
+
+def test_exclusao_fisica_muda_o_etag_da_listagem(api, pessoa, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "EXCLUSAO_LOGICA", False)
+    cpfs = gerar_cpfs(4, 0, 2)
+    for indice, cpf in enumerate(cpfs):
+        assert api.post("/api/pessoas", json=pessoa(cpf, indice)).status_code == 201
+    etag = api.get("/api/pessoas").headers["etag"]
+
+    assert api.delete(f"/api/pessoas/{cpfs[1]}").status_code == 200
+
+    resposta = api.get("/api/pessoas", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert [p["cpf"] for p in resposta.json()] == [cpfs[0]]
+    assert api.get("/api/pessoas", headers={"If-None-Match": resposta.headers["etag"]}).status_code == 304
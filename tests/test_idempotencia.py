@@ -0,0 +1,76 @@
+"""Header Idempotency-Key: repetição da resposta, 422 com outra requisição e 409 em andamento"""
+import asyncio
+import uuid
+
+import httpx
+from fastapi import FastAPI
+
+from gerar_dados import gerar_cpfs
+from idempotencia import IdempotenciaMemoria, MiddlewareIdempotencia
+
+
+def test_nova_tentativa_recebe_a_mesma_resposta_sem_gravar_de_novo(api, banco, pessoa):
+    cpf = gerar_cpfs(11, 0, 1)[0]
+    cabecalhos = {"Idempotency-Key": str(uuid.uuid4())}
+
+    primeira = api.post("/api/pessoas", json=pessoa(cpf), headers=cabecalhos)
+    repetida = api.post("/api/pessoas", json=pessoa(cpf), headers=cabecalhos)
+
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.json() == primeira.json()
+    assert repetida.headers["idempotent-replayed"] == "true"
+    assert api.portal.call(banco.pessoas.count_documents, {"cpf": cpf}) == 1
+    # Sem a chave, a mesma inclusão esbarra no CPF já cadastrado
+    assert api.post("/api/pessoas", json=pessoa(cpf)).status_code == 400
+
+
+def test_mesma_chave_com_outro_corpo_responde_422(api, pessoa):
+    cpfs = gerar_cpfs(12, 0, 2)
+    cabecalhos = {"Idempotency-Key": str(uuid.uuid4())}
+
+    assert api.post("/api/pessoas", json=pessoa(cpfs[0]), headers=cabecalhos).status_code == 201
+    resposta = api.post("/api/pessoas", json=pessoa(cpfs[1]), headers=cabecalhos)
+
+    assert resposta.status_code == 422
+    assert api.get(f"/api/pessoas/{cpfs[1]}").status_code == 404
+
+
+def test_chaves_de_clientes_diferentes_nao_colidem(api, pessoa):
+    cpfs = gerar_cpfs(13, 0, 2)
+    chave = str(uuid.uuid4())
+
+    for cpf, cliente in zip(cpfs, ("a", "b")):
+        resposta = api.post("/api/pessoas", json=pessoa(cpf), headers={"Idempotency-Key": chave, "X-API-Key": cliente})
+        assert resposta.status_code == 201
+
+
+def test_mesma_chave_em_andamento_responde_409():
+    iniciada, liberar = asyncio.Event(), asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/lenta")
+    async def lenta():
+        iniciada.set()
+        await liberar.wait()
+        return {"ok": True}
+
+    app.add_middleware(
+        MiddlewareIdempotencia, rotas=app.router.routes,
+        armazenamento=IdempotenciaMemoria(tamanho_maximo=100, ttl_segundos=60), rotas_idempotentes={"POST /lenta"},
+    )
+    cabecalhos = {"Idempotency-Key": "chave-1"}
+
+    async def cenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://teste") as cliente:
+            primeira = asyncio.create_task(cliente.post("/lenta", json={}, headers=cabecalhos))
+            await iniciada.wait()
+            concorrente = await cliente.post("/lenta", json={}, headers=cabecalhos)
+            liberar.set()
+            return await primeira, concorrente, await cliente.post("/lenta", json={}, headers=cabecalhos)
+
+    primeira, concorrente, depois = asyncio.run(cenario())
+
+    assert primeira.status_code == 200
+    assert concorrente.status_code == 409
+    assert concorrente.headers["retry-after"] == "1"
+    assert depois.status_code == 200 and depois.headers["idempotent-replayed"] == "true"
@@ -0,0 +1,26 @@
+"""Controle de admissão: recusas visíveis para clientes de navegador (CORS)"""
+import server
+from limites import MiddlewareAdmissao
+
+
+def middleware_admissao() -> MiddlewareAdmissao:
+    """Instância do controle de admissão na pilha de middlewares da aplicação"""
+    camada = server.app.middleware_stack
+    while not isinstance(camada, MiddlewareAdmissao):
+        camada = camada.app
+    return camada
+
+
+def test_resposta_429_leva_os_headers_de_cors(api, monkeypatch):
+    admissao = middleware_admissao()
+    monkeypatch.setattr(admissao, "taxa", 0.001)
+    monkeypatch.setattr(admissao, "capacidade", 1.0)
+    origem = {"Origin": "https://painel.exemplo.com"}
+
+    assert api.get("/api/pessoas", headers=origem).status_code == 200
+    resposta = api.get("/api/pessoas", headers=origem)
+
+    assert resposta.status_code == 429
+    assert resposta.headers["access-control-allow-origin"] in ("*", origem["Origin"])
+    assert "retry-after" in resposta.headers["access-control-expose-headers"].lower()
+    assert int(resposta.headers["retry-after"]) >= 1
@@ -0,0 +1,81 @@
+"""Sincronização incremental: posição opaca (since / next) e o polling de /changes"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from gerar_dados import gerar_cpfs
+from server import codificar_marca, decodificar_marca
+
+
+def test_marca_da_sincronizacao_ida_e_volta():
+    instante = datetime(2024, 5, 6, 7, 8, 9, 123000, tzinfo=timezone.utc)
+
+    assert decodificar_marca(codificar_marca(instante, "12345678909")) == (instante, "12345678909")
+
+
+def test_marca_aceita_data_iso_sem_fuso_como_utc():
+    assert decodificar_marca("2024-05-06T07:08:09") == (datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc), "")
+
+
+def test_marca_invalida_responde_400():
+    with pytest.raises(HTTPException) as erro:
+        decodificar_marca("ontem")
+    assert erro.value.status_code == 400
+
+
+def test_marca_sem_cpf_de_consulta_vazia_ida_e_volta():
+    instante = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+
+    assert decodificar_marca(codificar_marca(instante, "")) == (instante, "")
+
+
+@pytest.mark.parametrize("desde_ontem", [False, True])
+def test_polling_sem_eventos_pode_continuar_do_next(api, desde_ontem):
+    ontem = datetime.now(timezone.utc) - timedelta(days=1)
+    params = {"since": ontem.isoformat()} if desde_ontem else {}
+    primeira = api.get("/api/pessoas/changes", params=params)
+    assert primeira.status_code == 200 and primeira.json()["changes"] == []
+
+    segunda = api.get("/api/pessoas/changes", params={"since": primeira.json()["next"]})
+
+    assert segunda.status_code == 200
+    assert segunda.json() == {**primeira.json(), "next": segunda.json()["next"]}
+    assert api.get("/api/pessoas/changes", params={"since": segunda.json()["next"]}).status_code == 200
+
+
+class Relogio(datetime):
+    """Relógio que avança um segundo a cada leitura"""
+    leituras = 0
+
+    @classmethod
+    def now(cls, tz=None):
+        cls.leituras += 1
+        return datetime(2024, 5, 6, tzinfo=timezone.utc) + timedelta(seconds=cls.leituras)
+
+
+def instantes_gravados(api, banco, campo):
+    pessoas = api.portal.call(lambda: banco.pessoas.find({}, {"_id": 0}).sort("cpf", 1).to_list(None))
+    return [pessoa[campo] for pessoa in pessoas]
+
+
+def test_lotes_da_importacao_e_da_atualizacao_em_massa_levam_o_instante_da_gravacao(
+    api, banco, pessoa, monkeypatch
+):
+    import server
+
+    cpfs = sorted(gerar_cpfs(61, 0, 5))
+    monkeypatch.setattr(server, "TAMANHO_LOTE_IMPORTACAO", 2)
+    monkeypatch.setattr(server, "datetime", Relogio)
+    ndjson = "\n".join(json.dumps(pessoa(cpf, indice)) for indice, cpf in enumerate(cpfs))
+
+    resposta = api.post("/api/pessoas/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert resposta.json()["inserted_count"] == 5
+    criacao = instantes_gravados(api, banco, "created_at")
+    assert criacao[0] == criacao[1] < criacao[2] == criacao[3] < criacao[4]
+
+    itens = [{"cpf": cpf, "nome": "Nome Alterado"} for cpf in cpfs]
+    assert api.patch("/api/pessoas/bulk", json={"items": itens}).json()["summary"] == {"updated": 5}
+    atualizacao = instantes_gravados(api, banco, "updated_at")
+    assert criacao[4] < atualizacao[0] == atualizacao[1] < atualizacao[2] == atualizacao[3] < atualizacao[4]
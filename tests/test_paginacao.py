@@ -0,0 +1,70 @@
+"""Cursor opaco da listagem (after / X-Next-Cursor)"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from gerar_dados import gerar_cpfs
+from server import codificar_cursor, decodificar_cursor
+
+PESSOA = {
+    "cpf": "12345678909",
+    "nome": "José da Silva",
+    "created_at": datetime(2024, 5, 6, 7, 8, 9, 123000, tzinfo=timezone.utc),
+}
+
+
+def test_cursor_por_cpf_continua_depois_do_ultimo_cpf():
+    assert decodificar_cursor(codificar_cursor("cpf", PESSOA), "cpf") == {"cpf": {"$gt": "12345678909"}}
+
+
+def test_cursor_por_nome_usa_o_nome_normalizado_e_desempata_pelo_cpf():
+    filtro = decodificar_cursor(codificar_cursor("-nome", PESSOA), "-nome")
+
+    assert filtro == {"$or": [
+        {"nome_busca": {"$lt": "jose da silva"}},
+        {"nome_busca": "jose da silva", "cpf": {"$lt": "12345678909"}},
+    ]}
+
+
+def test_cursor_por_data_preserva_o_instante():
+    filtro = decodificar_cursor(codificar_cursor("created_at", PESSOA), "created_at")
+
+    assert filtro["$or"][0] == {"created_at": {"$gt": PESSOA["created_at"]}}
+
+
+@pytest.mark.parametrize("token", ["", "nao-e-base64!", "W10", codificar_cursor("cpf", PESSOA)])
+def test_cursor_invalido_ou_de_outra_ordenacao_responde_400(token):
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(token, "nome")
+    assert erro.value.status_code == 400
+
+
+@pytest.mark.parametrize("ordenacao", ["created_at", "-created_at"])
+def test_paginacao_por_data_atravessa_datas_legadas_em_string(api, banco, pessoa, ordenacao):
+    legadas = [
+        {**pessoa(cpf, indice), "created_at": f"2024-05-0{indice + 1}T10:00:00+00:00",
+         "updated_at": f"2024-05-0{indice + 1}T10:00:00+00:00"}
+        for indice, cpf in enumerate(gerar_cpfs(31, 0, 3))
+    ]
+    nativas = [
+        {**pessoa(cpf, indice), "created_at": datetime(2024, 5, indice + 1, 9, tzinfo=timezone.utc),
+         "updated_at": datetime(2024, 5, indice + 1, 9, tzinfo=timezone.utc)}
+        for indice, cpf in enumerate(gerar_cpfs(32, 0, 3))
+    ]
+    api.portal.call(banco.pessoas.insert_many, legadas + nativas)
+    # Ordem do MongoDB: todas as strings antes de todas as datas
+    esperada = [doc["cpf"] for doc in legadas + nativas]
+    if ordenacao.startswith("-"):
+        esperada.reverse()
+
+    vistas, after = [], None
+    while True:
+        params = {"sort": ordenacao, "limit": 2, **({"after": after} if after else {})}
+        resposta = api.get("/api/pessoas", params=params)
+        vistas += [p["cpf"] for p in resposta.json()]
+        after = resposta.headers.get("X-Next-Cursor")
+        if not after:
+            break
+
+    assert vistas == esperada
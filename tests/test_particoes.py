@@ -0,0 +1,97 @@
+"""Particionamento por CPF: jump hash, roteamento das escritas e intercalação dos cursores"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from gerar_dados import gerar_cpfs
+from particoes import ColecaoParticionada, ordem_bson, particao_do_cpf
+
+CPFS = gerar_cpfs(3, 0, 30000)
+
+
+@pytest.mark.parametrize("cpf, total, particao", [
+    ("12345678909", 3, 1), ("12345678909", 10, 7), ("98765432100", 3, 2), ("98765432100", 10, 5),
+])
+def test_mapeamento_estavel_entre_versoes(cpf, total, particao):
+    # Mudar estes valores exige rebalancear os bancos existentes (rebalancear.py)
+    assert particao_do_cpf(cpf, total) == particao
+
+
+def test_uma_particao_e_distribuicao_uniforme():
+    assert {particao_do_cpf(cpf, 1) for cpf in CPFS[:100]} == {0}
+    contagens = Counter(particao_do_cpf(cpf, 4) for cpf in CPFS)
+    assert sorted(contagens) == [0, 1, 2, 3]
+    assert all(abs(quantidade - len(CPFS) / 4) < len(CPFS) * 0.02 for quantidade in contagens.values())
+
+
+@pytest.mark.parametrize("total", [1, 2, 3, 7])
+def test_nova_particao_so_recebe_pessoas(total):
+    movidos = [cpf for cpf in CPFS if particao_do_cpf(cpf, total) != particao_do_cpf(cpf, total + 1)]
+
+    assert {particao_do_cpf(cpf, total + 1) for cpf in movidos} == {total}
+    assert abs(len(movidos) / len(CPFS) - 1 / (total + 1)) < 0.02
+
+
+def test_ordem_bson_entre_tipos():
+    valores = [datetime(2020, 1, 1, tzinfo=timezone.utc), "b", None, True, 2, "a", 1.5]
+
+    assert sorted(valores, key=ordem_bson) == [None, 1.5, 2, "a", "b", True, datetime(2020, 1, 1, tzinfo=timezone.utc)]
+
+
+def executar(corrotina):
+    return asyncio.run(corrotina)
+
+
+def colecao_particionada(total: int = 3) -> ColecaoParticionada:
+    cliente = AsyncMongoMockClient(tz_aware=True)
+    return ColecaoParticionada([cliente[f"p{indice}"].pessoas for indice in range(total)])
+
+
+def test_escritas_vao_a_particao_do_cpf():
+    async def cenario():
+        colecao = colecao_particionada()
+        cpfs = CPFS[:60]
+        await colecao.insert_many([{"cpf": cpf, "nome": None} for cpf in cpfs])
+        resultado = await colecao.bulk_write(
+            [UpdateOne({"cpf": cpf}, {"$set": {"nome": f"N{cpf}"}}) for cpf in cpfs], cpfs=cpfs
+        )
+        por_particao = [await particao.find({}, {"_id": 0}).to_list(None) for particao in colecao.colecoes]
+        return resultado, por_particao
+
+    resultado, por_particao = executar(cenario())
+
+    assert resultado.matched_count == resultado.modified_count == 60
+    for indice, docs in enumerate(por_particao):
+        assert all(particao_do_cpf(doc["cpf"], 3) == indice and doc["nome"] == f"N{doc['cpf']}" for doc in docs)
+
+
+def test_operacao_sem_cpf_vai_a_todas_as_particoes():
+    async def cenario():
+        colecao = colecao_particionada()
+        await colecao.insert_many([{"cpf": cpf, "lote": 1} for cpf in CPFS[:30]])
+        return await colecao.bulk_write([UpdateOne({"lote": 1}, {"$set": {"lote": 2}})])
+
+    # Um documento alterado em cada partição
+    assert executar(cenario()).modified_count == 3
+
+
+def test_intercalacao_com_tipos_misturados_entre_particoes():
+    async def cenario():
+        colecao = colecao_particionada()
+        await colecao.insert_many([
+            {"cpf": cpf, "nome": None if indice % 3 == 0 else f"Nome {indice % 5}"}
+            for indice, cpf in enumerate(CPFS[:40])
+        ])
+        crescente = await colecao.find({}, {"_id": 0}).sort([("nome", ASCENDING), ("cpf", ASCENDING)]).to_list(None)
+        decrescente = await colecao.find({}, {"_id": 0}).sort([("nome", DESCENDING), ("cpf", DESCENDING)]).to_list(None)
+        return crescente, decrescente
+
+    crescente, decrescente = executar(cenario())
+
+    chaves = [(ordem_bson(doc["nome"]), doc["cpf"]) for doc in crescente]
+    assert len(crescente) == 40 and chaves == sorted(chaves)
+    assert decrescente == crescente[::-1]